@@ -2,8 +2,13 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import socket
 import threading
-import json
+import time
 from enum import Enum
+from protocol import FrameDecoder, encode_frame, RECV_SIZE
+from chat_view import CHAT_LINES, ChatView
+
+RECONNECT_ATTEMPTS = 8  # Tentatives de reprise après une coupure (dans le délai de grâce du serveur)
+
 
 class Role(Enum):
     VILLAGEOIS = "Villageois"
@@ -28,7 +33,7 @@ class GamePhase(Enum):
     DAY_VOTE = "day_vote"
 
 class LoupGarouClient:
-    def __init__(self):
+    def __init__(self, chat_lines: int = CHAT_LINES):
         self.root = tk.Tk()
         self.root.title("Loup-Garou")
         self.root.geometry("800x600")
@@ -36,10 +41,13 @@ class LoupGarouClient:
         # Variables pour la connexion
         self.username = ""
         self.client_socket = None
+        self.server_address = None
         self.connected = False
+        self.session = None  # Jeton donné par le serveur pour reprendre la partie après une coupure
         self.room_id = None
         self.role = None
         self.game_started = False
+        self.spectator = False  # Simple spectateur : flux public, aucune action
         
         # États du joueur
         self.is_alive = True
@@ -65,6 +73,11 @@ class LoupGarouClient:
         
         # Dictionnaire des joueurs
         self.players_dict = {}  # username -> état (vivant/mort)
+        self.offline_players = set()  # Joueurs en attente de reconnexion
+        self.max_players = 16
+        self.roster_version = 0  # Version de la liste des joueurs (deltas du serveur)
+        self.roster_syncing = False  # Liste complète demandée au serveur
+        self.chat_lines = chat_lines  # Lignes de chat gardées en mémoire (voir chat_view.py)
         
         self.setup_main_menu()
 
@@ -95,6 +108,12 @@ class LoupGarouClient:
                    command=self.create_game).pack(pady=5)
         ttk.Button(self.main_menu, text="Rejoindre une partie", 
                    command=self.join_game).pack(pady=5)
+        ttk.Button(self.main_menu, text="Partie rapide",
+                   command=self.quick_join).pack(pady=5)
+        ttk.Button(self.main_menu, text="Regarder une partie",
+                   command=self.watch_game).pack(pady=5)
+        ttk.Button(self.main_menu, text="Parties ouvertes",
+                   command=self.browse_rooms).pack(pady=5)
         
         self.show_frame(self.main_menu)
         
@@ -126,8 +145,7 @@ class LoupGarouClient:
         chat_frame = ttk.Frame(content_frame)
         chat_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
-        self.chat_area = tk.Text(chat_frame, height=20, width=40, state='disabled')
-        self.chat_area.pack(fill=tk.BOTH, expand=True)
+        self.chat_view = ChatView(chat_frame, self.root, self.chat_lines, height=20, width=40)
         
         # Players list (right side)
         players_frame = ttk.Frame(content_frame)
@@ -183,6 +201,7 @@ class LoupGarouClient:
         
         if msg_type == 'room_created':
             self.room_id = message['room_id']
+            self.session = message.get('session')
             self.room_label.config(text=f"Room: {self.room_id}")
             self.add_chat_message("Système", f"Room créée! ID: {self.room_id}")
             self.update_players_list(message['players_info'])
@@ -197,20 +216,77 @@ class LoupGarouClient:
             
         elif msg_type == 'room_joined':
             self.room_id = message['room_id']
+            self.session = message.get('session')
             self.room_label.config(text=f"Room: {self.room_id}")
             self.add_chat_message("Système", "Vous avez rejoint la partie!")
             self.update_players_list(message['players_info'])
             
         elif msg_type == 'chat':
             self.add_chat_message(message['username'], message['content'])
+
+        elif msg_type == 'chat_batch':
+            # Plusieurs lignes regroupées par le serveur
+            for line in message['messages']:
+                self.add_chat_message(line['username'], line['content'])
+
+        elif msg_type == 'chat_rate_limited':
+            self.add_chat_message("Système", message['message'])
             
         elif msg_type == 'player_joined':
-            self.add_chat_message("Système", f"{message['username']} a rejoint la partie")
-            self.update_players_list(message['players_info'])
+            if self.roster_delta(message):
+                username = message['username']
+                self.add_chat_message("Système", f"{username} a rejoint la partie")
+                self.players_dict[username] = True
+                self.players_list.insert(tk.END, self.player_label(username))
+                self.update_player_count()
             
         elif msg_type == 'player_left':
-            self.add_chat_message("Système", f"{message['username']} a quitté la partie")
+            if self.roster_delta(message):
+                username = message['username']
+                self.add_chat_message("Système", f"{username} a quitté la partie")
+                if username in self.players_dict:
+                    self.players_list.delete(list(self.players_dict).index(username))
+                    del self.players_dict[username]
+                self.offline_players.discard(username)
+                self.update_player_count()
+
+        elif msg_type == 'player_offline':
+            if self.roster_delta(message):
+                self.add_chat_message("Système", f"{message['username']} a perdu la connexion")
+                self.offline_players.add(message['username'])
+                self.update_player_row(message['username'])
+
+        elif msg_type == 'player_back':
+            if self.roster_delta(message):
+                self.add_chat_message("Système", f"{message['username']} est de retour")
+                self.offline_players.discard(message['username'])
+                self.update_player_row(message['username'])
+
+        elif msg_type == 'roster':
             self.update_players_list(message['players_info'])
+
+        elif msg_type == 'resync':
+            self.handle_resync(message)
+
+        elif msg_type == 'spectating':
+            self.handle_spectating(message)
+
+        elif msg_type == 'spectators_full':
+            messagebox.showerror("Erreur", message['message'])
+            self.disconnect()
+
+        elif msg_type == 'room_closed':
+            messagebox.showinfo("Fin", message.get('message', "La room a été fermée"))
+            self.disconnect()
+
+        elif msg_type == 'server_busy':
+            messagebox.showerror("Erreur", message['message'])
+            self.disconnect()
+
+        elif msg_type == 'resume_failed':
+            self.session = None
+            messagebox.showerror("Erreur", f"Impossible de reprendre la partie : {message['message']}")
+            self.show_frame(self.main_menu)
             
         elif msg_type == 'game_started':
             self.game_started = True
@@ -235,8 +311,11 @@ class LoupGarouClient:
                 messagebox.showerror("Erreur", message.get('message', "Action impossible"))
 
         elif msg_type == 'player_death':
+            if not self.roster_delta(message):
+                return
             username = message['username']
             self.players_dict[username] = False
+            self.update_player_row(username)
             if username == self.username:
                 self.is_alive = False
                 self.add_chat_message("Système", "Vous êtes mort!")
@@ -258,6 +337,58 @@ class LoupGarouClient:
             # Désactiver toutes les actions
             self.disable_all_actions()
     
+    def handle_resync(self, message):
+        """Reprise après une reconnexion : remet l'interface dans l'état courant de la partie"""
+        self.room_id = message['room_id']
+        self.room_label.config(text=f"Room: {self.room_id}")
+        self.game_started = True
+        self.start_button.config(state='disabled')
+        if message.get('role'):
+            self.role = Role(message['role'])
+            self.role_label.config(text=f"Rôle: {self.role.value}")
+        self.is_alive = message['is_alive']
+        self.has_voted = message['has_voted']
+        if 'lover' in message:
+            self.is_amoureux = True
+            self.amoureux_with = message['lover']
+        if 'potions' in message:
+            self.potion_heal = message['potions']['heal']
+            self.potion_kill = message['potions']['kill']
+
+        self.update_players_list(message['players_info'])
+        self.add_chat_message("Système", "Reconnecté à la partie")
+
+        if message.get('winner'):
+            self.add_chat_message("Système", f"La partie est terminée! Victoire des {message['winner']}!")
+            self.disable_all_actions()
+            return
+        self.current_phase = GamePhase(message['phase'])
+        self.phase_label.config(text=f"Phase: {self.current_phase.value}")
+        self.handle_phase(message['phase'])
+        if message.get('victim'):
+            self.add_chat_message("Système", f"Victime des loups : {message['victim']}")
+        if message.get('remaining'):
+            self.start_timer(message['remaining'])
+
+    def handle_spectating(self, message):
+        """Arrivée comme spectateur : état public de la room, sans rôle"""
+        self.room_id = message['room_id']
+        self.room_label.config(text=f"Room: {self.room_id} (spectateur)")
+        self.role_label.config(text=f"Spectateurs: {message['spectators']}")
+        self.start_button.config(state='disabled')
+        self.message_entry.config(state='disabled')
+        self.update_players_list(message['players_info'])
+        self.add_chat_message("Système", "Vous regardez la partie")
+        if message.get('winner'):
+            self.add_chat_message("Système", f"La partie est terminée! Victoire des {message['winner']}!")
+            return
+        if message['phase'] != GamePhase.WAITING.value:
+            self.game_started = True
+            self.current_phase = GamePhase(message['phase'])
+            self.phase_label.config(text=f"Phase: {self.current_phase.value}")
+        if message.get('remaining'):
+            self.start_timer(message['remaining'])
+
     def start_timer(self, duration: int):
         """Démarre un compte à rebours pour la phase actuelle"""
         def update_timer(remaining):
@@ -273,31 +404,69 @@ class LoupGarouClient:
         update_timer(duration)
 
     def add_chat_message(self, username, content):
-        """Ajoute un message au chat"""
-        self.chat_area.config(state='normal')
-        self.chat_area.insert('end', f"{username}: {content}\n")
-        self.chat_area.see('end')
-        self.chat_area.config(state='disabled')
+        """Ajoute un message au chat (affiché avec les autres lignes de la rafale)"""
+        self.chat_view.append(f"{username}: {content}")
     
     def update_players_list(self, players_info):
-        """Met à jour la liste des joueurs et le compteur"""
-        player_count = players_info['player_count']
-        max_players = players_info['max_players']
-        players = players_info['players']
+        """Liste complète des joueurs (entrée dans la room, reprise ou resynchronisation)"""
+        self.roster_version = players_info.get('version', 0)
+        self.roster_syncing = False
+        self.max_players = players_info['max_players']
+        dead = set(players_info.get('dead', ()))
+        self.offline_players = set(players_info.get('offline', ()))
         
-        # Mise à jour du dictionnaire des joueurs
-        self.players_dict = {player: True for player in players}
-        
-        # Mise à jour du compteur
-        self.player_count_label.config(text=f"Joueurs: {player_count}/{max_players}")
+        # Mise à jour du dictionnaire des joueurs (les morts restent morts)
+        self.players_dict = {player: player not in dead for player in players_info['players']}
         
         # Mise à jour de la liste
         self.players_list.delete(0, tk.END)
-        for player in players:
-            self.players_list.insert(tk.END, player)
+        for player in self.players_dict:
+            self.players_list.insert(tk.END, self.player_label(player))
+        self.update_player_count()
+
+    def roster_delta(self, message) -> bool:
+        """Vérifie la version d'un delta : True s'il faut l'appliquer.
+
+        Un delta déjà couvert par notre liste est ignoré ; s'il en manque un, on demande la
+        liste complète (roster_sync) et on ignore les deltas jusqu'à sa réception.
+        """
+        version = message.get('version')
+        if version is None:
+            return True
+        if version <= self.roster_version:
+            return False
+        if version > self.roster_version + 1 or self.roster_syncing:
+            if not self.roster_syncing:
+                self.roster_syncing = True
+                self.safe_send({'type': 'roster_sync'})
+            return False
+        self.roster_version = version
+        return True
+
+    def player_label(self, username: str) -> str:
+        """Texte d'un joueur dans la liste"""
+        label = username
+        if not self.players_dict.get(username, True):
+            label += " (mort)"
+        if username in self.offline_players:
+            label += " (déconnecté)"
+        return label
+
+    def update_player_row(self, username: str):
+        """Met à jour la ligne d'un seul joueur"""
+        if username not in self.players_dict:
+            return
+        index = list(self.players_dict).index(username)
+        self.players_list.delete(index)
+        self.players_list.insert(index, self.player_label(username))
+
+    def update_player_count(self):
+        """Met à jour le compteur et le bouton de démarrage"""
+        player_count = len(self.players_dict)
+        self.player_count_label.config(text=f"Joueurs: {player_count}/{self.max_players}")
             
         # Active le bouton de démarrage si assez de joueurs
-        if 6 <= player_count <= max_players:
+        if 6 <= player_count <= self.max_players and not self.game_started:
             self.start_button.config(state='normal')
         else:
             self.start_button.config(state='disabled')
@@ -324,7 +493,7 @@ class LoupGarouClient:
                 'type': 'create_room',
                 'username': self.username
             }
-            self.client_socket.send(json.dumps(message).encode('utf-8'))
+            self.client_socket.sendall(encode_frame(message))
             self.setup_game_room()
             self.show_frame(self.game_room)
     
@@ -343,15 +512,77 @@ class LoupGarouClient:
                 'username': self.username,
                 'room_id': room_id
             }
-            self.client_socket.send(json.dumps(message).encode('utf-8'))
+            self.client_socket.sendall(encode_frame(message))
             self.setup_game_room()
             self.show_frame(self.game_room)
     
+    def quick_join(self):
+        """Rejoint la première partie qui a de la place (sans code de room)"""
+        self.username = self.username_entry.get()
+        if not self.username:
+            messagebox.showerror("Erreur", "Veuillez entrer un nom d'utilisateur")
+            return
+
+        if self.connect_to_server():
+            self.client_socket.sendall(encode_frame({'type': 'quick_join', 'username': self.username}))
+            self.setup_game_room()
+            self.show_frame(self.game_room)
+
+    def watch_game(self):
+        """Regarde une partie en spectateur (aucun nom d'utilisateur requis)"""
+        room_id = self.room_entry.get()
+        if not room_id:
+            messagebox.showerror("Erreur", "Veuillez entrer un ID de room")
+            return
+
+        if self.connect_to_server():
+            self.spectator = True
+            self.client_socket.sendall(encode_frame({'type': 'spectate', 'room_id': room_id}))
+            self.setup_game_room()
+            self.show_frame(self.game_room)
+
+    def browse_rooms(self, host='localhost', port=5000):
+        """Affiche les salles d'attente ouvertes ; un double-clic remplit l'ID Room"""
+        try:
+            # Connexion de courte durée, indépendante de celle de la partie
+            with socket.create_connection((host, port), timeout=5) as list_socket:
+                list_socket.sendall(encode_frame({'type': 'list_rooms', 'page_size': 50}))
+                decoder = FrameDecoder()
+                response = None
+                while response is None:
+                    data = list_socket.recv(RECV_SIZE)
+                    if not data:
+                        raise ConnectionError("Connexion fermée")
+                    for message in decoder.feed(data):
+                        if message.get('type') == 'room_list':
+                            response = message
+        except Exception as e:
+            messagebox.showerror("Erreur de connexion", f"Impossible d'obtenir la liste des parties: {e}")
+            return
+
+        window = tk.Toplevel(self.root)
+        window.title(f"Parties ouvertes ({response['total']})")
+        room_list = tk.Listbox(window, width=40, height=15)
+        room_list.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
+        for room in response['rooms']:
+            room_list.insert(tk.END, f"{room['room_id']}  -  {room['players']}/{room['max_players']} joueurs")
+
+        def choose(event=None):
+            selection = room_list.curselection()
+            if selection:
+                self.room_entry.delete(0, tk.END)
+                self.room_entry.insert(0, response['rooms'][selection[0]]['room_id'])
+                window.destroy()
+
+        room_list.bind('<Double-Button-1>', choose)
+        ttk.Button(window, text="Choisir", command=choose).pack(pady=5)
+
     def connect_to_server(self, host='localhost', port=5000):
         """Établit la connexion avec le serveur"""
         try:
             self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self.client_socket.connect((host, port))
+            self.server_address = (host, port)
             self.connected = True
             
             threading.Thread(target=self.receive_messages, daemon=True).start()
@@ -363,16 +594,24 @@ class LoupGarouClient:
     
     def receive_messages(self):
         """Reçoit les messages du serveur"""
+        decoder = FrameDecoder()
         while self.connected:
             try:
-                message = self.client_socket.recv(1024).decode('utf-8')
-                if not message:
+                data = self.client_socket.recv(RECV_SIZE)
+                if not data:
                     raise ConnectionError("Connection lost")
-                self.root.after(0, self.handle_message, json.loads(message))
-            except json.JSONDecodeError:
-                print("Erreur décodage JSON")
-                continue
+                for message in decoder.feed(data):
+                    self.root.after(0, self.handle_message, message)
+            except ValueError:
+                # Trame invalide ou trop grande : le flux est désynchronisé
+                self.connected = False
+                self.root.after(0, messagebox.showerror, "Erreur",
+                            "Message invalide reçu du serveur")
+                break
             except ConnectionError:
+                if self.resume_session():
+                    decoder = FrameDecoder()
+                    continue
                 self.connected = False
                 self.root.after(0, messagebox.showerror, "Erreur", 
                             "Connexion au serveur perdue")
@@ -381,6 +620,34 @@ class LoupGarouClient:
                 print(f"Erreur réception: {e}")
                 continue
 
+    def resume_session(self) -> bool:
+        """Reconnexion automatique pendant une partie ; le serveur répond par un resync"""
+        if not (self.connected and self.session and self.game_started):
+            return False
+        self.connected = False  # Les envois échouent proprement pendant la reconnexion
+        self.root.after(0, self.add_chat_message, "Système", "Connexion perdue, reconnexion...")
+        for attempt in range(RECONNECT_ATTEMPTS):
+            time.sleep(min(0.5 * 2 ** attempt, 5.0))
+            try:
+                new_socket = socket.create_connection(self.server_address, timeout=5)
+                new_socket.settimeout(None)
+                new_socket.sendall(encode_frame({
+                    'type': 'resume',
+                    'session': self.session,
+                    'room_id': self.room_id  # Pour le routage (passerelle, workers)
+                }))
+            except OSError as e:
+                print(f"Reconnexion impossible ({e}), nouvel essai...")
+                continue
+            try:
+                self.client_socket.close()
+            except OSError:
+                pass
+            self.client_socket = new_socket
+            self.connected = True
+            return True
+        return False
+
     def send_message(self):
         """Envoie un message au serveur"""
         if not self.connected:
@@ -396,7 +663,7 @@ class LoupGarouClient:
                 'content': self.message_entry.get(),
                 'username': self.username
             }
-            self.client_socket.send(json.dumps(message).encode('utf-8'))
+            self.client_socket.sendall(encode_frame(message))
             self.message_entry.delete(0, tk.END)
         except Exception as e:
             print(f"Erreur lors de l'envoi du message: {e}")
@@ -411,7 +678,7 @@ class LoupGarouClient:
             return False
             
         try:
-            self.client_socket.send(json.dumps(message).encode('utf-8'))
+            self.client_socket.sendall(encode_frame(message))
             return True
         except Exception as e:
             print(f"Erreur lors de l'envoi: {e}")
@@ -426,7 +693,7 @@ class LoupGarouClient:
             message = {
                 'type': 'start_game'
             }
-            self.client_socket.send(json.dumps(message).encode('utf-8'))
+            self.client_socket.sendall(encode_frame(message))
 
     def disconnect(self):
         """Déconnecte le client et retourne au menu"""
@@ -436,15 +703,17 @@ class LoupGarouClient:
                     'type': 'disconnect',
                     'username': self.username
                 }
-                self.client_socket.send(json.dumps(message).encode('utf-8'))
+                self.client_socket.sendall(encode_frame(message))
             except:
                 pass
             finally:
+                self.connected = False  # Avant close : ce départ ne doit pas déclencher de reprise
+                self.session = None
                 self.client_socket.close()
-                self.connected = False
                 self.room_id = None
                 self.role = None
                 self.game_started = False
+                self.spectator = False
                 self.show_frame(self.main_menu)
 
     def handle_phase(self, phase: str):
@@ -489,11 +758,14 @@ class LoupGarouClient:
         # Phase DAY_DISCUSSION
         elif current_phase == GamePhase.DAY_DISCUSSION:
             self.add_chat_message("Système", "Le village se réveille! C'est le moment de débattre")
-            self.enable_chat()
+            if not self.spectator:
+                self.enable_chat()
         
         # Phase DAY_VOTE
         elif current_phase == GamePhase.DAY_VOTE:
-            if self.is_alive:
+            if self.spectator:
+                self.add_chat_message("Système", "Le village vote...")
+            elif self.is_alive:
                 self.add_chat_message("Système", "C'est l'heure du vote!")
                 self.enable_player_selection("Votez pour un joueur", self.send_vote)
             else:
@@ -635,5 +907,9 @@ class LoupGarouClient:
         self.root.mainloop()
 
 if __name__ == "__main__":
-    client = LoupGarouClient()
+    import argparse
+    parser = argparse.ArgumentParser(description="Client Loup-Garou")
+    parser.add_argument('--chat-lines', type=int, default=CHAT_LINES,
+                        help="Lignes de chat gardées en mémoire (les plus anciennes sont oubliées)")
+    client = LoupGarouClient(parser.parse_args().chat_lines)
     client.run()
\ No newline at end of file
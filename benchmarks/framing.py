@@ -0,0 +1,90 @@
+"""Débit du décodeur de trames avec du trafic pipeliné.
+
+Deux mesures : décodage en mémoire d'un flux découpé en lectures de tailles variables,
+puis envoi pipeliné sur une connexion loopback lue par FrameDecoder.
+
+    python -m benchmarks.framing --messages 200000
+"""
+import argparse
+import random
+import socket
+import threading
+import time
+
+from protocol import FrameDecoder, encode_frame, RECV_SIZE
+
+SAMPLE_MESSAGES = [
+    {'type': 'phase_change', 'phase': 'night_loup'},
+    {'type': 'phase_timer', 'duration': 45},
+    {'type': 'chat', 'username': 'joueur42', 'content': "Je pense que c'est Alice la louve"},
+    {'type': 'player_death', 'username': 'joueur7'},
+]
+
+
+def build_stream(count: int) -> bytes:
+    return b''.join(encode_frame(SAMPLE_MESSAGES[i % len(SAMPLE_MESSAGES)]) for i in range(count))
+
+
+def bench_in_memory(stream: bytes, count: int, chunk_sizes) -> None:
+    rng = random.Random(0)
+    for label, sizes in chunk_sizes:
+        decoder = FrameDecoder()
+        decoded = 0
+        start = time.perf_counter()
+        offset = 0
+        while offset < len(stream):
+            size = rng.choice(sizes)
+            decoded += len(decoder.feed(stream[offset:offset + size]))
+            offset += size
+        elapsed = time.perf_counter() - start
+        assert decoded == count, (decoded, count)
+        print(f"mémoire  lectures={label:<12} {count / elapsed:12,.0f} msg/s")
+
+
+def bench_loopback(stream: bytes, count: int) -> None:
+    listener = socket.create_server(('127.0.0.1', 0))
+    port = listener.getsockname()[1]
+
+    def sender():
+        conn, _ = listener.accept()
+        conn.sendall(stream)
+        conn.close()
+
+    thread = threading.Thread(target=sender, daemon=True)
+    thread.start()
+    client = socket.create_connection(('127.0.0.1', port))
+    decoder = FrameDecoder()
+    decoded = 0
+    start = time.perf_counter()
+    while True:
+        data = client.recv(RECV_SIZE)
+        if not data:
+            break
+        decoded += len(decoder.feed(data))
+    elapsed = time.perf_counter() - start
+    client.close()
+    listener.close()
+    thread.join()
+    assert decoded == count, (decoded, count)
+    print(f"loopback lectures={RECV_SIZE:<12} {count / elapsed:12,.0f} msg/s "
+          f"({len(stream) / elapsed / 1e6:.1f} Mo/s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--messages', type=int, default=200000)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stream = build_stream(args.messages)
+    print(f"encodage {args.messages / (time.perf_counter() - start):12,.0f} msg/s")
+    bench_in_memory(stream, args.messages, [
+        ('1-64', list(range(1, 65))),
+        ('1024', [1024]),
+        (str(RECV_SIZE), [RECV_SIZE]),
+    ])
+    bench_loopback(stream, args.messages)
+
+
+if __name__ == '__main__':
+    main()
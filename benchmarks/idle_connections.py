@@ -0,0 +1,128 @@
+"""Mémoire du serveur et latence de broadcast en fonction du nombre de connexions inactives.
+
+Lance server.py dans un sous-processus, ouvre N connexions qui ne font rien, puis mesure
+le RSS du serveur et l'aller-retour d'un message de chat dans une room de 6 joueurs.
+
+    python -m benchmarks.idle_connections --mode asyncio --counts 0 1000 10000
+"""
+import argparse
+import os
+import resource
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+from protocol import FrameDecoder, encode_frame, RECV_SIZE
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def rss_kb(pid: int) -> int:
+    """RSS d'un processus en Ko (Linux uniquement)"""
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def wait_for_port(host: str, port: int, timeout: float = 10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("Le serveur ne répond pas")
+
+
+def recv_message(sock: socket.socket, decoders={}) -> dict:
+    """Lit le prochain message d'un socket (un décodeur par socket)"""
+    decoder, pending = decoders.setdefault(sock, (FrameDecoder(), []))
+    while not pending:
+        pending.extend(decoder.feed(sock.recv(RECV_SIZE)))
+    return pending.pop(0)
+
+
+def open_room(host: str, port: int, size: int = 6):
+    """Crée une room de `size` joueurs et retourne leurs sockets"""
+    players = []
+    owner = socket.create_connection((host, port))
+    owner.sendall(encode_frame({'type': 'create_room', 'username': 'p0'}))
+    room_id = recv_message(owner)['room_id']
+    players.append(owner)
+    for i in range(1, size):
+        sock = socket.create_connection((host, port))
+        sock.sendall(encode_frame({'type': 'join_room', 'username': f'p{i}',
+                                 'room_id': room_id}))
+        recv_message(sock)
+        players.append(sock)
+        time.sleep(0.01)
+    # Vide les notifications player_joined en attente
+    for i, sock in enumerate(players):
+        for _ in range(size - 1 - i):
+            recv_message(sock)
+    return players
+
+
+def chat_rtt(players, rounds: int) -> list:
+    """Aller-retour d'un chat : envoi par le premier joueur, réception par le dernier"""
+    sender, receiver = players[0], players[-1]
+    samples = []
+    for i in range(rounds):
+        start = time.perf_counter()
+        sender.sendall(encode_frame({'type': 'chat', 'username': 'p0',
+                                   'content': str(i)}))
+        recv_message(receiver)
+        samples.append((time.perf_counter() - start) * 1000)
+        recv_message(sender)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', default='asyncio')
+    parser.add_argument('--port', type=int, default=5050)
+    parser.add_argument('--counts', type=int, nargs='+', default=[0, 1000, 5000, 10000])
+    parser.add_argument('--rounds', type=int, default=200)
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    host = '127.0.0.1'
+    # Chat sans limite ni regroupement : on mesure l'aller-retour brut, message par message
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'server.py'),
+                               '--host', host, '--port', str(args.port), '--mode', args.mode,
+                               '--chat-rate', '0', '--chat-window', '0'],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    idle = []
+    try:
+        wait_for_port(host, args.port)
+        players = open_room(host, args.port)
+        baseline = rss_kb(server.pid)
+        print(f"mode={args.mode} rss_base={baseline} Ko")
+        for count in sorted(args.counts):
+            while len(idle) < count:
+                idle.append(socket.create_connection((host, args.port)))
+                if len(idle) % 200 == 0:
+                    time.sleep(0.02)  # Laisse le backlog d'accept se vider
+            time.sleep(0.5)
+            rss = rss_kb(server.pid)
+            samples = sorted(chat_rtt(players, args.rounds))
+            per_conn = (rss - baseline) * 1024 / count if count else 0
+            print(f"connexions={count:6d} rss={rss:8d} Ko octets/connexion={per_conn:8.0f} "
+                  f"chat_p50={statistics.median(samples):.3f} ms "
+                  f"chat_p99={samples[int(len(samples) * 0.99) - 1]:.3f} ms")
+    finally:
+        for sock in idle:
+            sock.close()
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    main()
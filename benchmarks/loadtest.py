@@ -0,0 +1,371 @@
+"""Test de charge en loopback : N clients synthétiques répartis en rooms de 6 à 16 joueurs.
+
+Les clients créent et rejoignent leurs rooms, lancent la partie, discutent à un débit fixé
+et jouent leurs actions de nuit et leurs votes. On mesure la latence de bout en bout par
+type de message (p50, p99, p999), le débit d'ouverture des connexions et le CPU du serveur.
+Les résultats sont écrits en JSON pour comparer les versions.
+
+    python -m benchmarks.loadtest --clients 600 --duration 30 --output resultats.json
+    python -m benchmarks.loadtest --connect 127.0.0.1:5000 --clients 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from protocol import FrameDecoder, encode_frame, RECV_SIZE
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Rôle qui agit pendant chaque phase de nuit, et action envoyée
+NIGHT_ACTIONS = {
+    'night_loup': ('Loup-Garou', 'kill'),
+    'night_voyante': ('Voyante', 'see'),
+}
+
+# Réponses directes : type reçu -> requêtes possibles (dans l'ordre d'envoi)
+RESPONSES = {
+    'room_created': ('create_room',),
+    'room_joined': ('join_room',),
+    'action_result': ('night_action', 'vote'),
+}
+
+
+def percentile(sorted_samples: List[float], fraction: float) -> float:
+    index = min(len(sorted_samples) - 1, int(len(sorted_samples) * fraction))
+    return sorted_samples[index]
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors = 0
+
+    def record(self, msg_type: str, seconds: float):
+        self.latencies[msg_type].append(seconds * 1000)
+
+    def summary(self) -> dict:
+        result = {}
+        for msg_type, samples in sorted(self.latencies.items()):
+            samples.sort()
+            result[msg_type] = {
+                'count': len(samples),
+                'p50_ms': round(percentile(samples, 0.50), 3),
+                'p99_ms': round(percentile(samples, 0.99), 3),
+                'p999_ms': round(percentile(samples, 0.999), 3),
+                'max_ms': round(samples[-1], 3),
+            }
+        return result
+
+
+class LoadRoom:
+    """Groupe de clients synthétiques partageant une room"""
+
+    def __init__(self, clients: List['LoadClient']):
+        self.clients = clients
+        self.room_id: Optional[str] = None
+        self.joined = asyncio.Event()
+        self.alive = {client.username for client in clients}
+        # Mesure de phase_change : seules les phases closes par les actions des joueurs
+        # comptent (pas celles closes par le timer du serveur)
+        self.phase_index = 0
+        self.actions_needed: Optional[int] = None
+        self.actions_sent = 0
+        self.trigger_at: Optional[float] = None  # Action qui a complété la phase en cours
+        self.measured_trigger: Optional[float] = None
+        self.start_sent_at: Optional[float] = None
+        self.game_over = False
+
+
+class LoadClient:
+    def __init__(self, harness: 'LoadHarness', index: int):
+        self.harness = harness
+        self.phases_seen = 0
+        self.username = f"charge{index}"
+        self.room: Optional[LoadRoom] = None
+        self.role: Optional[str] = None
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.pending: Dict[str, List[float]] = defaultdict(list)  # Requêtes en attente de réponse
+        self.response_event = asyncio.Event()
+
+    async def connect(self, host: str, port: int):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+
+    def send(self, message: dict, expect_response: bool = False):
+        if expect_response:
+            self.pending[message['type']].append(time.perf_counter())
+        self.writer.write(encode_frame(message))
+
+    async def read_loop(self):
+        decoder = FrameDecoder()
+        try:
+            while True:
+                data = await self.reader.read(RECV_SIZE)
+                if not data:
+                    break
+                now = time.perf_counter()
+                for message in decoder.feed(data):
+                    self.on_message(message, now)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+    def on_message(self, message: dict, now: float):
+        stats = self.harness.stats
+        msg_type = message.get('type')
+        room = self.room
+
+        for request in RESPONSES.get(msg_type, ()):
+            if self.pending[request]:
+                stats.record(request, now - self.pending[request].pop(0))
+                break
+
+        if msg_type in ('room_created', 'room_joined'):
+            if msg_type == 'room_created':
+                room.room_id = message['room_id']
+                room.joined.set()
+            self.response_event.set()
+        elif msg_type == 'chat':
+            sent_at = float(message['content'])
+            stats.record('chat', now - sent_at)
+        elif msg_type == 'chat_batch':
+            for line in message['messages']:
+                stats.record('chat', now - float(line['content']))
+        elif msg_type == 'game_started':
+            self.role = message['role']
+            if room.start_sent_at is not None:
+                stats.record('game_started', now - room.start_sent_at)
+        elif msg_type == 'phase_change':
+            self.phases_seen += 1
+            if self.phases_seen > room.phase_index:
+                # Premier client de la room à recevoir cette phase
+                room.phase_index = self.phases_seen
+                room.measured_trigger = room.trigger_at
+                room.trigger_at = None
+                room.actions_sent = 0
+                room.actions_needed = self.actions_needed(message['phase'])
+            if room.measured_trigger is not None and self.phases_seen == room.phase_index:
+                stats.record('phase_change', now - room.measured_trigger)
+            self.play_phase(message['phase'])
+        elif msg_type == 'player_death':
+            room.alive.discard(message['username'])
+        elif msg_type == 'game_over':
+            room.game_over = True
+        elif msg_type in ('room_full', 'room_not_found', 'game_already_started'):
+            stats.errors += 1
+            self.response_event.set()
+
+    def actions_needed(self, phase: str) -> Optional[int]:
+        """Nombre d'actions qui closent la phase, None si seul le timer la termine"""
+        if phase in NIGHT_ACTIONS:
+            return 1
+        if phase == 'day_vote':
+            return len(self.room.alive)
+        return None
+
+    def play_phase(self, phase: str):
+        """Joue l'action du client pour la phase qui commence"""
+        room = self.room
+        if self.username not in room.alive:
+            return
+        targets = [name for name in room.alive if name != self.username]
+        if not targets:
+            return
+        message = None
+        role, action = NIGHT_ACTIONS.get(phase, (None, None))
+        if role is not None and self.role == role:
+            message = {'type': 'night_action', 'action': action, 'target': random.choice(targets)}
+        elif phase == 'day_vote':
+            message = {'type': 'vote', 'target': random.choice(targets)}
+        if message:
+            # Laisse un peu de temps, comme un joueur réel, sans tout envoyer au même instant
+            delay = random.uniform(0.01, self.harness.action_delay)
+            asyncio.get_running_loop().call_later(delay, self.send_action, message, self.phases_seen)
+
+    def send_action(self, message: dict, phase_index: int):
+        if self.writer.is_closing():
+            return
+        room = self.room
+        if phase_index != room.phase_index:
+            return  # La phase est déjà terminée (autre loup plus rapide, timer...)
+        room.actions_sent += 1
+        if room.actions_needed is not None and room.actions_sent == room.actions_needed:
+            room.trigger_at = time.perf_counter()
+        self.send(message, expect_response=True)
+
+    async def chat_loop(self, rate: float, deadline: float):
+        if rate <= 0:
+            return
+        interval = 1.0 / rate
+        await asyncio.sleep(random.uniform(0, interval))
+        while time.perf_counter() < deadline and not self.writer.is_closing():
+            self.send({'type': 'chat', 'username': self.username,
+                       'content': f"{time.perf_counter():.6f}"})
+            await asyncio.sleep(interval)
+
+
+class LoadHarness:
+    def __init__(self, args):
+        self.args = args
+        self.stats = Stats()
+        self.action_delay = args.action_delay
+
+    def make_rooms(self, clients: List[LoadClient]) -> List[LoadRoom]:
+        rng = random.Random(self.args.seed)
+        rooms = []
+        index = 0
+        while index < len(clients):
+            size = rng.randint(self.args.room_min, self.args.room_max)
+            group = clients[index:index + size]
+            if len(group) < 6 and rooms:
+                rooms[-1].clients.extend(group[:16 - len(rooms[-1].clients)])
+                break
+            rooms.append(LoadRoom(group))
+            index += size
+        for room in rooms:
+            for client in room.clients:
+                client.room = room
+            room.alive = {client.username for client in room.clients}
+        return rooms
+
+    async def fill_room(self, room: LoadRoom):
+        owner = room.clients[0]
+        owner.send({'type': 'create_room', 'username': owner.username}, expect_response=True)
+        await room.joined.wait()
+        for client in room.clients[1:]:
+            client.send({'type': 'join_room', 'username': client.username,
+                         'room_id': room.room_id}, expect_response=True)
+            await client.response_event.wait()
+
+    async def run(self, host: str, port: int) -> dict:
+        args = self.args
+        clients = [LoadClient(self, i) for i in range(args.clients)]
+
+        # Ouverture des connexions
+        start = time.perf_counter()
+        for offset in range(0, len(clients), args.connect_batch):
+            batch = clients[offset:offset + args.connect_batch]
+            await asyncio.gather(*(client.connect(host, port) for client in batch))
+        connect_seconds = time.perf_counter() - start
+        readers = [asyncio.ensure_future(client.read_loop()) for client in clients]
+
+        # Formation des rooms puis lancement des parties
+        rooms = self.make_rooms(clients)
+        await asyncio.gather(*(self.fill_room(room) for room in rooms))
+        for room in rooms:
+            room.start_sent_at = time.perf_counter()
+            room.clients[0].send({'type': 'start_game'})
+
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(*(client.chat_loop(args.chat_rate, deadline) for client in clients))
+        await asyncio.sleep(max(0.0, deadline - time.perf_counter()) + 0.5)
+
+        for client in clients:
+            client.writer.close()
+        for reader in readers:
+            reader.cancel()
+        await asyncio.gather(*readers, return_exceptions=True)
+
+        return {
+            'clients': args.clients,
+            'rooms': len(rooms),
+            'games_finished': sum(room.game_over for room in rooms),
+            'connect_seconds': round(connect_seconds, 3),
+            'connections_per_second': round(args.clients / connect_seconds, 1),
+            'errors': self.stats.errors,
+            'latency': self.stats.summary(),
+        }
+
+
+def process_cpu_seconds(pid: int) -> Optional[float]:
+    """Temps CPU (user + system) d'un processus et de ses workers (server.py --workers), via /proc (Linux)"""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(')', 1)[1].split()
+        total = (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            children = f.read().split()
+    except (OSError, IndexError, ValueError):
+        return None
+    for child in children:
+        total += process_cpu_seconds(int(child)) or 0.0
+    return total
+
+
+def wait_for_port(host: str, port: int, timeout: float = 10.0):
+    import socket
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("Le serveur ne répond pas")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=240)
+    parser.add_argument('--duration', type=float, default=20.0, help="Durée de la phase de jeu (s)")
+    parser.add_argument('--chat-rate', type=float, default=0.5, help="Messages de chat par client et par seconde")
+    parser.add_argument('--room-min', type=int, default=6)
+    parser.add_argument('--room-max', type=int, default=16)
+    parser.add_argument('--action-delay', type=float, default=0.5, help="Délai max avant une action (s)")
+    parser.add_argument('--connect-batch', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--connect', help="host:port d'un serveur déjà lancé (sinon on en démarre un)")
+    parser.add_argument('--mode', default='asyncio', help="Mode du serveur démarré")
+    parser.add_argument('--port', type=int, default=5070)
+    parser.add_argument('--phase-scale', type=float, default=0.1, help="Accélère les phases du serveur démarré")
+    parser.add_argument('--server-args', default='', help="Arguments supplémentaires pour server.py")
+    parser.add_argument('--output', help="Fichier JSON de résultats")
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    random.seed(args.seed)
+
+    server = None
+    if args.connect:
+        host, port = args.connect.rsplit(':', 1)
+        port = int(port)
+    else:
+        host, port = '127.0.0.1', args.port
+        command = [sys.executable, os.path.join(ROOT, 'server.py'), '--host', host, '--port', str(port),
+                   '--mode', args.mode, '--phase-scale', str(args.phase_scale)] + args.server_args.split()
+        server = subprocess.Popen(command, stdout=subprocess.DEVNULL)
+        wait_for_port(host, port)
+
+    try:
+        cpu_before = process_cpu_seconds(server.pid) if server else None
+        wall_start = time.perf_counter()
+        result = asyncio.run(LoadHarness(args).run(host, port))
+        wall = time.perf_counter() - wall_start
+        cpu_after = process_cpu_seconds(server.pid) if server else None
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    result['config'] = {key: value for key, value in vars(args).items() if key != 'output'}
+    result['wall_seconds'] = round(wall, 3)
+    if cpu_before is not None and cpu_after is not None:
+        result['server_cpu_seconds'] = round(cpu_after - cpu_before, 3)
+        result['server_cpu_percent'] = round(100 * (cpu_after - cpu_before) / wall, 1)
+
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
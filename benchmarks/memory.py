@@ -0,0 +1,84 @@
+"""Mémoire occupée par une room : salle d'attente inactive et partie en cours.
+
+Crée `rooms` rooms sur un serveur embarqué (comme benchmarks.micro) et mesure avec tracemalloc
+les octets alloués par room : d'abord des salles d'attente avec un seul joueur (le cas le plus
+fréquent sur un serveur chargé), puis des parties démarrées de `size` joueurs. Les joueurs
+simulés ne sont pas comptés (ils représentent les connexions, voir benchmarks.idle_connections).
+
+    python -m benchmarks.memory --rooms 10000 --sizes 6 12 16
+    python -m benchmarks.memory --top 10      # lignes de code qui allouent le plus
+"""
+import argparse
+import gc
+import os
+import tracemalloc
+
+from server import LoupGarouServer
+import simulation
+from simulation import NullSink, SimPlayer, Policy, VirtualClock
+from timer_wheel import TimerWheel
+
+
+def make_server() -> LoupGarouServer:
+    # Assez de codes pour 100 000 rooms
+    return LoupGarouServer(listen=False, sink=NullSink(), timers=TimerWheel(clock=VirtualClock()),
+                           room_ids=(100000, 999999))
+
+
+def fill(server: LoupGarouServer, rooms: int, size: int, started: bool, players: list):
+    """Crée `rooms` rooms de `size` joueurs (partie démarrée si `started`)"""
+    policy = Policy()
+    for r in range(rooms):
+        owner = SimPlayer(f"j{r}_0", policy)
+        players.append(owner)
+        server.process_message(owner, {'type': 'create_room', 'username': owner.username})
+        room_id = server.clients[owner]
+        for i in range(1, size):
+            player = SimPlayer(f"j{r}_{i}", policy)
+            players.append(player)
+            server.process_message(player, {'type': 'join_room', 'username': player.username,
+                                            'room_id': room_id})
+        if started:
+            server.process_message(owner, {'type': 'start_game'})
+
+
+def measure(rooms: int, size: int, started: bool, top: int = 0) -> float:
+    """Octets alloués par room (joueurs simulés exclus)"""
+    server = make_server()
+    players = []
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    fill(server, rooms, size, started, players)
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    # Ce qui est alloué par simulation.py (joueurs simulés) et par ce fichier n'est pas au serveur
+    ignored = (os.path.abspath(__file__), os.path.abspath(simulation.__file__))
+    stats = [s for s in after.compare_to(before, 'lineno')
+             if os.path.abspath(s.traceback[0].filename) not in ignored]
+    for stat in stats[:top]:
+        frame = stat.traceback[0]
+        print(f"    {stat.size_diff / rooms:8.0f} octets/room  {frame.filename.split('/')[-1]}:{frame.lineno}")
+    return sum(s.size_diff for s in stats) / rooms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rooms', type=int, default=10000)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[6, 12, 16])
+    parser.add_argument('--top', type=int, default=0, help="Affiche les N lignes qui allouent le plus")
+    args = parser.parse_args()
+
+    idle = measure(args.rooms, 1, False, args.top)
+    print(f"salle d'attente (1 joueur)          {idle:8.0f} octets/room  "
+          f"-> {idle * 100000 / 2 ** 20:6.0f} Mo pour 100 000 rooms")
+    for size in args.sizes:
+        in_game = measure(args.rooms, size, True, args.top)
+        print(f"partie en cours ({size:2d} joueurs)        {in_game:8.0f} octets/room  "
+              f"({in_game / size:5.0f} octets/joueur)")
+
+
+if __name__ == '__main__':
+    main()
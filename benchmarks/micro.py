@@ -0,0 +1,291 @@
+"""Micro-benchmarks des fonctions chaudes du serveur, comparés à une référence enregistrée.
+
+Chaque cas est mesuré pour des rooms de 6, 12 et 16 joueurs et pour 1, 100 et 10 000 rooms
+(les opérations tournent sur toutes les rooms). Le résultat est le meilleur temps par
+opération sur plusieurs répétitions. La comparaison à la référence se fait en unités d'une
+charge de calibration mesurée en alternance avec chaque cas, pour que la référence reste
+utilisable d'une machine (ou d'une minute) à l'autre.
+
+    python -m benchmarks.micro                  # mesure et compare à benchmarks/baseline.json
+    python -m benchmarks.micro --save           # enregistre la référence
+    python -m benchmarks.micro --threshold 0.3  # échec au-delà de +30 %
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+from typing import Callable, Dict, List, Tuple
+
+from server import FrameSink, GamePhase, GameRoom, LoupGarouServer, Role
+from simulation import SimPlayer, Policy, VirtualClock
+from timer_wheel import TimerWheel
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+SIZES = [6, 12, 16]
+ROOM_COUNTS = [1, 100, 10000]
+
+
+class Bench:
+    """Serveur embarqué (sortie FrameSink réelle) et `count` rooms de `size` joueurs"""
+
+    def __init__(self, size: int, count: int):
+        # 9 000 codes à 4 chiffres seulement : on élargit l'espace pour 10 000 rooms
+        room_ids = (10000, 99999) if count > 1000 else None
+        self.server = LoupGarouServer(listen=False, sink=FrameSink(),
+                                      timers=TimerWheel(clock=VirtualClock()), room_ids=room_ids)
+        self.rooms: List[GameRoom] = []
+        self.players: Dict[str, List[SimPlayer]] = {}
+        policy = Policy()
+        for r in range(count):
+            players = [SimPlayer(f"j{r}_{i}", policy) for i in range(size)]
+            self.server.process_message(players[0], {'type': 'create_room', 'username': players[0].username})
+            room = self.server.rooms[self.server.clients[players[0]]]
+            for player in players[1:]:
+                self.server.process_message(player, {'type': 'join_room', 'username': player.username,
+                                                     'room_id': room.room_id})
+            self.rooms.append(room)
+            self.players[room.room_id] = players
+
+    def start_games(self):
+        for room in self.rooms:
+            self.server.process_message(self.players[room.room_id][0], {'type': 'start_game'})
+
+    def set_phase(self, phase: GamePhase):
+        for room in self.rooms:
+            room.current_phase = phase
+
+
+def case_resolve_votes(bench: Bench) -> Callable[[int], None]:
+    for room in bench.rooms:
+        players = bench.players[room.room_id]
+        for i, voter in enumerate(players):
+            room.votes[voter] = players[(i % 3)]  # Trois joueurs se partagent les votes
+    rooms = bench.rooms
+    return lambda i: rooms[i % len(rooms)].resolve_votes()
+
+
+def case_check_victory(bench: Bench) -> Callable[[int], None]:
+    rooms = bench.rooms
+    return lambda i: rooms[i % len(rooms)].check_victory()
+
+
+def case_get_players_info(bench: Bench) -> Callable[[int], None]:
+    rooms = bench.rooms
+    return lambda i: rooms[i % len(rooms)].get_players_info()
+
+
+def case_next_phase(bench: Bench) -> Callable[[int], None]:
+    rooms = bench.rooms
+    return lambda i: rooms[i % len(rooms)].next_phase()
+
+
+def case_broadcast_to_room(bench: Bench) -> Callable[[int], None]:
+    server = bench.server
+    room_ids = [room.room_id for room in bench.rooms]
+    message = {'type': 'phase_change', 'phase': 'day_vote'}
+    return lambda i: server.broadcast_to_room(room_ids[i % len(room_ids)], message)
+
+
+def case_msg_chat(bench: Bench) -> Callable[[int], None]:
+    server = bench.server
+    senders = [bench.players[room.room_id][0] for room in bench.rooms]
+    message = {'type': 'chat', 'username': 'j', 'content': "Bonjour tout le monde"}
+    return lambda i: server.process_message(senders[i % len(senders)], message)
+
+
+def case_msg_create_room(bench: Bench) -> Callable[[int], None]:
+    """create_room suivi de la déconnexion du créateur (la room est supprimée)"""
+    server = bench.server
+    player = SimPlayer("nouveau", Policy())
+
+    def op(i):
+        server.process_message(player, {'type': 'create_room', 'username': 'nouveau'})
+        server.process_message(player, {'type': 'disconnect'})
+    return op
+
+
+def case_msg_join_room(bench: Bench) -> Callable[[int], None]:
+    """join_room dans une room non pleine puis déconnexion du joueur"""
+    server = bench.server
+    for room in bench.rooms:
+        room.max_players = 17
+    room_ids = [room.room_id for room in bench.rooms]
+    player = SimPlayer("invite", Policy())
+
+    def op(i):
+        server.process_message(player, {'type': 'join_room', 'username': 'invite',
+                                        'room_id': room_ids[i % len(room_ids)]})
+        server.process_message(player, {'type': 'disconnect'})
+    return op
+
+
+def case_msg_start_game(bench: Bench) -> Callable[[int], None]:
+    """start_game, puis remise de la room en attente"""
+    server = bench.server
+    rooms = bench.rooms
+
+    def op(i):
+        room = rooms[i % len(rooms)]
+        server.process_message(bench.players[room.room_id][0], {'type': 'start_game'})
+        room.game_started = False
+        room.current_phase = GamePhase.WAITING
+        if room.phase_timer:
+            room.phase_timer.cancel()
+            room.phase_timer = None
+    return op
+
+
+def case_msg_night_action(bench: Bench) -> Callable[[int], None]:
+    """Attaque des loups (clôt la phase), puis retour en phase des loups et victime ressuscitée"""
+    server = bench.server
+    rooms = bench.rooms
+    actors = {}
+    for room in rooms:
+        wolf = next(iter(room.players_by_role[Role.LOUP_GAROU]))
+        target = next(s for s, p in room.players.items() if p.role != Role.LOUP_GAROU)
+        actors[room.room_id] = (wolf, room.players[target], {
+            'type': 'night_action', 'action': 'kill', 'target': room.players[target].username})
+
+    def op(i):
+        room = rooms[i % len(rooms)]
+        room.current_phase = GamePhase.NIGHT_LOUP
+        room.victim_socket = None
+        wolf, target, message = actors[room.room_id]
+        server.process_message(wolf, message)
+        if not target.is_alive:
+            target.is_alive = True
+            room.update_alive_counts(target, 1)
+        room.winner = None
+    return op
+
+
+def case_msg_vote(bench: Bench) -> Callable[[int], None]:
+    """Vote accepté (sans clore la phase), puis annulation du vote"""
+    server = bench.server
+    bench.set_phase(GamePhase.DAY_VOTE)
+    rooms = bench.rooms
+    voters = {}
+    for room in rooms:
+        players = bench.players[room.room_id]
+        voters[room.room_id] = (players[1], {'type': 'vote', 'target': players[2].username})
+
+    def op(i):
+        room = rooms[i % len(rooms)]
+        voter, message = voters[room.room_id]
+        server.process_message(voter, message)
+        room.votes.pop(voter, None)
+        room.players[voter].has_voted = False
+    return op
+
+
+# Cas mesurés sur des rooms en attente, puis (après start_game) sur des parties en cours.
+# Les deux groupes partagent les mêmes rooms : construire 10 000 rooms coûte plusieurs secondes.
+LOBBY_CASES = {
+    'get_players_info': case_get_players_info,
+    'broadcast_to_room': case_broadcast_to_room,
+    'process_message:chat': case_msg_chat,
+    'process_message:create_room+disconnect': case_msg_create_room,
+    'process_message:join_room+disconnect': case_msg_join_room,
+    'process_message:start_game': case_msg_start_game,
+}
+GAME_CASES = {
+    'resolve_votes': case_resolve_votes,
+    'check_victory': case_check_victory,
+    'process_message:night_action': case_msg_night_action,
+    'process_message:vote': case_msg_vote,
+    'next_phase': case_next_phase,
+}
+CASES = {**LOBBY_CASES, **GAME_CASES}
+
+
+def calibration_op(i: int):
+    """Charge de référence fixe (dict, str, json) : mesurée avant chaque cas pour corriger
+    les variations de vitesse de la machine entre deux exécutions"""
+    state = {'username': f"joueur{i % 16}", 'role': None, 'is_alive': True}
+    json.dumps([state, state, state])
+
+
+CALIBRATION_OPS = 1000
+
+
+def measure(op: Callable[[int], None], ops: int, repeats: int) -> Tuple[float, float]:
+    """Meilleurs temps par opération (ns) du cas et de la calibration.
+
+    Les séries du cas et de la calibration alternent pour subir les mêmes variations de vitesse
+    de la machine ; le GC est coupé pendant la mesure, comme avec timeit.
+    """
+    best = unit = float('inf')
+    gc.collect()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            start = time.perf_counter_ns()
+            for i in range(CALIBRATION_OPS):
+                calibration_op(i)
+            unit = min(unit, (time.perf_counter_ns() - start) / CALIBRATION_OPS)
+            start = time.perf_counter_ns()
+            for i in range(ops):
+                op(i)
+            best = min(best, (time.perf_counter_ns() - start) / ops)
+    finally:
+        gc.enable()
+    return best, unit
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES))
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--rooms', type=int, nargs='+', default=ROOM_COUNTS)
+    parser.add_argument('--ops', type=int, default=1000, help="Opérations par série")
+    parser.add_argument('--repeats', type=int, default=9)
+    parser.add_argument('--baseline', default=BASELINE)
+    parser.add_argument('--threshold', type=float, default=0.5,
+                        help="Régression tolérée par rapport à la référence (0.5 = +50 %%)")
+    parser.add_argument('--save', action='store_true', help="Enregistre les résultats comme référence")
+    args = parser.parse_args()
+    args.cases = [name for name in CASES if name in args.cases]  # Salle d'attente d'abord
+
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    for count in args.rooms:
+        for size in args.sizes:
+            bench = Bench(size, count)
+            for name in args.cases:
+                if name in GAME_CASES and not bench.rooms[0].game_started:
+                    bench.start_games()
+                op = CASES[name](bench)
+                ns, unit = measure(op, max(args.ops, min(count, 10000)), args.repeats)
+                key = f"{name}|players={size}|rooms={count}"
+                results[key] = {'ns': round(ns, 1), 'relative': round(ns / unit, 3)}
+                line = f"{key:<64} {ns / 1000:10.2f} µs/op"
+                reference = baseline.get(key)
+                if reference:
+                    # Comparaison en unités de calibration plutôt qu'en nanosecondes
+                    ratio = (ns / unit) / reference['relative']
+                    line += f"  ({ratio - 1:+.0%} vs référence)"
+                    if ratio > 1 + args.threshold:
+                        regressions.append(key)
+                        line += "  RÉGRESSION"
+                print(line, flush=True)
+
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Référence enregistrée dans {args.baseline}")
+    elif regressions:
+        print(f"{len(regressions)} régression(s) au-delà de +{args.threshold:.0%}:")
+        for key in regressions:
+            print(f"  {key}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
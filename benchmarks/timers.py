@@ -0,0 +1,82 @@
+"""Coût des timers de phase : un threading.Timer par phase contre la roue de timers partagée.
+
+Simule `rooms` parties qui changent de phase `phases` fois : chaque changement annule le
+timer courant et en arme un nouveau (comme check_phase_completion).
+
+    python -m benchmarks.timers --rooms 2000 --phases 10
+"""
+import argparse
+import threading
+import time
+import tracemalloc
+
+from timer_wheel import TimerWheel
+
+PHASE_DURATION = 30.0
+
+
+def noop():
+    pass
+
+
+def churn_threading(rooms: int, phases: int):
+    timers = [None] * rooms
+    peak_threads = 0
+    start = time.perf_counter()
+    for _ in range(phases):
+        for room in range(rooms):
+            if timers[room]:
+                timers[room].cancel()
+            timers[room] = threading.Timer(PHASE_DURATION, noop)
+            timers[room].daemon = True
+            timers[room].start()
+        peak_threads = max(peak_threads, threading.active_count())
+    elapsed = time.perf_counter() - start
+    for timer in timers:
+        timer.cancel()
+    return elapsed, peak_threads
+
+
+def churn_wheel(rooms: int, phases: int):
+    wheel = TimerWheel()
+    stop = threading.Event()
+    threading.Thread(target=wheel.run, args=(stop,), daemon=True).start()
+    timers = [None] * rooms
+    peak_threads = 0
+    start = time.perf_counter()
+    for _ in range(phases):
+        for room in range(rooms):
+            if timers[room]:
+                timers[room].cancel()
+            timers[room] = wheel.schedule(PHASE_DURATION, noop)
+        peak_threads = max(peak_threads, threading.active_count())
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return elapsed, peak_threads
+
+
+def measure(label: str, func, rooms: int, phases: int):
+    tracemalloc.start()
+    elapsed, peak_threads = func(rooms, phases)
+    _, peak_memory = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    ops = rooms * phases
+    print(f"{label:<16} {ops / elapsed:12,.0f} armements/s  {elapsed * 1e6 / ops:8.2f} µs/op  "
+          f"threads max={peak_threads:5d}  mémoire max={peak_memory / 1024:8.0f} Ko")
+    # Laisse les threads annulés se terminer avant la mesure suivante
+    while threading.active_count() > 1:
+        time.sleep(0.05)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rooms', type=int, default=2000)
+    parser.add_argument('--phases', type=int, default=10)
+    args = parser.parse_args()
+    print(f"{args.rooms} rooms x {args.phases} changements de phase")
+    measure("threading.Timer", churn_threading, args.rooms, args.phases)
+    measure("TimerWheel", churn_wheel, args.rooms, args.phases)
+
+
+if __name__ == '__main__':
+    main()
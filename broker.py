@@ -0,0 +1,255 @@
+"""Annuaire des nœuds et des rooms pour un déploiement sur plusieurs machines.
+
+Chaque nœud (un LoupGarouServer) s'enregistre avec l'adresse où les clients peuvent le
+joindre, envoie des battements de cœur et réserve d'avance les codes de ses rooms (une petite
+réserve, comptée dans sa charge comme des rooms, voir CLAIM_POOL dans server.py). La passerelle
+(gateway.py) y cherche le nœud qui possède une room, ou le nœud le moins chargé pour en créer
+une. Un nœud qui ne donne plus de nouvelles est oublié avec ses rooms : les nouvelles rooms
+vont sur les nœuds restants.
+
+Broker est l'interface ; LocalBroker la garde en mémoire. BrokerServer la publie sur un
+socket Unix pour que plusieurs processus la partagent (RemoteBroker côté client), en
+attendant un vrai broker de messages.
+"""
+import os
+import socket
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from protocol import FrameDecoder, encode_frame, RECV_SIZE
+
+HEARTBEAT_INTERVAL = 2.0  # Secondes entre deux battements de cœur d'un nœud
+NODE_TIMEOUT = 6.0  # Un nœud silencieux depuis ce délai est considéré comme mort
+BROKER_TIMEOUT = 1.0  # Secondes d'attente d'une réponse du broker avant de le considérer en panne
+
+
+class Broker:
+    """Interface d'annuaire : enregistrement des nœuds, propriété des rooms, pannes"""
+
+    def register_node(self, node_id: str, address: str):
+        raise NotImplementedError
+
+    def unregister_node(self, node_id: str):
+        raise NotImplementedError
+
+    def heartbeat(self, node_id: str) -> bool:
+        """Signale que le nœud est vivant ; False si le broker ne le connaît pas (ou plus)"""
+        raise NotImplementedError
+
+    def live_nodes(self) -> Dict[str, str]:
+        """Nœuds vivants : node_id -> adresse"""
+        raise NotImplementedError
+
+    def choose_node(self) -> Optional[Tuple[str, str]]:
+        """Nœud (node_id, adresse) qui doit accueillir une nouvelle room"""
+        raise NotImplementedError
+
+    def claim_room(self, room_id: str, node_id: str) -> bool:
+        """Réserve un code de room pour un nœud ; False s'il appartient déjà à un autre"""
+        raise NotImplementedError
+
+    def release_room(self, room_id: str, node_id: str):
+        raise NotImplementedError
+
+    def lookup_room(self, room_id: str) -> Optional[str]:
+        """Adresse du nœud qui possède la room, ou None"""
+        raise NotImplementedError
+
+
+class LocalBroker(Broker):
+    """Annuaire en mémoire, partagé par les threads d'un même processus"""
+
+    def __init__(self, node_timeout: float = NODE_TIMEOUT, clock: Callable[[], float] = time.monotonic):
+        self.node_timeout = node_timeout
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.nodes: Dict[str, str] = {}  # node_id -> adresse
+        self.last_seen: Dict[str, float] = {}
+        self.rooms: Dict[str, str] = {}  # room_id -> node_id
+        self.room_counts: Dict[str, int] = {}  # node_id -> nombre de rooms
+
+    def expire_nodes(self):
+        """Oublie les nœuds silencieux et leurs rooms (appelée avec le verrou)"""
+        deadline = self.clock() - self.node_timeout
+        for node_id in [n for n, seen in self.last_seen.items() if seen < deadline]:
+            print(f"Nœud {node_id} sans nouvelles, ses rooms sont abandonnées")
+            self.forget_node(node_id)
+
+    def forget_node(self, node_id: str):
+        self.nodes.pop(node_id, None)
+        self.last_seen.pop(node_id, None)
+        if self.room_counts.pop(node_id, 0):
+            self.rooms = {room_id: owner for room_id, owner in self.rooms.items() if owner != node_id}
+
+    def register_node(self, node_id: str, address: str):
+        with self.lock:
+            self.nodes[node_id] = address
+            self.last_seen[node_id] = self.clock()
+            self.room_counts.setdefault(node_id, 0)
+
+    def unregister_node(self, node_id: str):
+        with self.lock:
+            self.forget_node(node_id)
+
+    def heartbeat(self, node_id: str) -> bool:
+        with self.lock:
+            if node_id not in self.nodes:
+                return False
+            self.last_seen[node_id] = self.clock()
+            return True
+
+    def live_nodes(self) -> Dict[str, str]:
+        with self.lock:
+            self.expire_nodes()
+            return dict(self.nodes)
+
+    def choose_node(self) -> Optional[Tuple[str, str]]:
+        with self.lock:
+            self.expire_nodes()
+            if not self.nodes:
+                return None
+            node_id = min(self.nodes, key=lambda n: self.room_counts.get(n, 0))
+            return node_id, self.nodes[node_id]
+
+    def claim_room(self, room_id: str, node_id: str) -> bool:
+        with self.lock:
+            owner = self.rooms.get(room_id)
+            if owner is not None and owner != node_id and owner in self.nodes:
+                return False
+            if owner != node_id:
+                if owner is not None:
+                    self.room_counts[owner] = self.room_counts.get(owner, 1) - 1
+                self.rooms[room_id] = node_id
+                self.room_counts[node_id] = self.room_counts.get(node_id, 0) + 1
+            return True
+
+    def release_room(self, room_id: str, node_id: str):
+        with self.lock:
+            if self.rooms.get(room_id) == node_id:
+                del self.rooms[room_id]
+                self.room_counts[node_id] = self.room_counts.get(node_id, 1) - 1
+
+    def lookup_room(self, room_id: str) -> Optional[str]:
+        with self.lock:
+            self.expire_nodes()
+            node_id = self.rooms.get(room_id)
+            return self.nodes.get(node_id) if node_id is not None else None
+
+
+class BrokerServer:
+    """Publie un Broker sur un socket Unix (un thread par client, requêtes JSON tramées)"""
+
+    OPERATIONS = ('register_node', 'unregister_node', 'heartbeat', 'live_nodes', 'choose_node',
+                  'claim_room', 'release_room', 'lookup_room')
+
+    def __init__(self, path: str, broker: Optional[Broker] = None):
+        self.path = path
+        self.broker = broker if broker is not None else LocalBroker()
+        if os.path.exists(path):
+            os.unlink(path)  # Socket laissé par une exécution précédente
+        self.server_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server_socket.bind(path)
+        self.server_socket.listen()
+
+    def serve_forever(self):
+        while True:
+            client_socket, _ = self.server_socket.accept()
+            threading.Thread(target=self.handle_client, args=(client_socket,), daemon=True).start()
+
+    def start(self) -> threading.Thread:
+        """Sert en arrière-plan (broker hébergé par la passerelle)"""
+        thread = threading.Thread(target=self.serve_forever, name="broker", daemon=True)
+        thread.start()
+        return thread
+
+    def handle_client(self, client_socket: socket.socket):
+        decoder = FrameDecoder()
+        try:
+            while True:
+                data = client_socket.recv(RECV_SIZE)
+                if not data:
+                    break
+                for request in decoder.feed(data):
+                    op = request.get('op')
+                    if op not in self.OPERATIONS:
+                        response = {'error': f"Opération inconnue: {op}"}
+                    else:
+                        response = {'result': getattr(self.broker, op)(*request.get('args', ()))}
+                    client_socket.sendall(encode_frame(response))
+        except Exception as e:
+            print(f"Erreur broker: {e}")
+        finally:
+            client_socket.close()
+
+
+class RemoteBroker(Broker):
+    """Client d'un BrokerServer : appels bloquants (au plus `timeout` secondes), une requête à la fois"""
+
+    def __init__(self, path: str, timeout: float = BROKER_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.sock: Optional[socket.socket] = None
+        self.decoder = FrameDecoder()
+
+    def call(self, op: str, *args):
+        with self.lock:
+            for attempt in range(2):  # Une reconnexion si le broker a redémarré
+                try:
+                    if self.sock is None:
+                        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                        self.sock.settimeout(self.timeout)  # Un broker muet ne bloque pas le nœud
+                        self.sock.connect(self.path)
+                        self.decoder = FrameDecoder()
+                    self.sock.sendall(encode_frame({'op': op, 'args': list(args)}))
+                    while True:
+                        data = self.sock.recv(RECV_SIZE)
+                        if not data:
+                            raise ConnectionError("Broker déconnecté")
+                        responses = self.decoder.feed(data)
+                        if responses:
+                            break
+                except OSError as e:
+                    # Socket fermé : une réponse arrivée en retard ne sera pas prise pour la suivante
+                    if self.sock is not None:
+                        self.sock.close()
+                        self.sock = None
+                    if attempt or isinstance(e, socket.timeout):
+                        raise  # Pas de deuxième attente si le broker ne répond pas
+                    continue
+                response = responses[0]
+                if 'error' in response:
+                    raise ValueError(response['error'])
+                return response['result']
+
+    def register_node(self, node_id: str, address: str):
+        self.call('register_node', node_id, address)
+
+    def unregister_node(self, node_id: str):
+        self.call('unregister_node', node_id)
+
+    def heartbeat(self, node_id: str) -> bool:
+        return self.call('heartbeat', node_id)
+
+    def live_nodes(self) -> Dict[str, str]:
+        return self.call('live_nodes')
+
+    def choose_node(self) -> Optional[Tuple[str, str]]:
+        result = self.call('choose_node')
+        return tuple(result) if result else None
+
+    def claim_room(self, room_id: str, node_id: str) -> bool:
+        return self.call('claim_room', room_id, node_id)
+
+    def release_room(self, room_id: str, node_id: str):
+        self.call('release_room', room_id, node_id)
+
+    def lookup_room(self, room_id: str) -> Optional[str]:
+        return self.call('lookup_room', room_id)
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    """'hôte:port' -> (hôte, port)"""
+    host, _, port = address.rpartition(':')
+    return host, int(port)
@@ -0,0 +1,123 @@
+"""Canal de chat des rooms : limite de débit par connexion et regroupement des lignes.
+
+Chaque connexion a un seau à jetons (débit moyen + rafale) : un client qui spamme voit ses
+messages ignorés au lieu de saturer la room. La première ligne d'une room part tout de suite
+et ouvre une fenêtre (20 ms par défaut) ; les lignes reçues pendant la fenêtre sont envoyées
+ensemble à sa fermeture, en une seule trame `chat_batch` par destinataire.
+"""
+import time
+from typing import Callable, Dict, List
+
+CHAT_RATE = 2.0  # Messages par seconde et par connexion (débit moyen)
+CHAT_BURST = 8  # Messages acceptés d'affilée avant limitation
+CHAT_WINDOW = 0.02  # Fenêtre de regroupement en secondes (0 = pas de regroupement)
+
+
+class TokenBucket:
+    """Seau à jetons : `rate` jetons par seconde, au plus `burst` en réserve"""
+    __slots__ = ('rate', 'burst', 'tokens', 'updated', 'limited')
+
+    def __init__(self, rate: float, burst: int, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = now
+        self.limited = False  # Le client a déjà été prévenu de la limitation
+
+    def consume(self, now: float) -> bool:
+        """Prend un jeton si possible, retourne False si le débit est dépassé"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class ChatChannel:
+    """Chat de toutes les rooms d'un serveur.
+
+    Les méthodes post() et flush() s'exécutent dans la boîte aux lettres de la room : l'état
+    d'une room (sa fenêtre en cours) n'est jamais modifié par deux threads à la fois.
+    """
+
+    def __init__(self, server, rate: float = CHAT_RATE, burst: int = CHAT_BURST,
+                 window: float = CHAT_WINDOW, clock: Callable[[], float] = time.monotonic):
+        self.server = server
+        self.rate = rate  # 0 = pas de limite
+        self.burst = burst
+        self.window = window
+        self.clock = clock
+        self.buckets: Dict[object, TokenBucket] = {}  # connexion -> seau
+        self.pending: Dict[str, List[dict]] = {}  # room_id -> lignes de la fenêtre ouverte
+
+        # Compteurs
+        self.received = 0
+        self.dropped = 0  # Refusés par la limite de débit
+        self.coalesced = 0  # Envoyés dans un chat_batch plutôt que seuls
+        self.frames = 0  # Trames de chat diffusées (chat ou chat_batch)
+
+    def allow(self, connection) -> bool:
+        """Applique la limite de débit de la connexion"""
+        if self.rate <= 0:
+            return True
+        now = self.clock()
+        bucket = self.buckets.get(connection)
+        if bucket is None:
+            bucket = self.buckets[connection] = TokenBucket(self.rate, self.burst, now)
+        if bucket.consume(now):
+            bucket.limited = False
+            return True
+        self.dropped += 1
+        if not bucket.limited:
+            bucket.limited = True  # Un seul avertissement par série de messages refusés
+            self.server.send_to_player(connection, {
+                'type': 'chat_rate_limited',
+                'message': "Vous envoyez trop de messages, ils sont ignorés"
+            })
+        return False
+
+    def post(self, room, connection, username: str, content: str):
+        """Reçoit une ligne de chat d'un joueur de la room"""
+        self.received += 1
+        if not self.allow(connection):
+            return
+        line = {'type': 'chat', 'username': username, 'content': content}
+        if self.window <= 0:
+            self.send(room, [line])
+            return
+
+        pending = self.pending.get(room.room_id)
+        if pending is None:
+            # Pas de fenêtre ouverte : la ligne part tout de suite et en ouvre une
+            self.send(room, [line])
+            self.open_window(room)
+        else:
+            pending.append(line)
+
+    def open_window(self, room):
+        self.pending[room.room_id] = []
+        self.server.schedule_timer(self.window, lambda: room.submit(self.flush, room))
+
+    def flush(self, room):
+        """Fin de fenêtre : envoie les lignes accumulées (exécutée dans la boîte aux lettres)"""
+        lines = self.pending.pop(room.room_id, None)
+        if not lines or room.closed:
+            return
+        self.send(room, lines)
+        self.open_window(room)  # Le chat est actif : on continue de regrouper
+
+    def send(self, room, lines: List[dict]):
+        self.frames += 1
+        if len(lines) == 1:
+            self.server.broadcast_to_room(room.room_id, lines[0])
+            return
+        self.coalesced += len(lines)
+        self.server.broadcast_to_room(room.room_id, {
+            'type': 'chat_batch',
+            'messages': [{'username': line['username'], 'content': line['content']} for line in lines]
+        })
+
+    def forget(self, connection):
+        """Oublie le seau d'une connexion fermée"""
+        self.buckets.pop(connection, None)
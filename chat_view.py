@@ -0,0 +1,132 @@
+"""Zone de chat du client : historique borné et affichage de la seule partie visible.
+
+Les lignes vont dans un tampon circulaire (ChatLog, `max_lines` lignes au plus) : les plus
+anciennes sont oubliées, la mémoire du client ne grandit plus avec la durée de la partie.
+
+Le widget Text ne contient que les lignes de la fenêtre visible. Faire défiler (barre ou
+molette) remplace ce contenu, sans jamais insérer tout l'historique. Les lignes reçues sont mises
+de côté et ajoutées toutes ensemble FLUSH_DELAY ms plus tard : une rafale (chat_batch, fin de
+nuit) coûte un seul rafraîchissement au lieu d'un par ligne.
+"""
+import tkinter as tk
+from collections import deque
+from tkinter import ttk
+from typing import List
+
+CHAT_LINES = 500  # Lignes gardées en mémoire
+FLUSH_DELAY = 50  # Millisecondes pendant lesquelles les lignes reçues sont regroupées
+WHEEL_LINES = 3  # Lignes par cran de molette
+
+
+class ChatLog:
+    """Tampon circulaire des dernières lignes du chat"""
+
+    def __init__(self, max_lines: int = CHAT_LINES):
+        self.lines = deque(maxlen=max(1, max_lines))
+
+    def extend(self, lines: List[str]):
+        self.lines.extend(lines)
+
+    def window(self, top: int, count: int) -> List[str]:
+        """Lignes [top, top + count) (les plus anciennes ont l'indice 0)"""
+        lines = self.lines
+        return [lines[i] for i in range(top, min(top + count, len(lines)))]
+
+    def clear(self):
+        self.lines.clear()
+
+    def __len__(self) -> int:
+        return len(self.lines)
+
+
+class ChatView:
+    """Text + barre de défilement branchés sur un ChatLog"""
+
+    def __init__(self, parent, root, max_lines: int = CHAT_LINES, height: int = 20, width: int = 40):
+        self.root = root
+        self.log = ChatLog(max_lines)
+        self.pending: List[str] = []  # Reçues, pas encore ajoutées au tampon
+        self.flush_scheduled = False
+        self.visible = height  # Lignes affichables, recalculé quand le widget change de taille
+        self.top = 0  # Indice dans le tampon de la première ligne affichée
+        self.follow = True  # Collé en bas : les nouvelles lignes sont montrées
+
+        self.scrollbar = ttk.Scrollbar(parent, orient=tk.VERTICAL, command=self.yview)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.text = tk.Text(parent, height=height, width=width, state='disabled', wrap='word')
+        self.text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.text.bind('<Configure>', self.on_resize)
+        self.text.bind('<MouseWheel>', lambda e: self.scroll(-WHEEL_LINES if e.delta > 0 else WHEEL_LINES))
+        self.text.bind('<Button-4>', lambda e: self.scroll(-WHEEL_LINES))  # Molette sous X11
+        self.text.bind('<Button-5>', lambda e: self.scroll(WHEEL_LINES))
+
+    def append(self, line: str):
+        """Ajoute une ligne ; l'affichage est rafraîchi une fois pour toute la rafale"""
+        self.pending.append(line)
+        if not self.flush_scheduled:
+            self.flush_scheduled = True
+            self.root.after(FLUSH_DELAY, self.flush)
+
+    def flush(self):
+        self.flush_scheduled = False
+        if not self.pending:
+            return
+        pending, self.pending = self.pending, []
+        before = len(self.log)
+        self.log.extend(pending)
+        if self.follow:
+            self.top = max(0, len(self.log) - self.visible)
+        else:
+            # Lignes anciennes oubliées par le tampon : la fenêtre garde les mêmes lignes à l'écran
+            dropped = before + len(pending) - len(self.log)
+            self.top = max(0, self.top - dropped)
+        self.render()
+
+    def clear(self):
+        self.pending = []
+        self.log.clear()
+        self.top = 0
+        self.follow = True
+        self.render()
+
+    def render(self):
+        """Remplace le contenu du Text par la fenêtre visible"""
+        lines = self.log.window(self.top, self.visible)
+        self.text.config(state='normal')
+        self.text.delete('1.0', 'end')
+        self.text.insert('end', '\n'.join(lines))
+        if self.follow:
+            self.text.see('end')  # Lignes longues repliées : la dernière reste visible
+        self.text.config(state='disabled')
+        total = len(self.log)
+        if total:
+            self.scrollbar.set(self.top / total, min(1.0, (self.top + len(lines)) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def scroll(self, lines: int):
+        self.move_to(self.top + lines)
+        return 'break'  # Le Text ne défile pas tout seul
+
+    def move_to(self, top: int):
+        last = max(0, len(self.log) - self.visible)
+        self.top = min(max(0, top), last)
+        self.follow = self.top == last
+        self.render()
+
+    def yview(self, *args):
+        """Commande de la barre de défilement : ('moveto', fraction) ou ('scroll', n, unité)"""
+        if args[0] == 'moveto':
+            self.move_to(round(float(args[1]) * len(self.log)))
+        elif args[0] == 'scroll':
+            step = self.visible if args[2] == 'pages' else 1
+            self.move_to(self.top + int(args[1]) * step)
+
+    def on_resize(self, event):
+        linespace = self.text.tk.call('font', 'metrics', self.text.cget('font'), '-linespace')
+        visible = max(1, event.height // max(1, int(linespace)))
+        if visible != self.visible:
+            self.visible = visible
+            if self.follow:
+                self.top = max(0, len(self.log) - self.visible)
+            self.render()
@@ -0,0 +1,173 @@
+"""Annuaire public des rooms : la réponse à list_rooms sans parcourir self.rooms.
+
+    {'type': 'list_rooms', 'status': 'waiting', 'min_players': 6, 'max_players': 16,
+     'page': 0, 'page_size': 20}
+
+Les rooms sont rangées par (statut, nombre de joueurs) dans des groupes tenus à jour par
+add_player, remove_player, start_game, start_phase, end_game et la suppression de la room. Deux
+statuts : `waiting` (salle d'attente où il reste de la place) et `playing` (partie en cours, à
+regarder en spectateur, avec sa phase). Les salles pleines et les parties terminées ne sont pas
+listées.
+
+update() ne fait que noter la room (deque.append, sans verrou) : ces appels sont sur le chemin
+de create_room, join_room et des départs. Les rooms notées sont rangées au prochain list_rooms,
+ou par lots de APPLY_BATCH, chacune en O(1) (ajout en fin de groupe, retrait par échange avec
+le dernier). Une room n'est notée qu'une fois entre deux rangements : créée, quittée puis
+fermée entre deux list_rooms, elle ne coûte presque rien.
+
+Une page parcourt les groupes du filtre, les plus remplis d'abord : les salles presque prêtes
+sont en tête. Elle est encodée une fois et réutilisée tant qu'aucun groupe du filtre n'a changé
+(chaque groupe a un numéro de version) : une requête coûte alors la lecture de 16 versions.
+Avec --workers ou la passerelle, chaque serveur ne liste que ses propres rooms.
+"""
+import threading
+from collections import deque
+from typing import Dict, List, Tuple
+
+from protocol import encode_frame
+
+STATUSES = ('waiting', 'playing')
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+MAX_PLAYERS = 16
+CACHED_PAGES = 1024  # Au-delà, le cache est vidé (combinaisons de filtres trop variées)
+APPLY_BATCH = 1024  # Rooms notées au-delà desquelles update() range tout de suite
+
+
+class Group:
+    """Rooms d'un même statut avec le même nombre de joueurs"""
+    __slots__ = ('rows', 'version')
+
+    def __init__(self):
+        self.rows: List[Tuple[str, int, str]] = []  # (room_id, max_players, phase), sans ordre particulier
+        self.version = 0  # Incrémenté à chaque changement : invalide les pages en cache
+
+
+class RoomDirectory:
+    """Index des rooms listables et pages encodées de list_rooms.
+
+    update() s'exécute dans la boîte aux lettres de la room, query() sur le thread de la
+    connexion : le rangement, les groupes et le cache sont protégés par un verrou.
+    """
+
+    def __init__(self):
+        # statut -> groupes indexés par nombre de joueurs ; jamais supprimés (versions conservées)
+        self.groups: Dict[str, List[Group]] = {
+            status: [Group() for _ in range(MAX_PLAYERS + 1)] for status in STATUSES}
+        self.where: Dict[str, Tuple[Group, int]] = {}  # room_id -> (groupe, position)
+        self.changed = deque()  # Rooms modifiées depuis le dernier rangement
+        self.pages: Dict[tuple, Tuple[tuple, dict, bytes]] = {}  # filtre -> (versions, message, trame)
+        self.lock = threading.Lock()
+
+        # Compteurs
+        self.updates = 0  # Déplacements d'une room entre groupes
+        self.hits = 0  # Pages servies depuis le cache
+        self.misses = 0  # Pages construites
+
+    def update(self, room):
+        """Note que la room a changé ; elle sera rangée au prochain list_rooms"""
+        if room.directory_pending:
+            return  # Déjà notée : elle sera rangée d'après son état au moment du rangement
+        room.directory_pending = True
+        self.changed.append(room)
+        if len(self.changed) >= APPLY_BATCH:
+            with self.lock:
+                self.apply()
+
+    def apply(self):
+        """Range les rooms notées d'après leur état actuel (verrou pris)"""
+        changed = self.changed
+        while changed:
+            room = changed.popleft()
+            room.directory_pending = False  # Avant de lire l'état : un changement suivant la renote
+            count = len(room.players)
+            group = None
+            if not (room.closed or room.winner) and 0 < count <= MAX_PLAYERS:
+                if room.game_started:
+                    group = self.groups['playing'][count]
+                elif count < room.max_players:  # Salle pleine : pas listée
+                    group = self.groups['waiting'][count]
+            place = self.where.get(room.room_id)
+            if place is None and group is None:
+                continue  # Ni listée ni à lister (room créée puis fermée, notée deux fois...)
+            phase = room.current_phase.value if room.game_started else 'waiting'
+            if place is not None:
+                if place[0] is group:
+                    if group.rows[place[1]][2] != phase:
+                        group.rows[place[1]] = (room.room_id, room.max_players, phase)
+                        group.version += 1
+                    continue
+                self.take(room.room_id, place)
+            if group is not None:
+                self.where[room.room_id] = (group, len(group.rows))
+                group.rows.append((room.room_id, room.max_players, phase))
+                group.version += 1
+            self.updates += 1
+
+    def take(self, room_id: str, place: Tuple[Group, int]):
+        """Retire la room de son groupe : la dernière prend sa place (verrou pris)"""
+        group, index = place
+        del self.where[room_id]
+        last = group.rows.pop()
+        if index < len(group.rows):
+            group.rows[index] = last
+            self.where[last[0]] = (group, index)
+        group.version += 1
+
+    def query(self, message: dict) -> Tuple[dict, bytes]:
+        """Page demandée par un message list_rooms : (message, trame déjà encodée)"""
+        status = message.get('status', 'waiting')
+        if status not in STATUSES:
+            status = 'waiting'
+        low = clamp(message.get('min_players'), 1, MAX_PLAYERS, 1)
+        high = clamp(message.get('max_players'), low, MAX_PLAYERS, MAX_PLAYERS)
+        page = clamp(message.get('page'), 0, None, 0)
+        size = clamp(message.get('page_size'), 1, MAX_PAGE_SIZE, PAGE_SIZE)
+
+        key = (status, low, high, page, size)
+        counts = range(high, low - 1, -1)  # Les plus remplies d'abord
+        groups = [self.groups[status][count] for count in counts]
+        with self.lock:
+            self.apply()
+            stamp = tuple([group.version for group in groups])
+            cached = self.pages.get(key)
+            if cached is not None and cached[0] == stamp:
+                self.hits += 1
+                return cached[1], cached[2]
+            self.misses += 1
+
+            rows = []
+            skip = page * size
+            for count, group in zip(counts, groups):
+                if skip >= len(group.rows):
+                    skip -= len(group.rows)
+                    continue
+                for room_id, max_players, phase in group.rows[skip:skip + size - len(rows)]:
+                    rows.append({'room_id': room_id, 'players': count,
+                                 'max_players': max_players, 'phase': phase})
+                skip = 0
+                if len(rows) >= size:
+                    break
+            response = {
+                'type': 'room_list',
+                'status': status,
+                'page': page,
+                'page_size': size,
+                'total': sum(len(group.rows) for group in groups),
+                'rooms': rows
+            }
+            frame = encode_frame(response)
+            if len(self.pages) >= CACHED_PAGES:
+                self.pages.clear()
+            self.pages[key] = (stamp, response, frame)
+        return response, frame
+
+
+def clamp(value, low: int, high, default: int) -> int:
+    """Entier du message ramené dans [low, high] (high None : pas de maximum)"""
+    try:
+        value = int(value)
+    except (TypeError, ValueError, OverflowError):  # OverflowError : 1e400 (infini en JSON)
+        return default
+    value = max(low, value)
+    return value if high is None else min(value, high)
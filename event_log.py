@@ -0,0 +1,243 @@
+"""Journal des événements des rooms et archive des parties terminées.
+
+Pendant la partie, chaque changement d'état est ajouté à room.events sous la forme d'un tuple
+(heure, code, arguments) : un simple append, rien n'est encodé ni écrit à ce moment-là. À la
+fin de la partie, le journal est confié à GameArchive : un thread l'encode et l'ajoute au
+segment courant, puis écrit sa position dans l'index.
+
+L'index est un tableau d'entrées de taille fixe (segment, position, longueur) : l'entrée de
+la partie N est à l'octet N * 16 : le numéro d'une partie est la position de son entrée, donné
+par le thread d'écriture (une écriture qui échoue ne décale pas les suivantes). Segments et index
+sont lus par mmap, on peut donc relire n'importe quelle partie sans charger l'archive.
+ArchiveReader ne fait que lire : c'est lui qu'utilise la ligne de commande.
+
+    python event_log.py archive/ --list
+    python event_log.py archive/ --game 42
+"""
+import argparse
+import json
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from typing import Dict, List, Optional
+
+# Codes des événements
+EVENT_JOIN = 1  # (username,)
+EVENT_LEAVE = 2  # (username,)
+EVENT_GAME_START = 3  # (nombre de joueurs,)
+EVENT_ROLE = 4  # (username, rôle)
+EVENT_PHASE = 5  # (phase, tour)
+EVENT_NIGHT_ACTION = 6  # (username, action, cible ou cibles, réussie)
+EVENT_VOTE = 7  # (votant, cible)
+EVENT_DEATH = 8  # (username,)
+EVENT_GAME_OVER = 9  # (vainqueurs,)
+
+EVENT_NAMES = {
+    EVENT_JOIN: 'join', EVENT_LEAVE: 'leave', EVENT_GAME_START: 'game_start', EVENT_ROLE: 'role',
+    EVENT_PHASE: 'phase', EVENT_NIGHT_ACTION: 'night_action', EVENT_VOTE: 'vote',
+    EVENT_DEATH: 'death', EVENT_GAME_OVER: 'game_over',
+}
+
+INDEX_ENTRY = struct.Struct('>IQI')  # Numéro de segment, position, longueur
+SEGMENT_SIZE = 64 * 1024 * 1024  # Taille à partir de laquelle on ouvre un nouveau segment
+
+
+def new_event(code: int, args: tuple) -> tuple:
+    """Entrée du journal d'une room : (heure, code, arguments)"""
+    return time.time(), code, args
+
+
+def encode_game(room_id: str, events: List[tuple]) -> bytes:
+    """Encode le journal d'une partie (JSON compressé)"""
+    rows = [[round(t, 3), code, *args] for t, code, args in events]
+    return zlib.compress(json.dumps([room_id, rows], separators=(',', ':')).encode('utf-8'))
+
+
+def decode_game(data: bytes) -> dict:
+    room_id, rows = json.loads(zlib.decompress(data))
+    return {'room_id': room_id, 'events': [(row[0], row[1], tuple(row[2:])) for row in rows]}
+
+
+class ArchiveReader:
+    """Lecture seule d'une archive (éventuellement en cours d'écriture par un serveur)"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.index_path = os.path.join(directory, 'index')
+        self.maps: Dict[str, mmap.mmap] = {}  # Fichier -> projection en lecture
+        self.maps_lock = threading.Lock()
+
+    def segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"segment-{segment:06d}.log")
+
+    def view(self, path: str, end: int) -> Optional[mmap.mmap]:
+        """Projection du fichier couvrant au moins `end` octets (refaite si le fichier a grandi)"""
+        with self.maps_lock:
+            mapped = self.maps.get(path)
+            if mapped is None or len(mapped) < end:
+                if mapped is not None:
+                    mapped.close()
+                with open(path, 'rb') as f:
+                    if os.fstat(f.fileno()).st_size < end:
+                        return None
+                    mapped = self.maps[path] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return mapped
+
+    def __len__(self) -> int:
+        return os.path.getsize(self.index_path) // INDEX_ENTRY.size
+
+    def read_game(self, game_id: int) -> Optional[dict]:
+        """Relit une partie archivée (None si elle n'existe pas ou n'est pas encore écrite)"""
+        if game_id < 0:
+            return None
+        start = game_id * INDEX_ENTRY.size
+        index = self.view(self.index_path, start + INDEX_ENTRY.size)
+        if index is None:
+            return None
+        segment, offset, length = INDEX_ENTRY.unpack_from(index, start)
+        data = self.view(self.segment_path(segment), offset + length)
+        if data is None:
+            return None
+        game = decode_game(data[offset:offset + length])
+        game['game_id'] = game_id
+        return game
+
+    def close(self):
+        with self.maps_lock:
+            for mapped in self.maps.values():
+                mapped.close()
+            self.maps.clear()
+
+
+class GameArchive(ArchiveReader):
+    """Archive des parties terminées : segments en ajout seul et index à entrées fixes"""
+
+    def __init__(self, directory: str, segment_size: int = SEGMENT_SIZE):
+        os.makedirs(directory, exist_ok=True)
+        super().__init__(directory)
+        self.segment_size = segment_size
+
+        # Reprend après la dernière entrée complète (une écriture interrompue est ignorée)
+        with open(self.index_path, 'ab') as f:
+            size = f.tell()
+            f.truncate(size - size % INDEX_ENTRY.size)
+        self.next_id = size // INDEX_ENTRY.size  # Numéro de la prochaine partie écrite (thread d'écriture)
+        self.segment = 0
+        if self.next_id:
+            with open(self.index_path, 'rb') as f:
+                f.seek((self.next_id - 1) * INDEX_ENTRY.size)
+                self.segment = INDEX_ENTRY.unpack(f.read(INDEX_ENTRY.size))[0]
+
+        self.segment_file = open(self.segment_path(self.segment), 'ab')
+        self.index_file = open(self.index_path, 'ab')
+        self.queue: queue.Queue = queue.Queue()
+        self.writer_thread = threading.Thread(target=self._writer_loop, name="archive-writer", daemon=True)
+        self.writer_thread.start()
+
+        # Compteurs
+        self.archived = 0
+        self.bytes_written = 0
+
+    def append(self, room_id: str, events: List[tuple]):
+        """Confie le journal d'une partie au thread d'écriture (qui lui donnera son numéro)"""
+        self.queue.put((room_id, events))
+
+    def _writer_loop(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                room_id, events = item
+                self.write(room_id, events)
+            except Exception as e:
+                print(f"Erreur lors de l'archivage d'une partie: {e}")
+            finally:
+                self.queue.task_done()
+
+    def write(self, room_id: str, events: List[tuple]) -> int:
+        """Écrit une partie (thread d'écriture) ; retourne son numéro"""
+        data = encode_game(room_id, events)
+        offset = self.segment_file.tell()
+        if offset and offset + len(data) > self.segment_size:
+            self.segment_file.close()
+            self.segment += 1
+            self.segment_file = open(self.segment_path(self.segment), 'ab')
+            offset = 0
+        # Les données d'abord, l'entrée d'index ensuite : une entrée pointe toujours sur des données écrites
+        self.segment_file.write(data)
+        self.segment_file.flush()
+        try:
+            self.index_file.write(INDEX_ENTRY.pack(self.segment, offset, len(data)))
+            self.index_file.flush()
+        except OSError:
+            # Entrée peut-être écrite en partie : l'index revient à la dernière entrée complète
+            try:
+                self.index_file.close()
+            except OSError:
+                pass
+            os.truncate(self.index_path, self.next_id * INDEX_ENTRY.size)
+            self.index_file = open(self.index_path, 'ab')
+            raise
+        game_id = self.next_id
+        self.next_id += 1
+        self.archived += 1
+        self.bytes_written += len(data)
+        return game_id
+
+    def flush(self):
+        """Attend que toutes les parties confiées soient écrites"""
+        self.queue.join()
+
+    def close(self):
+        self.queue.put(None)
+        self.writer_thread.join()
+        self.segment_file.close()
+        self.index_file.close()
+        super().close()
+
+
+def format_event(start: float, event: tuple) -> str:
+    t, code, args = event
+    return f"{t - start:8.3f}s {EVENT_NAMES.get(code, code):<13} {' '.join(str(a) for a in args)}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lecture de l'archive des parties")
+    parser.add_argument('directory')
+    parser.add_argument('--game', type=int, help="Affiche les événements d'une partie")
+    parser.add_argument('--list', action='store_true', help="Liste les parties archivées")
+    args = parser.parse_args()
+
+    if not os.path.exists(os.path.join(args.directory, 'index')):
+        print(f"Aucune archive dans {args.directory}")
+        return
+    archive = ArchiveReader(args.directory)  # Lecture seule : un serveur peut écrire en même temps
+    try:
+        if args.game is not None:
+            game = archive.read_game(args.game)
+            if game is None:
+                print(f"Partie {args.game} introuvable")
+                return
+            events = game['events']
+            start = events[0][0] if events else 0
+            print(f"Partie {args.game}, room {game['room_id']}, "
+                  f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(start))}")
+            for event in events:
+                print(format_event(start, event))
+        else:
+            for game_id in range(len(archive)):
+                game = archive.read_game(game_id)
+                over = [args for _, code, args in game['events'] if code == EVENT_GAME_OVER]
+                print(f"{game_id:6d}  room {game['room_id']}  {len(game['events'])} événements  "
+                      f"vainqueurs: {over[0][0] if over else '-'}")
+    finally:
+        archive.close()
+
+
+if __name__ == '__main__':
+    main()
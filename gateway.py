@@ -0,0 +1,144 @@
+"""Passerelle sans état devant plusieurs nœuds LoupGarouServer.
+
+Les clients se connectent à la passerelle comme à un serveur. Elle lit la première trame :
+create_room et quick_join sont envoyés au nœud le moins chargé, join_room, resume et spectate au nœud qui possède la
+room (d'après le broker). Elle ouvre alors une connexion vers ce nœud, lui transmet les
+octets déjà lus puis relaie les octets dans les deux sens sans les décoder. La topologie (nœuds, rooms,
+pannes) ne vit que dans le broker : on peut lancer plusieurs passerelles.
+
+    python gateway.py --port 5000 --broker /tmp/lg-broker.sock --serve-broker
+    python server.py --port 5001 --broker /tmp/lg-broker.sock --node-id n1
+    python server.py --port 5002 --broker /tmp/lg-broker.sock --node-id n2
+"""
+import argparse
+import asyncio
+from typing import Optional
+
+from broker import Broker, BrokerServer, RemoteBroker, parse_address
+from protocol import FrameDecoder, encode_frame, RECV_SIZE
+
+MAX_INITIAL_BYTES = 64 * 1024  # Octets lus avant la première trame complète
+FIRST_FRAME_TIMEOUT = 10.0
+CONNECT_ATTEMPTS = 3  # Nœuds essayés pour créer une room si un nœud ne répond pas
+
+
+class Gateway:
+    def __init__(self, broker: Broker, host: str = 'localhost', port: int = 5000):
+        self.broker = broker
+        self.host = host
+        self.port = port
+        self.relayed = 0  # Connexions relayées vers un nœud
+
+    async def call_broker(self, op: str, *args):
+        """Appel au broker hors de la boucle (RemoteBroker est bloquant)"""
+        return await asyncio.get_running_loop().run_in_executor(None, getattr(self.broker, op), *args)
+
+    async def open_node(self, message: dict):
+        """Connexion au nœud qui doit traiter ce client, ou None si aucun ne convient"""
+        if message.get('type') in ('join_room', 'resume', 'spectate'):
+            address = await self.call_broker('lookup_room', str(message.get('room_id')))
+            if address is None:
+                return None
+            return await asyncio.open_connection(*parse_address(address))
+
+        # create_room (et tout autre premier message) : nœud le moins chargé
+        for _ in range(CONNECT_ATTEMPTS):
+            node = await self.call_broker('choose_node')
+            if node is None:
+                return None
+            node_id, address = node
+            try:
+                return await asyncio.open_connection(*parse_address(address))
+            except OSError as e:
+                # Nœud injoignable : on le retire sans attendre l'expiration de ses battements
+                print(f"Nœud {node_id} injoignable ({e}), essai d'un autre nœud")
+                await self.call_broker('unregister_node', node_id)
+        return None
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        decoder = FrameDecoder()
+        initial = bytearray()
+        node_writer = None
+        try:
+            messages = []
+            while not messages:
+                data = await asyncio.wait_for(reader.read(MAX_INITIAL_BYTES + 1), FIRST_FRAME_TIMEOUT)
+                if not data:
+                    return
+                initial += data
+                if len(initial) > MAX_INITIAL_BYTES:
+                    return
+                messages = decoder.feed(data)
+
+            node = await self.open_node(messages[0])
+            if node is None:
+                msg_type = messages[0].get('type')
+                if msg_type == 'resume':
+                    response = {'type': 'resume_failed', 'message': "Session expirée"}
+                else:
+                    response = {
+                        'type': 'room_not_found',
+                        'message': "Cette room n'existe pas" if msg_type in ('join_room', 'spectate')
+                                   else "Aucun serveur disponible"
+                    }
+                writer.write(encode_frame(response))
+                await writer.drain()
+                return
+
+            node_reader, node_writer = node
+            node_writer.write(initial)
+            self.relayed += 1
+            await asyncio.gather(self.pipe(reader, node_writer), self.pipe(node_reader, writer))
+        except (asyncio.TimeoutError, ValueError, OSError) as e:
+            print(f"Erreur passerelle: {e}")
+        finally:
+            if node_writer is not None:
+                node_writer.close()
+            writer.close()
+
+    async def pipe(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Recopie un sens de la connexion ; ferme l'autre extrémité à la fin"""
+        try:
+            while True:
+                data = await reader.read(RECV_SIZE)
+                if not data:
+                    break
+                writer.write(data)
+                await writer.drain()  # Contre-pression : on ne lit pas plus vite que l'autre côté n'écrit
+        except OSError:
+            pass
+        finally:
+            writer.close()
+
+    async def run(self):
+        server = await asyncio.start_server(self.handle_client, self.host, self.port, reuse_address=True)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Passerelle Loup-Garou multi-nœuds")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--broker', default='/tmp/lg-broker.sock', help="Socket Unix du broker")
+    parser.add_argument('--serve-broker', action='store_true',
+                        help="Héberge le broker dans ce processus (sur le socket --broker)")
+    args = parser.parse_args()
+
+    broker: Optional[Broker] = None
+    if args.serve_broker:
+        broker_server = BrokerServer(args.broker)
+        broker_server.start()
+        broker = broker_server.broker  # Accès direct, sans passer par le socket
+    else:
+        broker = RemoteBroker(args.broker)
+
+    print(f"Passerelle démarrée sur {args.host}:{args.port} (broker {args.broker})...")
+    try:
+        asyncio.run(Gateway(broker, args.host, args.port).run())
+    except KeyboardInterrupt:
+        print("Arrêt de la passerelle...")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""Cycle de vie des rooms : attribution des codes, ménage et contrôle d'admission.
+
+Les codes sont tirés dans une permutation pseudo-aléatoire de l'espace du shard (a·k + b mod n) :
+chaque tirage est en O(1), même quand l'espace est presque plein, et la mémoire ne dépend que
+du nombre de rooms vivantes. Un code libéré n'est réutilisé qu'une fois la permutation épuisée.
+
+Le ménage ne lit pas l'horloge sur le chemin des messages : toutes les `interval` secondes, il
+compare le compteur de commandes de chaque room (room.version, comme snapshot.py) à celui du
+passage précédent. Une room sans aucune commande depuis `idle_timeout` secondes (salle d'attente
+abandonnée) ou terminée depuis `finished_timeout` secondes est fermée.
+
+Au-delà du budget (--max-rooms, --max-memory), create_room et join_room sont refusés avec un
+message `server_busy` : les parties en cours continuent normalement.
+
+    python server.py --max-rooms 50000 --max-memory 2048 --idle-timeout 600
+"""
+import math
+import os
+import random
+import threading
+from collections import deque
+from typing import Dict, Optional, Set, Tuple
+
+IDLE_TIMEOUT = 600.0  # Secondes sans aucune commande avant de fermer une room
+FINISHED_TIMEOUT = 120.0  # Secondes de répit après la fin d'une partie
+REAP_INTERVAL = 30.0  # Secondes entre deux passages du ménage
+REAP_BATCH = 2000  # Rooms examinées par tick (la boucle reste disponible)
+MEMORY_INTERVAL = 2.0  # Secondes entre deux mesures de la mémoire du processus
+
+
+def resident_memory() -> int:
+    """Mémoire résidente du processus en octets (0 si inconnue)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        try:
+            import resource  # Hors Linux : pic de mémoire plutôt que mémoire courante
+            return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+        except ImportError:
+            return 0
+
+
+class RoomIdAllocator:
+    """Codes de room d'un shard : ceux de [low, high] congrus à `index` modulo `count`"""
+
+    def __init__(self, low: int, high: int, shard: Tuple[int, int] = (0, 1),
+                 rng: Optional[random.Random] = None):
+        index, count = shard
+        rng = rng or random.Random()
+        self.first = low + (index - low) % count  # Premier code de notre shard
+        self.step = count
+        self.size = max(0, (high - self.first) // count + 1)
+        # Multiplicateur premier avec la taille : k -> (a·k + b) mod n parcourt tous les codes
+        self.multiplier = 1
+        if self.size > 1:
+            while True:
+                self.multiplier = rng.randrange(1, self.size)
+                if math.gcd(self.multiplier, self.size) == 1:
+                    break
+        self.offset = rng.randrange(self.size) if self.size else 0
+        self.cursor = 0  # Codes déjà tirés de la permutation
+        self.released = deque()  # Codes rendus, réutilisés après la permutation
+        self.in_use: Set[str] = set()
+        self.lock = threading.Lock()
+
+    def allocate(self) -> Optional[str]:
+        """Un code libre, ou None si l'espace est plein"""
+        with self.lock:
+            while self.cursor < self.size:
+                position = (self.multiplier * self.cursor + self.offset) % self.size
+                self.cursor += 1
+                room_id = str(self.first + position * self.step)
+                if room_id not in self.in_use:  # Réservé entre-temps (room restaurée)
+                    self.in_use.add(room_id)
+                    return room_id
+            while self.released:
+                room_id = self.released.popleft()
+                if room_id not in self.in_use:
+                    self.in_use.add(room_id)
+                    return room_id
+            return None
+
+    def reserve(self, room_id: str):
+        """Marque un code comme pris (room restaurée d'un snapshot)"""
+        with self.lock:
+            self.in_use.add(room_id)
+
+    def release(self, room_id: str):
+        with self.lock:
+            if room_id in self.in_use:
+                self.in_use.discard(room_id)
+                self.released.append(room_id)
+
+    @property
+    def free(self) -> int:
+        return self.size - len(self.in_use)
+
+
+class LifecycleManager:
+    """Codes, ménage et admission des rooms d'un serveur"""
+
+    def __init__(self, server, room_ids: Tuple[int, int], shard: Tuple[int, int] = (0, 1),
+                 max_rooms: Optional[int] = None, max_memory: Optional[int] = None,
+                 idle_timeout: float = IDLE_TIMEOUT, finished_timeout: float = FINISHED_TIMEOUT,
+                 interval: float = REAP_INTERVAL, batch: int = REAP_BATCH):
+        self.server = server
+        self.ids = RoomIdAllocator(room_ids[0], room_ids[1], shard)
+        self.max_rooms = max_rooms  # None = pas de limite
+        self.max_memory = max_memory  # Octets de mémoire résidente, None = pas de limite
+        self.idle_timeout = idle_timeout  # 0 = pas de ménage
+        self.finished_timeout = finished_timeout
+        self.interval = min(interval, idle_timeout / 4) if idle_timeout > 0 else interval
+        self.batch = batch
+        self.activity: Dict[str, Tuple[int, float]] = {}  # room_id -> (version, dernière activité vue)
+        self.memory = 0  # Dernière mesure de la mémoire résidente
+        self.over_memory = False
+
+        # Compteurs
+        self.reaped = 0
+        self.refused: Dict[str, int] = {'rooms': 0, 'memory': 0, 'room_ids': 0}
+
+    def start(self):
+        if self.max_memory:
+            self.check_memory()
+        if self.idle_timeout > 0:
+            self.server.schedule_timer(self.interval, self.reap_pass)
+
+    def admit(self, msg_type: str) -> Optional[str]:
+        """Message de refus si le serveur est au-delà de son budget, sinon None"""
+        if self.over_memory:
+            self.refused['memory'] += 1
+            return "Serveur saturé, réessayez dans quelques instants"
+        if (msg_type == 'create_room' and self.max_rooms is not None
+                and len(self.server.rooms) >= self.max_rooms):
+            self.refused['rooms'] += 1
+            return "Nombre maximal de rooms atteint, réessayez plus tard"
+        return None
+
+    def allocate(self) -> Optional[str]:
+        room_id = self.ids.allocate()
+        if room_id is None:
+            self.refused['room_ids'] += 1
+        return room_id
+
+    def check_memory(self):
+        """Mesure périodique : l'admission ne lit qu'un booléen"""
+        self.memory = resident_memory()
+        over = self.memory > self.max_memory
+        if over != self.over_memory:
+            state = "au-delà" if over else "de nouveau sous"
+            print(f"Mémoire {state} du budget ({self.memory >> 20} Mo / {self.max_memory >> 20} Mo)")
+            self.over_memory = over
+        self.server.schedule_timer(MEMORY_INTERVAL, self.check_memory)
+
+    def reap_pass(self):
+        """Début d'un passage : repère les rooms inactives, par lots"""
+        rooms = self.server.rooms
+        for room_id in [r for r in self.activity if r not in rooms]:
+            del self.activity[room_id]  # Room déjà supprimée
+        self.reap_batch(list(rooms.values()), 0, self.server.timers.clock())
+
+    def reap_batch(self, rooms: list, start: int, now: float):
+        activity = self.activity
+        for room in rooms[start:start + self.batch]:
+            if room.closed or not room.room_id:
+                continue
+            seen = activity.get(room.room_id)
+            if seen is None or seen[0] != room.version:
+                activity[room.room_id] = (room.version, now)
+                continue
+            timeout = self.finished_timeout if room.winner else self.idle_timeout
+            if now - seen[1] >= timeout:
+                room.submit(self.reap, room, seen[0])
+        if start + self.batch < len(rooms):
+            self.server.schedule_timer(0, lambda: self.reap_batch(rooms, start + self.batch, now))
+        else:
+            self.server.schedule_timer(self.interval, self.reap_pass)
+
+    def reap(self, room, version: int):
+        """Ferme une room inactive (exécutée dans la boîte aux lettres)"""
+        if room.closed or room.version != version + 1:
+            return  # Une commande est passée depuis le repérage : la room vit encore
+        server = self.server
+        message = ("Partie terminée, room fermée" if room.winner
+                   else "Room fermée après une longue inactivité")
+        for connection, player in list(room.players.items()):
+            server.sessions.forget(player)
+            server.release_client(connection, room)
+            server.send_to_player(connection, {'type': 'room_closed', 'room_id': room.room_id,
+                                               'message': message})
+        self.activity.pop(room.room_id, None)
+        self.reaped += 1
+        server.close_room(room)
@@ -0,0 +1,203 @@
+"""Partie rapide : une file d'attente qui regroupe les joueurs dans des rooms.
+
+Un client envoie {'type': 'quick_join', 'username': ...}, sans code de room. Il est placé dans
+la salle d'attente ouverte qui a le moins de places libres : les rooms se remplissent l'une après
+l'autre au lieu de s'éparpiller. Une room n'est créée que si aucune n'est ouverte. Sa taille est
+le haut d'un palier de setup_roles (8, 12 ou 16 joueurs), choisi selon le nombre de demandes sur
+les dernières `wait` secondes : grandes rooms en heure de pointe, petites au calme.
+
+La partie démarre seule dès que la room est pleine, ou à l'échéance de `wait` secondes si elle a
+au moins min_players joueurs (sinon l'attente est prolongée).
+
+Les rooms ouvertes sont dans un tas trié par places libres : un placement coûte O(log n). Une
+entrée devenue fausse (arrivée par code, départ, room démarrée) n'est pas cherchée dans le tas.
+Elle est écartée ou corrigée quand elle arrive en tête.
+"""
+import heapq
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+TIERS = (8, 12, 16)  # Haut de chaque palier de setup_roles (6-8, 9-12, 13-16)
+QUICK_JOIN_WAIT = 30.0  # Secondes avant de démarrer une room incomplète
+RETRIES = 3  # Nouveaux placements si la room choisie a démarré ou fermé entre-temps
+
+
+class OpenRoom:
+    """Salle d'attente de la partie rapide"""
+    __slots__ = ('room', 'order', 'pending', 'item', 'deadline')
+
+    def __init__(self, room, order: int):
+        self.room = room
+        self.order = order  # À places libres égales, la plus ancienne d'abord
+        self.pending = 0  # Places réservées dont l'entrée dans la room n'est pas encore faite
+        self.item: Optional[tuple] = None  # Seule entrée valide de cette room dans le tas
+        self.deadline = None  # Timer de démarrage
+
+    def free(self) -> int:
+        return self.room.max_players - len(self.room.players) - self.pending
+
+
+class Matchmaker:
+    """File de la partie rapide d'un serveur.
+
+    join() s'exécute sur le thread de la connexion, seat() et expire() dans la boîte aux
+    lettres de la room : le tas et les réservations sont protégés par un verrou.
+    """
+
+    def __init__(self, server, wait: float = QUICK_JOIN_WAIT):
+        self.server = server
+        self.wait = wait
+        self.open: Dict[str, OpenRoom] = {}  # room_id -> salle d'attente qui accepte encore des joueurs
+        self.heap: list = []  # (places libres, ordre, room_id)
+        self.order = 0
+        self.arrivals = deque()  # Instants des demandes des `wait` dernières secondes
+        self.lock = threading.Lock()
+
+        # Compteurs
+        self.placed = 0  # Joueurs entrés dans une room par quick_join
+        self.started = 0  # Parties démarrées automatiquement
+        self.retried = 0  # Placements refaits (room démarrée ou remplie entre-temps)
+
+    def join(self, connection, username: str, attempts: int = RETRIES) -> Optional[str]:
+        """Place le joueur dans une room ; message de refus si aucune room ne peut être créée"""
+        entry = self.reserve()
+        if entry is None:
+            refusal = self.server.lifecycle.admit('create_room')
+            if refusal is not None:
+                return refusal
+            entry = self.open_room()
+            if entry is None:
+                return "Plus aucun code de room disponible, réessayez plus tard"
+        room = entry.room
+        # Réservé tout de suite, comme join_room : une déconnexion sera traitée après l'entrée
+        self.server.clients[connection] = room.room_id
+        self.server.spectators.unsubscribe(connection)
+        room.submit(self.seat, entry, connection, username, attempts)
+        return None
+
+    def reserve(self) -> Optional[OpenRoom]:
+        """Réserve une place dans la room ouverte la plus remplie (None si aucune)"""
+        now = self.server.timers.clock()
+        with self.lock:
+            arrivals = self.arrivals
+            arrivals.append(now)
+            while arrivals[0] < now - self.wait:
+                arrivals.popleft()
+            heap = self.heap
+            while heap:
+                item = heap[0]
+                entry = self.open.get(item[2])
+                if entry is None or entry.item is not item:
+                    heapq.heappop(heap)  # Room démarrée, fermée ou entrée remplacée
+                    continue
+                free = entry.free()
+                if free != item[0]:
+                    self.rekey(entry, free, replace=True)  # Arrivée par code ou départ
+                    continue
+                entry.pending += 1
+                self.rekey(entry, free - 1, replace=True)
+                return entry
+            return None
+
+    def rekey(self, entry: OpenRoom, free: int, replace: bool = False):
+        """Remplace l'entrée de la room dans le tas (verrou pris) ; replace : elle est en tête.
+
+        Sinon l'ancienne entrée reste dans le tas et sera écartée en arrivant en tête.
+        """
+        if replace:
+            heapq.heappop(self.heap)
+        entry.item = (free, entry.order, entry.room.room_id) if free > 0 else None
+        if entry.item is not None:
+            heapq.heappush(self.heap, entry.item)
+
+    def open_room(self) -> Optional[OpenRoom]:
+        """Nouvelle salle d'attente, à la taille du palier que le débit d'arrivée peut remplir"""
+        room_id = self.server.create_room()
+        if room_id is None:
+            return None
+        room = self.server.rooms[room_id]
+        with self.lock:
+            recent = len(self.arrivals)
+            room.max_players = max([tier for tier in TIERS if tier <= recent], default=TIERS[0])
+            self.order += 1
+            entry = OpenRoom(room, self.order)
+            entry.pending = 1
+            self.open[room_id] = entry
+            self.rekey(entry, entry.free())
+        entry.deadline = self.server.schedule_timer(self.wait, lambda: room.submit(self.expire, entry))
+        return entry
+
+    def seat(self, entry: OpenRoom, connection, username: str, attempts: int):
+        """Fait entrer le joueur réservé (exécutée dans la boîte aux lettres)"""
+        server = self.server
+        room = entry.room
+        seated = not (room.closed or room.game_started) and room.add_player(connection, username)
+        with self.lock:
+            entry.pending -= 1
+            if not seated and self.open.get(room.room_id) is entry:
+                # Place réservée rendue : la room revient dans le tas si elle en a de libres
+                self.rekey(entry, entry.free())
+        if not seated:
+            # Room fermée, démarrée ou remplie par des join_room entre la réservation et l'entrée
+            if server.clients.get(connection) != room.room_id:
+                return  # Déconnecté entre-temps : rien à refaire
+            server.release_client(connection, room)
+            self.retried += 1
+            refusal = self.join(connection, username, attempts - 1) if attempts > 1 else "Aucune room disponible"
+            if refusal is not None:
+                server.send_to_player(connection, {'type': 'server_busy', 'message': refusal})
+            return
+        self.placed += 1
+        server.send_to_player(connection, {
+            'type': 'room_joined',
+            'room_id': room.room_id,
+            'session': server.sessions.issue(room, room.players[connection]),
+            'players_info': room.get_players_info()
+        })
+        server.broadcast_to_room(room.room_id, {
+            'type': 'player_joined',
+            'username': username,
+            'version': room.roster_version
+        }, connection)
+        self.seated(room)
+
+    def seated(self, room):
+        """Un joueur est entré dans une salle d'attente ouverte : la partie démarre si elle est pleine"""
+        entry = self.open.get(room.room_id)
+        if entry is not None and len(room.players) >= room.max_players:
+            self.launch(entry)
+
+    def vacate(self, room):
+        """Un joueur a quitté une salle d'attente ouverte : sa place est remise en jeu"""
+        with self.lock:
+            entry = self.open.get(room.room_id)
+            if entry is not None:
+                self.rekey(entry, entry.free())
+
+    def expire(self, entry: OpenRoom):
+        """Échéance d'attente (exécutée dans la boîte aux lettres)"""
+        room = entry.room
+        if room.closed or room.game_started or self.open.get(room.room_id) is not entry:
+            return
+        if len(room.players) >= room.min_players:
+            self.launch(entry)
+        else:
+            entry.deadline = self.server.schedule_timer(self.wait, lambda: room.submit(self.expire, entry))
+
+    def launch(self, entry: OpenRoom):
+        """Démarre la partie de la room (exécutée dans la boîte aux lettres)"""
+        if self.server.launch_game(entry.room):  # Retire aussi la room de la file
+            self.started += 1
+
+    def discard(self, room_id: str):
+        """La room n'accepte plus de joueurs (démarrée ou fermée)"""
+        if room_id not in self.open:
+            return  # Cas courant : room créée par code
+        with self.lock:
+            entry = self.open.pop(room_id, None)
+            if entry is None:
+                return
+            entry.item = None
+        if entry.deadline is not None:
+            entry.deadline.cancel()
@@ -0,0 +1,215 @@
+"""Métriques du serveur, exposées au format texte de Prometheus.
+
+Compteurs et histogrammes sont mis à jour sur le chemin des messages : deux lectures
+d'horloge et quelques additions par message, assez peu pour rester actifs en production.
+Les jauges (rooms, rooms par phase, timers, sessions...) ne sont calculées qu'à la lecture.
+
+    python server.py --stats-port 9100        # curl localhost:9100/metrics
+    python server.py --admin-token secret     # {'type': 'admin', 'token': 'secret', 'command': 'stats'}
+"""
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+# Bornes des histogrammes en secondes (un message est traité en quelques dizaines de µs)
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+                   0.001, 0.0025, 0.005, 0.01, 0.025, 0.1)
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+MAX_MESSAGE_TYPES = 64  # Au-delà, les types inconnus envoyés par les clients sont comptés en "other"
+
+
+class Histogram:
+    """Histogramme à bornes fixes (cumulé à la lecture, comme l'attend Prometheus)"""
+    __slots__ = ('bounds', 'counts', 'sum')
+
+    def __init__(self, bounds: tuple = LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # La dernière case est +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def render(self, lines: List[str], name: str, labels: str = ''):
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}le="{bound}"}} {cumulative}')
+        cumulative += self.counts[-1]
+        lines.append(f'{name}_bucket{{{labels}le="+Inf"}} {cumulative}')
+        labels = f'{{{labels[:-1]}}}' if labels else ''
+        lines.append(f'{name}_sum{labels} {self.sum:.6f}')
+        lines.append(f'{name}_count{labels} {cumulative}')
+
+
+class Metrics:
+    """Compteurs et histogrammes d'un serveur"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.latency: Dict[str, Histogram] = {}  # Type de message -> durée de traitement
+        self.bytes_in = 0
+        self.connections = 0  # Connexions ouvertes
+        self.connections_total = 0
+        self.broadcasts = Histogram()  # Durée d'un broadcast_to_room (encodage + mise en file)
+        self.fanout = 0  # Destinataires de tous les broadcasts
+        self.timer_lag = Histogram(LAG_BUCKETS)  # Retard des timers sur leur échéance
+
+    def observe_message(self, msg_type, seconds: float):
+        if type(msg_type) is not str:
+            msg_type = 'other'  # Le type vient du client : n'importe quelle valeur JSON
+        histogram = self.latency.get(msg_type)
+        if histogram is None:
+            # Nouveau type : vérifié une seule fois (il devient une étiquette Prometheus)
+            if not msg_type.isidentifier() or len(self.latency) >= MAX_MESSAGE_TYPES:
+                msg_type = 'other'
+            histogram = self.latency.setdefault(msg_type, Histogram())
+        histogram.observe(seconds)
+
+
+def render(server) -> str:
+    """Toutes les métriques du serveur au format texte de Prometheus"""
+    metrics = server.metrics
+    lines: List[str] = []
+
+    def metric(name: str, kind: str, help_text: str, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+
+    latency = sorted(list(metrics.latency.items()))
+    metric('loupgarou_messages_total', 'counter', "Messages reçus des clients, par type",
+           [(f'type="{t}"', h.count) for t, h in latency])
+    lines.append("# HELP loupgarou_message_seconds Durée de traitement d'un message, par type")
+    lines.append("# TYPE loupgarou_message_seconds histogram")
+    for msg_type, histogram in latency:
+        histogram.render(lines, 'loupgarou_message_seconds', f'type="{msg_type}",')
+
+    metric('loupgarou_received_bytes_total', 'counter', "Octets reçus des clients",
+           [('', metrics.bytes_in)])
+    metric('loupgarou_sent_bytes_total', 'counter', "Octets mis en file vers les clients",
+           [('', getattr(server.sink, 'bytes_out', 0))])
+    metric('loupgarou_connections', 'gauge', "Connexions ouvertes", [('', metrics.connections)])
+    metric('loupgarou_connections_total', 'counter', "Connexions acceptées",
+           [('', metrics.connections_total)])
+
+    lines.append("# HELP loupgarou_broadcast_seconds Durée d'un broadcast vers une room")
+    lines.append("# TYPE loupgarou_broadcast_seconds histogram")
+    metrics.broadcasts.render(lines, 'loupgarou_broadcast_seconds')
+    metric('loupgarou_broadcast_recipients_total', 'counter', "Destinataires des broadcasts",
+           [('', metrics.fanout)])
+    lines.append("# HELP loupgarou_timer_lag_seconds Retard des timers au déclenchement")
+    lines.append("# TYPE loupgarou_timer_lag_seconds histogram")
+    metrics.timer_lag.render(lines, 'loupgarou_timer_lag_seconds')
+    metric('loupgarou_timers', 'gauge', "Timers programmés", [('', len(server.timers))])
+
+    # Jauges des rooms : calculées maintenant, sur une copie (les rooms changent pendant la lecture)
+    rooms = list(server.rooms.values())
+    phases: Dict[str, int] = {}
+    players = 0
+    for room in rooms:
+        phase = room.current_phase.value
+        phases[phase] = phases.get(phase, 0) + 1
+        players += len(room.players)
+    metric('loupgarou_rooms', 'gauge', "Rooms actives", [('', len(rooms))])
+    metric('loupgarou_rooms_by_phase', 'gauge', "Rooms dans chaque phase",
+           [(f'phase="{p}"', n) for p, n in sorted(phases.items())])
+    metric('loupgarou_players', 'gauge', "Joueurs dans les rooms (connectés ou non)", [('', players)])
+
+    chat = server.chat
+    metric('loupgarou_chat_messages_total', 'counter', "Messages de chat, par issue", [
+        ('outcome="received"', chat.received), ('outcome="dropped"', chat.dropped),
+        ('outcome="coalesced"', chat.coalesced)])
+    metric('loupgarou_chat_frames_total', 'counter', "Trames de chat diffusées", [('', chat.frames)])
+
+    spectators = server.spectators
+    metric('loupgarou_spectators', 'gauge', "Spectateurs abonnés à une room", [('', len(spectators.watching))])
+    metric('loupgarou_spectator_frames_total', 'counter', "Trames publiques publiées pour les spectateurs",
+           [('', spectators.published)])
+    metric('loupgarou_spectator_writes_total', 'counter', "Écritures vers les spectateurs",
+           [('', spectators.delivered)])
+    metric('loupgarou_spectator_bytes_total', 'counter', "Octets mis en file vers les spectateurs",
+           [('', spectators.bytes_out)])
+    metric('loupgarou_spectators_dropped_total', 'counter', "Spectateurs retirés car trop lents",
+           [('', spectators.dropped)])
+
+    matchmaker = server.matchmaker
+    metric('loupgarou_quick_join_rooms', 'gauge', "Salles d'attente ouvertes de la partie rapide",
+           [('', len(matchmaker.open))])
+    metric('loupgarou_quick_join_players_total', 'counter', "Joueurs placés par quick_join",
+           [('', matchmaker.placed)])
+    metric('loupgarou_quick_join_games_total', 'counter', "Parties rapides démarrées automatiquement",
+           [('', matchmaker.started)])
+    metric('loupgarou_quick_join_retries_total', 'counter', "Placements refaits (room démarrée ou pleine)",
+           [('', matchmaker.retried)])
+
+    directory = server.directory
+    metric('loupgarou_directory_rooms', 'gauge', "Rooms listées par list_rooms (au dernier rangement)", [('', len(directory.where))])
+    metric('loupgarou_directory_pages_total', 'counter', "Pages de list_rooms, servies du cache ou construites",
+           [('source="cache"', directory.hits), ('source="built"', directory.misses)])
+
+    lifecycle = server.lifecycle
+    metric('loupgarou_room_ids_free', 'gauge', "Codes de room encore disponibles", [('', lifecycle.ids.free)])
+    metric('loupgarou_rooms_reaped_total', 'counter', "Rooms fermées par le ménage (inactives ou terminées)",
+           [('', lifecycle.reaped)])
+    metric('loupgarou_admissions_refused_total', 'counter', "create_room et join_room refusés, par motif",
+           [(f'reason="{reason}"', n) for reason, n in sorted(lifecycle.refused.items())])
+    if lifecycle.max_memory:
+        metric('process_resident_memory_bytes', 'gauge', "Mémoire résidente (dernière mesure)",
+               [('', lifecycle.memory)])
+
+    sessions = server.sessions
+    metric('loupgarou_sessions', 'gauge', "Jetons de session valides", [('', len(sessions.rooms))])
+    metric('loupgarou_session_events_total', 'counter', "Reprises de session, par issue", [
+        ('event="held"', sessions.held), ('event="resumed"', sessions.resumed),
+        ('event="expired"', sessions.expired)])
+
+    if server.snapshotter is not None:
+        snapshotter = server.snapshotter
+        metric('loupgarou_snapshot_captures_total', 'counter', "Rooms capturées", [('', snapshotter.captures)])
+        metric('loupgarou_snapshot_writes_total', 'counter', "Snapshots écrits", [('', snapshotter.writes)])
+        metric('loupgarou_snapshot_write_seconds', 'gauge', "Durée de la dernière écriture",
+               [('', f"{snapshotter.last_write_seconds:.6f}")])
+    if server.archive is not None:
+        metric('loupgarou_archived_games_total', 'counter', "Parties archivées",
+               [('', server.archive.archived)])
+        metric('loupgarou_archive_bytes_total', 'counter', "Octets écrits dans l'archive",
+               [('', server.archive.bytes_written)])
+
+    metric('process_cpu_seconds_total', 'counter', "Temps CPU du processus",
+           [('', f"{time.process_time():.3f}")])
+    metric('process_start_time_seconds', 'gauge', "Démarrage du serveur",
+           [('', f"{metrics.started:.3f}")])
+    return "\n".join(lines) + "\n"
+
+
+def serve_stats(server, host: str, port: int) -> ThreadingHTTPServer:
+    """Sert GET /metrics dans un thread (lecture seule : le jeu n'est jamais bloqué)"""
+
+    class StatsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = render(server).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Pas de ligne de log à chaque collecte
+
+    http_server = ThreadingHTTPServer((host, port), StatsHandler)
+    http_server.daemon_threads = True
+    threading.Thread(target=http_server.serve_forever, name="stats", daemon=True).start()
+    return http_server
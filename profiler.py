@@ -0,0 +1,87 @@
+"""Profileur par échantillonnage, activable à chaud par un message d'administration.
+
+Pendant la durée demandée, un thread relève la pile de tous les autres threads
+(sys._current_frames) toutes les `interval` secondes : threads clients (handle_client),
+boucle asyncio, roue de timers, écrivains... Le résultat est écrit au format « collapsed
+stacks » (une pile par ligne, fonctions séparées par des « ; », suivie du nombre
+d'échantillons), lisible par flamegraph.pl ou speedscope. Hors profilage, rien n'est
+installé : aucun coût.
+
+    {'type': 'admin', 'token': ..., 'command': 'profile', 'duration': 30}
+    flamegraph.pl profiles/profile-20240101-120000.folded > flame.svg
+"""
+import os
+import re
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+PROFILE_INTERVAL = 0.005  # Secondes entre deux relevés
+MAX_PROFILE_DURATION = 300.0
+
+
+def frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    def __init__(self, path: str, duration: float, interval: float = PROFILE_INTERVAL):
+        self.path = path
+        self.duration = duration
+        self.interval = interval
+        self.stacks: Dict[str, int] = {}  # Pile repliée -> nombre d'échantillons
+        self.samples = 0
+        self.labels: Dict[object, str] = {}  # Cache code -> libellé
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Arrête le profilage avant la fin prévue (le fichier est quand même écrit)"""
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def _run(self):
+        deadline = time.monotonic() + self.duration
+        while time.monotonic() < deadline and not self.stopped.wait(self.interval):
+            self.sample()
+        self.write()
+
+    def sample(self):
+        own = threading.get_ident()
+        # Threads clients numérotés (Thread-12 (serve_client_thread)) regroupés sous un même nom
+        names = {t.ident: re.sub(r'-\d+', '', t.name) for t in threading.enumerate()}
+        labels = self.labels
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            parts = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = frame_label(code)
+                parts.append(label)
+                frame = frame.f_back
+            parts.append(names.get(ident, f"thread-{ident}"))
+            stack = ';'.join(reversed(parts))
+            self.stacks[stack] = self.stacks.get(stack, 0) + 1
+        self.samples += 1
+
+    def write(self):
+        try:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                for stack, count in sorted(self.stacks.items(), key=lambda item: -item[1]):
+                    f.write(f"{stack} {count}\n")
+            print(f"Profil écrit dans {self.path} ({self.samples} relevés)")
+        except OSError as e:
+            print(f"Erreur lors de l'écriture du profil: {e}")
@@ -0,0 +1,53 @@
+"""Protocole réseau partagé par le serveur et le client.
+
+Chaque message est un document JSON précédé de sa longueur sur 4 octets (big-endian).
+TCP étant un flux, une lecture peut contenir plusieurs messages ou un message partiel :
+FrameDecoder garde le reste en tampon et renvoie tous les messages complets.
+"""
+import json
+import struct
+from typing import List
+
+HEADER = struct.Struct('>I')
+MAX_FRAME_SIZE = 1024 * 1024  # Taille maximale d'un message (1 Mo)
+RECV_SIZE = 65536  # Taille des lectures sur le socket
+
+
+class FrameTooLarge(ValueError):
+    """Trame dépassant MAX_FRAME_SIZE : la connexion doit être fermée"""
+
+
+def encode_frame(message: dict) -> bytes:
+    """Encode un message en trame prête à être envoyée"""
+    payload = json.dumps(message).encode('utf-8')
+    if len(payload) > MAX_FRAME_SIZE:
+        raise FrameTooLarge(f"Message trop grand ({len(payload)} octets)")
+    return HEADER.pack(len(payload)) + payload
+
+
+class FrameDecoder:
+    """Décodeur incrémental : accumule les octets reçus et extrait les trames complètes"""
+
+    def __init__(self, max_frame_size: int = MAX_FRAME_SIZE):
+        self.max_frame_size = max_frame_size
+        self.buffer = bytearray()
+
+    def feed(self, data: bytes) -> List[dict]:
+        """Ajoute les octets reçus et retourne tous les messages complets"""
+        buffer = self.buffer
+        buffer += data
+        messages = []
+        offset = 0
+        size = len(buffer)
+        while size - offset >= HEADER.size:
+            (length,) = HEADER.unpack_from(buffer, offset)
+            if length > self.max_frame_size:
+                raise FrameTooLarge(f"Trame annoncée trop grande ({length} octets)")
+            end = offset + HEADER.size + length
+            if end > size:
+                break
+            messages.append(json.loads(buffer[offset + HEADER.size:end]))
+            offset = end
+        if offset:
+            del buffer[:offset]
+        return messages
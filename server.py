@@ -1,10 +1,28 @@
 import socket
 import threading
-import json
 import random
-from typing import Dict, List
+import asyncio
+import argparse
+import hmac
+import os
+import time
 from enum import Enum
-from typing import Dict, List, Optional, Set, Any
+from typing import Dict, List, Optional, Any, Tuple
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from protocol import FrameDecoder, encode_frame, RECV_SIZE
+from timer_wheel import TimerWheel
+from chat import ChatChannel, CHAT_RATE, CHAT_BURST, CHAT_WINDOW
+from broker import HEARTBEAT_INTERVAL, RemoteBroker
+from event_log import (EVENT_DEATH, EVENT_GAME_OVER, EVENT_GAME_START, EVENT_JOIN, EVENT_LEAVE,
+                       EVENT_NIGHT_ACTION, EVENT_PHASE, EVENT_ROLE, EVENT_VOTE, GameArchive, new_event)
+from session import GRACE_PERIOD, OfflinePlayer, SessionManager
+from metrics import Metrics, render as render_metrics, serve_stats
+from profiler import MAX_PROFILE_DURATION, SamplingProfiler
+from spectators import SpectatorHub
+from lifecycle import FINISHED_TIMEOUT, IDLE_TIMEOUT, LifecycleManager
+from matchmaking import QUICK_JOIN_WAIT, Matchmaker
+from directory import RoomDirectory
 
 
 class GamePhase(Enum):
@@ -30,15 +48,19 @@ class Role(Enum):
     CAPITAINE = "Capitaine"
 
 class PlayerState:
+    # Pas de __dict__ par joueur : 100 000 rooms doivent tenir sur un seul serveur
+    __slots__ = ('username', 'role', 'is_alive', 'is_amoureux', 'amoureux_with', 'has_voted',
+                 'is_captain', 'session', 'sorciere_heal', 'sorciere_kill', 'chasseur_can_shoot')
+
     def __init__(self, username: str):
         self.username = username
         self.role: Optional[Role] = None
         self.is_alive = True
         self.is_amoureux = False
         self.amoureux_with = None
-        self.voted_by: Set[str] = set()  # username des joueurs qui ont voté contre
         self.has_voted = False
         self.is_captain = False
+        self.session: Optional[str] = None  # Jeton de reprise après une coupure (voir session.py)
         
         # Capacités spéciales
         self.sorciere_heal = True
@@ -46,6 +68,14 @@ class PlayerState:
         self.chasseur_can_shoot = True
 
 class GameRoom:
+    __slots__ = ('room_id', 'max_players', 'min_players', 'players', 'players_by_name',
+                 'players_by_role', 'alive_count', 'wolves_alive', 'villagers_alive',
+                 'roster_version', 'game_started', 'current_phase', 'current_turn', 'winner',
+                 'available_roles', 'captain_socket', 'victim_socket', 'second_victim_socket',
+                 'saved_by_witch', 'killed_by_witch', 'lovers', 'seen_by_seer', 'votes',
+                 'night_actions', 'phase_schedule', 'phase_timer', 'phase_generation', 'server',
+                 'closed', 'mailbox', 'mailbox_lock', 'mailbox_running', 'version', 'events',
+                 'directory_pending')
 
     PHASE_DURATIONS = {
         GamePhase.NIGHT_VOLEUR: 30,    # 30 secondes
@@ -58,6 +88,15 @@ class GameRoom:
         GamePhase.DAY_VOTE: 45,
     }
 
+    PHASE_SCHEDULES: Dict[frozenset, dict] = {}  # Rôles en jeu -> tables (voir get_phase_schedule)
+
+    # Ordre canonique des phases dans un tour
+    PHASE_ORDER = [
+        GamePhase.NIGHT_VOLEUR, GamePhase.NIGHT_CUPIDON, GamePhase.NIGHT_AMOUREUX,
+        GamePhase.NIGHT_LOUP, GamePhase.NIGHT_VOYANTE, GamePhase.NIGHT_SORCIERE,
+        GamePhase.DAY_DISCUSSION, GamePhase.DAY_VOTE,
+    ]
+
     def __init__(self, room_id: str, max_players: int = 16):
         self.room_id = room_id
         self.max_players = max_players
@@ -65,11 +104,20 @@ class GameRoom:
         
         # Gestion des joueurs
         self.players: Dict[socket.socket, PlayerState] = {}
+
+        # Index maintenus par add_player, remove_player, assign_roles et kill_player
+        self.players_by_name: Dict[str, socket.socket] = {}
+        self.players_by_role: Dict[Role, List[socket.socket]] = {}  # Listes : 1 à 3 joueurs par rôle
+        self.alive_count = 0
+        self.wolves_alive = 0
+        self.villagers_alive = 0  # Tous les joueurs vivants qui ne sont pas loups
+        self.roster_version = 0  # Incrémenté à chaque arrivée, départ, mort ou changement de connexion
         
         # État du jeu
         self.game_started = False
         self.current_phase = GamePhase.WAITING
         self.current_turn = 0
+        self.winner: Optional[str] = None  # Renseigné à la fin de la partie
         
         # Gestion des rôles et actions
         self.available_roles = []
@@ -82,14 +130,65 @@ class GameRoom:
         self.seen_by_seer = None  # Joueur vu par la voyante
         self.votes: Dict[socket.socket, socket.socket] = {}  # Votant -> Voté
         self.night_actions: Dict[socket.socket, Any] = {}  # Actions spéciales de nuit
+        self.phase_schedule: Optional[dict] = None  # Tables de transition partagées, voir get_phase_schedule
         self.phase_timer = None
+        self.phase_generation = 0  # Incrémenté à chaque changement de phase (timers périmés)
         self.server = None  # Référence au serveur pour les callbacks
+        self.closed = False  # Room supprimée du serveur
+        self.directory_pending = False  # Notée dans l'annuaire, pas encore rangée (voir directory.py)
+
+        # Boîte aux lettres : toutes les commandes qui modifient la room passent par ici
+        self.mailbox: Optional[deque] = None  # Créée seulement quand une commande doit attendre
+        self.mailbox_lock = threading.Lock()
+        self.mailbox_running = False
+        self.version = 0  # Nombre de commandes exécutées (snapshots : la room a-t-elle changé ?)
+        self.events: Optional[List[tuple]] = None  # Journal de la partie (liste si l'archivage est actif)
+
+    def submit(self, command, *args):
+        """Exécute une commande sur la room, dans l'ordre d'arrivée.
+
+        Les commandes d'une même room ne s'exécutent jamais en parallèle : si une autre
+        commande est en cours, celle-ci est mise en file et sera exécutée par le thread qui
+        vide déjà la boîte aux lettres. Les rooms différentes restent indépendantes.
+        """
+        with self.mailbox_lock:
+            if self.mailbox_running:
+                if self.mailbox is None:
+                    self.mailbox = deque()
+                self.mailbox.append((command, args))
+                return
+            self.mailbox_running = True
+        while True:
+            self.version += 1
+            try:
+                command(*args)
+            except Exception as e:
+                print(f"Erreur dans la room {self.room_id}: {e}")
+            with self.mailbox_lock:
+                if not self.mailbox:
+                    # File vide : rendue à l'allocateur (la plupart des rooms sont inactives)
+                    self.mailbox = None
+                    self.mailbox_running = False
+                    return
+                command, args = self.mailbox.popleft()
+
+    def record(self, event: int, *args):
+        """Ajoute un événement au journal de la partie (voir event_log.py)"""
+        if self.events is not None:
+            self.events.append(new_event(event, args))
         
     def add_player(self, client_socket: socket.socket, username: str) -> bool:
         """Ajoute un joueur à la room"""
         if len(self.players) >= self.max_players:
             return False
         self.players[client_socket] = PlayerState(username)
+        self.players_by_name.setdefault(username, client_socket)
+        self.record(EVENT_JOIN, username)
+        self.roster_version += 1
+        self.alive_count += 1
+        self.villagers_alive += 1
+        if self.server is not None:
+            self.server.directory.update(self)
         return True
     
     def remove_player(self, client_socket: socket.socket):
@@ -98,7 +197,62 @@ class GameRoom:
             # Si le joueur est capitaine, on doit en choisir un nouveau
             if client_socket == self.captain_socket:
                 self.captain_socket = None
-            del self.players[client_socket]
+            player = self.players.pop(client_socket)
+            self.record(EVENT_LEAVE, player.username)
+            self.roster_version += 1
+            if player.is_alive:
+                self.update_alive_counts(player, -1)
+            if player.role is not None:
+                self.players_by_role[player.role].remove(client_socket)
+                self.invalidate_phase_schedule(player.role)
+            if self.players_by_name.get(player.username) is client_socket:
+                del self.players_by_name[player.username]
+                # Un homonyme éventuel reprend l'entrée de l'index
+                for other_socket, other in self.players.items():
+                    if other.username == player.username:
+                        self.players_by_name[player.username] = other_socket
+                        break
+            if self.server is not None:
+                self.server.directory.update(self)
+
+    def replace_connection(self, old, new):
+        """Remplace la connexion d'un joueur partout où la room y fait référence (reconnexion)"""
+        swap = lambda s: new if s is old else s
+        self.players = {swap(s): player for s, player in self.players.items()}
+        player = self.players[new]
+        if self.players_by_name.get(player.username) is old:
+            self.players_by_name[player.username] = new
+        if player.role is not None:
+            self.players_by_role[player.role] = [swap(s) for s in self.players_by_role[player.role]]
+        for other in self.players.values():
+            if other.amoureux_with is old:
+                other.amoureux_with = new
+        self.captain_socket = swap(self.captain_socket)
+        self.victim_socket = swap(self.victim_socket)
+        self.second_victim_socket = swap(self.second_victim_socket)
+        self.seen_by_seer = swap(self.seen_by_seer)
+        self.lovers = [swap(s) for s in self.lovers]
+        self.votes = {swap(voter): swap(voted) for voter, voted in self.votes.items()}
+        self.night_actions = {swap(s): action for s, action in self.night_actions.items()}
+
+    def update_alive_counts(self, player: PlayerState, delta: int):
+        """Met à jour les compteurs de joueurs vivants"""
+        self.alive_count += delta
+        if player.role == Role.LOUP_GAROU:
+            self.wolves_alive += delta
+        else:
+            self.villagers_alive += delta
+
+    def get_player_socket(self, username: str) -> Optional[socket.socket]:
+        """Retourne le socket d'un joueur à partir de son nom"""
+        return self.players_by_name.get(username)
+
+    def get_alive_with_role(self, role: Role) -> Optional[socket.socket]:
+        """Retourne un joueur vivant ayant ce rôle, ou None"""
+        for player_socket in self.players_by_role.get(role, ()):
+            if self.players[player_socket].is_alive:
+                return player_socket
+        return None
     
     def setup_roles(self):
         """Configure les rôles disponibles selon le nombre de joueurs"""
@@ -140,38 +294,76 @@ class GameRoom:
         for socket, player in self.players.items():
             if self.available_roles:
                 player.role = self.available_roles.pop()
+                self.record(EVENT_ROLE, player.username, player.role.value)
+        self.rebuild_indexes()
+
+    def rebuild_indexes(self):
+        """Reconstruit les index de noms et de rôles et les compteurs à partir de self.players"""
+        self.players_by_name = {}
+        self.players_by_role = {}
+        self.alive_count = self.wolves_alive = self.villagers_alive = 0
+        for socket, player in self.players.items():
+            self.players_by_name.setdefault(player.username, socket)
+            if player.role is not None:
+                self.players_by_role.setdefault(player.role, []).append(socket)
+            if player.is_alive:
+                self.update_alive_counts(player, 1)
 
     def start_game(self) -> bool:
         """Démarre la partie"""
         if self.min_players <= len(self.players) <= self.max_players:
             self.game_started = True
+            self.record(EVENT_GAME_START, len(self.players))
             self.setup_roles()
             self.assign_roles()
             self.current_phase = GamePhase.NIGHT_VOLEUR
             self.current_turn = 1
+            self.phase_schedule = None
+            self.get_phase_schedule()
+            if self.server is not None:
+                self.server.directory.update(self)
             return True
         return False
 
     def get_players_info(self) -> dict:
-        """Retourne les informations sur les joueurs"""
+        """Liste complète des joueurs, à la version roster_version.
+
+        Envoyée seulement à l'entrée dans la room, à la reprise et sur demande (roster_sync) ;
+        ensuite les clients suivent les deltas versionnés (player_joined, player_left,
+        player_death, player_offline, player_back).
+        """
+        players = [player.username for player in self.players.values()]
+        dead, offline = [], []
+        if self.game_started:
+            # En salle d'attente personne n'est mort ni en attente de reconnexion (voir session.py)
+            for connection, player in self.players.items():
+                if not player.is_alive:
+                    dead.append(player.username)
+                if type(connection) is OfflinePlayer:
+                    offline.append(player.username)
         return {
-            'player_count': len(self.players),
+            'version': self.roster_version,
+            'player_count': len(players),
             'max_players': self.max_players,
-            'players': [player.username for player in self.players.values()],
+            'players': players,
+            'dead': dead,
+            'offline': offline,
             'phase': self.current_phase.value if self.game_started else "waiting"
         }
 
     def get_roles_in_game(self) -> set:
-        """Retourne l'ensemble des rôles présents dans la partie"""
-        return set(player.role for player in self.players.values())
+        """Retourne l'ensemble des rôles encore tenus par un joueur vivant"""
+        return {role for role in self.players_by_role if self.get_alive_with_role(role)}
     
-    def get_available_phases(self) -> list:
+    def get_available_phases(self, turn: Optional[int] = None) -> list:
         """Retourne les phases dans l'ordre correct"""
+        if turn is None:
+            turn = self.current_turn
         # Les phases de nuit d'abord
         phases = []
         roles = self.get_roles_in_game()
         
-        if self.current_turn == 1 and Role.CUPIDON in roles:
+        if turn == 1 and Role.CUPIDON in roles:
             phases.extend([GamePhase.NIGHT_CUPIDON, GamePhase.NIGHT_AMOUREUX])
         
         if Role.LOUP_GAROU in roles:
@@ -186,23 +378,75 @@ class GameRoom:
         
         return phases
 
+    def build_phase_schedule(self) -> dict:
+        """Compile la séquence des phases en tables de transition.
+
+        'first_turn' contient les phases de Cupidon, 'next_turns' sert pour les tours
+        suivants. Chaque table associe une phase à (phase suivante, nouveau tour ?).
+        """
+        first_turn = self.get_available_phases(turn=1)
+        next_turns = self.get_available_phases(turn=2)
+        schedule = {'sequences': {'first_turn': first_turn, 'next_turns': next_turns}}
+        for name, sequence in schedule['sequences'].items():
+            table = {phase: (following, False) for phase, following in zip(sequence, sequence[1:])}
+            table[sequence[-1]] = (next_turns[0], True)  # Fin du tour : on reprend la nuit
+            schedule[name] = table
+        return schedule
+
+    def get_phase_schedule(self) -> dict:
+        """Retourne les tables de transition, recompilées seulement après invalidation.
+
+        Les tables ne dépendent que des rôles encore en jeu : elles sont partagées (en lecture
+        seule) par toutes les rooms qui ont les mêmes rôles, au lieu d'une copie par room.
+        """
+        if self.phase_schedule is None:
+            roles = frozenset(self.get_roles_in_game())
+            schedule = self.PHASE_SCHEDULES.get(roles)
+            if schedule is None:
+                schedule = self.PHASE_SCHEDULES.setdefault(roles, self.build_phase_schedule())
+            self.phase_schedule = schedule
+        return self.phase_schedule
+
+    def invalidate_phase_schedule(self, role: Optional[Role]):
+        """Invalide les tables si le dernier joueur vivant ayant ce rôle a disparu"""
+        if role is not None and self.phase_schedule is not None and not self.get_alive_with_role(role):
+            self.phase_schedule = None
+
+    def describe_phase_schedule(self) -> dict:
+        """Séquences de phases compilées, lisibles (pour le débogage)"""
+        sequences = self.get_phase_schedule()['sequences']
+        return {name: [phase.value for phase in sequence] for name, sequence in sequences.items()}
+
+    def peek_next_phase(self) -> tuple:
+        """Retourne (phase suivante, nouveau tour ?) sans changer de phase"""
+        schedule = self.get_phase_schedule()
+        name = 'first_turn' if self.current_turn == 1 else 'next_turns'
+        transition = schedule[name].get(self.current_phase)
+        if transition is None:
+            # Phase hors séquence (début de partie, ou son rôle vient de disparaître) :
+            # on prend la première phase prévue après elle dans l'ordre canonique
+            position = self.PHASE_ORDER.index(self.current_phase)
+            for phase in schedule['sequences'][name]:
+                if self.PHASE_ORDER.index(phase) > position:
+                    return phase, False
+            return schedule['sequences']['next_turns'][0], True
+        return transition
+
+    def ends_night(self) -> bool:
+        """Vrai si la phase actuelle est la dernière de la nuit"""
+        return (self.current_phase.value.startswith('night_')
+                and self.peek_next_phase()[0] == GamePhase.DAY_DISCUSSION)
+
     def next_phase(self):
         """Passe à la phase suivante"""
-        available_phases = self.get_available_phases()
-        
-        if not available_phases:
-            return
-            
-        if self.current_phase not in available_phases:
-            self.current_phase = available_phases[0]
-        else:
-            current_idx = available_phases.index(self.current_phase)
-            next_idx = (current_idx + 1) % len(available_phases)
-            self.current_phase = available_phases[next_idx]
-            
-            # Si on revient au début, c'est un nouveau tour
-            if next_idx == 0:
-                self.current_turn += 1
+        self.current_phase, new_turn = self.peek_next_phase()
+        # Si on revient au début, c'est un nouveau tour
+        if new_turn:
+            self.current_turn += 1
+        # Test fait ici plutôt que par record() : archivage coupé, le changement de phase (très
+        # fréquent) ne paie pas un appel de méthode pour rien (cas next_phase de benchmarks/micro.py)
+        if self.events is not None:
+            self.events.append(new_event(EVENT_PHASE, (self.current_phase.value, self.current_turn)))
 
     def start_phase_timer(self):
         """Démarre le timer pour la phase actuelle"""
@@ -210,13 +454,16 @@ class GameRoom:
             duration = self.PHASE_DURATIONS[self.current_phase]
             if self.phase_timer:
                 self.phase_timer.cancel()
-            self.phase_timer = threading.Timer(duration, self.force_phase_completion)
-            self.phase_timer.start()
+            if self.server:
+                self.phase_timer = self.server.schedule_timer(duration, self.force_phase_completion)
+            else:
+                self.phase_timer = threading.Timer(duration, self.force_phase_completion)
+                self.phase_timer.start()
 
     def force_phase_completion(self):
         """Force le passage à la phase suivante quand le timer expire"""
         if self.server:
-            self.server.check_phase_completion(self, force=True)
+            self.submit(self.server.on_phase_timeout, self, self.phase_generation)
 
     def process_night_action(self, player_socket: socket.socket, action: dict) -> bool:
         """Traite les actions de nuit des joueurs"""
@@ -259,6 +506,7 @@ class GameRoom:
             if not player.has_voted and player.is_alive:
                 self.votes[voter_socket] = voted_socket
                 player.has_voted = True
+                self.record(EVENT_VOTE, player.username, self.players[voted_socket].username)
                 # Si le votant est capitaine, son vote compte double
                 if voter_socket == self.captain_socket:
                     self.votes[f"{voter_socket}_captain"] = voted_socket
@@ -291,10 +539,8 @@ class GameRoom:
 
     def check_victory(self) -> Optional[str]:
         """Vérifie si une équipe a gagné"""
-        wolves_alive = sum(1 for p in self.players.values() 
-                         if p.is_alive and p.role == Role.LOUP_GAROU)
-        villagers_alive = sum(1 for p in self.players.values() 
-                            if p.is_alive and p.role != Role.LOUP_GAROU)
+        wolves_alive = self.wolves_alive
+        villagers_alive = self.villagers_alive
 
         # Victoire des loups
         if villagers_alive <= wolves_alive:
@@ -307,7 +553,7 @@ class GameRoom:
             if all(self.players[s].is_alive for s in self.lovers):
                 roles = [self.players[s].role for s in self.lovers]
                 if Role.LOUP_GAROU in roles and Role.LOUP_GAROU not in roles:
-                    if len([p for p in self.players.values() if p.is_alive]) == 2:
+                    if self.alive_count == 2:
                         return "amoureux"
         
         return None
@@ -316,10 +562,16 @@ class GameRoom:
         """Tue un joueur et gère les effets en cascade"""
         if player_socket in self.players:
             player = self.players[player_socket]
+            was_alive = player.is_alive
             player.is_alive = False
+            if was_alive:
+                self.record(EVENT_DEATH, player.username)
+                self.roster_version += 1
+                self.update_alive_counts(player, -1)
+                self.invalidate_phase_schedule(player.role)
 
-            # Si le joueur est amoureux, son amoureux meurt aussi
-            if player.is_amoureux and player.amoureux_with:
+            # Si le joueur est amoureux, son amoureux meurt aussi (une seule fois)
+            if was_alive and player.is_amoureux and player.amoureux_with:
                 self.kill_player(player.amoureux_with)
 
             # Si le joueur est chasseur, il peut tuer quelqu'un
@@ -329,31 +581,215 @@ class GameRoom:
             return "player_killed"
         return None
 
+MAX_OUTBOUND_BYTES = 256 * 1024  # Octets en attente d'envoi tolérés par client
+CLAIM_ATTEMPTS = 16  # Codes refusés par le broker d'affilée avant d'arrêter de remplir la réserve
+CLAIM_POOL = 32  # Codes réservés d'avance auprès du broker : create_room ne l'attend jamais
+
+class OutboundQueueFull(ConnectionError):
+    """La file d'envoi d'un client est pleine : client trop lent, il sera déconnecté"""
+
+class ThreadedClientConnection:
+    """Socket client (mode threaded) avec une file d'envoi bornée vidée par un thread écrivain.
+
+    send() ne fait qu'ajouter à la file : l'appelant ne bloque jamais sur la fenêtre TCP
+    d'un autre joueur. Le thread écrivain gère les envois partiels.
+    """
+
+    def __init__(self, sock: socket.socket, on_error=None, max_pending_bytes: int = MAX_OUTBOUND_BYTES):
+        self.sock = sock
+        self.on_error = on_error  # Appelé avec la connexion si l'écriture échoue
+        self.max_pending_bytes = max_pending_bytes
+        self.pending = deque()
+        self.pending_bytes = 0
+        self.closed = False
+        self.condition = threading.Condition()
+        self.writer_thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self.writer_thread.start()
+
+    def recv(self, size: int) -> bytes:
+        return self.sock.recv(size)
+
+    def send(self, data: bytes) -> int:
+        """Met les données en file d'envoi, lève OutboundQueueFull si la file déborde"""
+        with self.condition:
+            if self.closed:
+                raise ConnectionError("Connexion fermée")
+            if self.pending_bytes + len(data) > self.max_pending_bytes:
+                raise OutboundQueueFull(f"File d'envoi pleine ({self.pending_bytes} octets)")
+            self.pending.append(data)
+            self.pending_bytes += len(data)
+            self.condition.notify()
+        return len(data)
+
+    def _writer_loop(self):
+        """Vide la file d'envoi ; regroupe les trames en attente en un seul envoi"""
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                data = b''.join(self.pending)
+                self.pending.clear()
+            view = memoryview(data)
+            try:
+                while view:
+                    sent = self.sock.send(view)  # Peut n'écrire qu'une partie
+                    view = view[sent:]
+            except OSError as e:
+                if not self.closed and self.on_error:
+                    print(f"Erreur d'écriture vers {self}: {e}")
+                    self.on_error(self)
+                return
+            with self.condition:
+                self.pending_bytes -= len(data)
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)  # Débloque le recv du thread lecteur
+        except OSError:
+            pass
+        self.sock.close()
+
+    def __repr__(self):
+        return f"<ThreadedClientConnection fd={self.sock.fileno()}>"
+
+class AsyncClientConnection:
+    """Connexion cliente asyncio exposant la même interface qu'un socket (send/close)"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                 max_pending_bytes: int = MAX_OUTBOUND_BYTES):
+        self.reader = reader
+        self.writer = writer
+        self.transport = writer.transport
+        self.max_pending_bytes = max_pending_bytes
+        self.address = writer.get_extra_info('peername')
+
+    def send(self, data: bytes) -> int:
+        """Écrit sans bloquer : le transport asyncio garde le reste en tampon (borné)"""
+        if self.writer.is_closing():
+            raise ConnectionError("Connexion fermée")
+        pending = self.transport.get_write_buffer_size()
+        if pending + len(data) > self.max_pending_bytes:
+            raise OutboundQueueFull(f"File d'envoi pleine ({pending} octets)")
+        self.writer.write(data)
+        return len(data)
+
+    def close(self):
+        self.writer.close()
+
+    def __repr__(self):
+        return f"<AsyncClientConnection {self.address}>"
+
+class FrameSink:
+    """Sortie par défaut du serveur : encode les messages en trames et les écrit sur les connexions.
+
+    Le serveur ne parle qu'à sa sortie (self.sink) ; la simulation en fournit une autre qui
+    remet directement les messages aux joueurs simulés, sans encodage.
+    """
+
+    bytes_out = 0  # Octets mis en file (métriques)
+
+    def send(self, connection, message: dict, frame: Optional[bytes] = None):
+        """frame : message déjà encodé (réponse en cache), envoyé tel quel"""
+        self.bytes_out += connection.send(frame if frame is not None else encode_frame(message))
+
+    def broadcast(self, connections, message: dict) -> list:
+        """Envoie un message à plusieurs connexions (encodé une seule fois), retourne les échecs"""
+        encoded_message = encode_frame(message)
+        failed = []
+        for connection in connections:
+            try:
+                self.bytes_out += connection.send(encoded_message)  # Mise en file, non bloquant
+            except Exception as e:
+                print(f"Erreur broadcast vers {connection}: {e}")
+                failed.append(connection)
+        return failed
+
 class LoupGarouServer:
-    def __init__(self, host='localhost', port=5000):
-        self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.server_socket.bind((host, port))
-        self.server_socket.listen()
+    MODES = ('asyncio', 'threaded')
+    ROOM_ID_RANGE = (1000, 9999)  # Codes de room à 4 chiffres par défaut (bornes incluses)
+
+    def __init__(self, host='localhost', port=5000, mode='asyncio',
+                 max_outbound_bytes: int = MAX_OUTBOUND_BYTES,
+                 listen: bool = True, sink=None, timers: Optional[TimerWheel] = None,
+                 chat_rate: float = CHAT_RATE, chat_burst: int = CHAT_BURST,
+                 chat_window: float = CHAT_WINDOW, shard: Tuple[int, int] = (0, 1),
+                 broker=None, node_id: Optional[str] = None, advertise: Optional[str] = None,
+                 archive: Optional[GameArchive] = None, session_grace: float = GRACE_PERIOD,
+                 stats_port: Optional[int] = None, admin_token: Optional[str] = None,
+                 profile_dir: str = 'profiles', room_ids: Optional[Tuple[int, int]] = None,
+                 max_rooms: Optional[int] = None, max_memory: Optional[int] = None,
+                 idle_timeout: float = IDLE_TIMEOUT, finished_timeout: float = FINISHED_TIMEOUT,
+                 quick_join_wait: float = QUICK_JOIN_WAIT):
+        if mode not in self.MODES:
+            raise ValueError(f"Mode inconnu: {mode}")
+        self.mode = mode
+        self.host = host
+        self.shard_index, self.shard_count = shard  # Ce serveur ne crée que les codes ≡ index (mod count)
+        self.max_outbound_bytes = max_outbound_bytes
+        self.sink = sink if sink is not None else FrameSink()
+        self.server_socket = None  # Pas de socket d'écoute pour un serveur embarqué (simulation)
+        if listen:
+            self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.server_socket.bind((host, port))
+            self.server_socket.listen()
         
         self.rooms: Dict[str, GameRoom] = {}
         self.clients: Dict[socket.socket, str] = {}  # socket -> room_id
+        self.loop: Optional[asyncio.AbstractEventLoop] = None  # Boucle du mode asyncio
+        self.timers = timers if timers is not None else TimerWheel()  # Échéances de phase de toutes les rooms
+        self.chat = ChatChannel(self, chat_rate, chat_burst, chat_window, clock=self.timers.clock)
+        self.sessions = SessionManager(self, session_grace)
+        self.spectators = SpectatorHub(self)  # Public des rooms (voir spectators.py)
+        # Codes, ménage des rooms abandonnées et budget (voir lifecycle.py)
+        self.lifecycle = LifecycleManager(self, room_ids or self.ROOM_ID_RANGE, shard, max_rooms,
+                                          max_memory, idle_timeout, finished_timeout)
+        self.matchmaker = Matchmaker(self, quick_join_wait)  # Partie rapide (voir matchmaking.py)
+        self.directory = RoomDirectory()  # Réponses à list_rooms (voir directory.py)
+        self.metrics = Metrics()
+        self.timers.lag_observer = self.metrics.timer_lag.observe
+        self.stats_port = stats_port  # Point d'accès HTTP des métriques (voir metrics.py)
+        self.admin_token = admin_token  # Active les messages `admin` (None = désactivés)
+        self.profile_dir = profile_dir  # Fichiers du profileur (commande admin `profile`)
+        self.profiler: Optional[SamplingProfiler] = None
+
+        # Déploiement multi-nœuds (voir broker.py et gateway.py)
+        self.broker = broker
+        # Appels au broker (battements, réservations, libérations) : hors de la boucle et de la
+        # roue de timers, sur un seul thread pour qu'ils restent dans l'ordre
+        self.broker_calls = ThreadPoolExecutor(1, thread_name_prefix='broker') if broker else None
+        self.heartbeat_pending = False
+        self.claimed = deque()  # Codes déjà réservés auprès du broker, pas encore attribués
+        self.unclaimed = deque()  # Codes attribués réserve vide (broker injoignable), à réserver
+        self.claims_refused = False  # Le broker refuse les codes tirés : réserve impossible à remplir
+        self.refill_pending = False
+        self.node_id = node_id or f"{host}:{port}"
+        self.advertise = advertise or f"{host}:{port}"  # Adresse à laquelle la passerelle nous joint
+        self.snapshotter = None  # Snapshots périodiques des rooms (voir snapshot.py)
+        self.archive: Optional[GameArchive] = archive  # Parties terminées (voir event_log.py)
+
+    def schedule_timer(self, delay: float, callback):
+        """Programme un callback après `delay` secondes, retourne un objet annulable"""
+        return self.timers.schedule(delay, callback)
     
     def broadcast_to_room(self, room_id: str, message: dict, exclude_socket=None):
-        """Envoie un message à tous les joueurs d'une room"""
+        """Envoie un message à tous les joueurs d'une room (et au public, s'il y en a un)"""
         if room_id not in self.rooms:
             return
         
-        dead_sockets = []
         try:
-            encoded_message = json.dumps(message).encode('utf-8')
-            with threading.Lock():  # Protection contre les modifications concurrentes
-                for client_socket in list(self.rooms[room_id].players.keys()):
-                    if client_socket != exclude_socket:
-                        try:
-                            client_socket.send(encoded_message)
-                        except Exception as e:
-                            print(f"Erreur broadcast vers {client_socket}: {e}")
-                            dead_sockets.append(client_socket)
+            start = time.perf_counter()
+            recipients = [s for s in self.rooms[room_id].players if s is not exclude_socket]
+            dead_sockets = self.sink.broadcast(recipients, message)
+            self.metrics.broadcasts.observe(time.perf_counter() - start)
+            self.metrics.fanout += len(recipients)
+            if room_id in self.spectators.audiences:
+                self.spectators.publish(room_id, message)  # Mis en file, diffusé plus tard
             
             # Nettoyage des sockets morts
             for dead_socket in dead_sockets:
@@ -362,124 +798,373 @@ class LoupGarouServer:
         except Exception as e:
             print(f"Erreur générale lors du broadcast: {e}")
     
-    def create_room(self) -> str:
-        room_id = str(random.randint(1000, 9999))
-        while room_id in self.rooms:
-            room_id = str(random.randint(1000, 9999))
-        room = GameRoom(room_id)
+    def create_room(self) -> Optional[str]:
+        """Crée une room avec un code libre ; None si aucun code n'est disponible"""
+        room = GameRoom("")
         room.server = self  # Permet au room d'appeler les méthodes du serveur
+        if self.archive is not None:
+            room.events = []
+        room_id = self.take_room_id() if self.broker else self.lifecycle.allocate()
+        if room_id is None:
+            return None
+        room.room_id = room_id
         self.rooms[room_id] = room
         return room_id
+
+    def take_room_id(self) -> Optional[str]:
+        """Code déjà réservé auprès du broker (la réserve est complétée en arrière-plan)"""
+        try:
+            room_id = self.claimed.popleft()
+        except IndexError:
+            room_id = None
+        if room_id is None and not self.claims_refused:
+            # Réserve vide (broker lent ou en panne) : on garde la room, réservée après coup
+            room_id = self.lifecycle.allocate()
+            if room_id is not None:
+                self.unclaimed.append(room_id)
+        self.refill_claims()
+        return room_id
+
+    def refill_claims(self):
+        """Programme le remplissage de la réserve, s'il n'est pas déjà en file"""
+        if not self.refill_pending:
+            self.refill_pending = True
+            self.broker_calls.submit(self.fill_claims)
+
+    def fill_claims(self):
+        """Réserve les codes attribués sans réservation, puis complète la réserve (thread du broker)"""
+        drawn = None  # Code tiré pour la réserve, pas encore réservé
+        try:
+            while self.unclaimed:
+                room_id = self.unclaimed[0]
+                if not self.broker.claim_room(room_id, self.node_id):
+                    print(f"Erreur broker (claim_room): room {room_id} déjà réservée par un autre nœud")
+                self.unclaimed.popleft()
+            refused = 0
+            while len(self.claimed) < CLAIM_POOL and refused < CLAIM_ATTEMPTS:
+                drawn = self.lifecycle.allocate()  # Code unique dans ce serveur (voir lifecycle.py)
+                if drawn is None:
+                    return
+                if self.broker.claim_room(drawn, self.node_id):
+                    self.claimed.append(drawn)
+                    refused = 0
+                else:
+                    self.lifecycle.ids.release(drawn)  # Code déjà pris par un autre nœud
+                    refused += 1
+                drawn = None
+            self.claims_refused = refused >= CLAIM_ATTEMPTS
+        except Exception as e:
+            print(f"Erreur broker (claim_room): {e}")
+            if drawn is not None:
+                self.lifecycle.ids.release(drawn)
+        finally:
+            self.refill_pending = False
+
+    def register_node(self):
+        """Enregistre le nœud auprès du broker, avec les rooms et les codes qu'il possède déjà"""
+        self.broker.register_node(self.node_id, self.advertise)
+        for room_id in list(self.rooms) + list(self.claimed):
+            self.broker.claim_room(room_id, self.node_id)
+
+    def send_heartbeat(self):
+        """Battement de cœur périodique (timer) : l'appel part sur le thread du broker"""
+        if not self.heartbeat_pending:  # Broker lent : pas de battements en file
+            self.heartbeat_pending = True
+            self.broker_calls.submit(self.heartbeat)
+        self.schedule_timer(HEARTBEAT_INTERVAL, self.send_heartbeat)
+
+    def heartbeat(self):
+        """Réenregistre le nœud si le broker l'a oublié (thread du broker)"""
+        try:
+            if not self.broker.heartbeat(self.node_id):
+                self.register_node()
+        except Exception as e:
+            print(f"Erreur broker (heartbeat): {e}")
+        finally:
+            self.heartbeat_pending = False
+
+    def release_claim(self, room_id: str):
+        """Rend le code au broker, puis le remet en circulation (thread du broker).
+
+        Dans cet ordre : une room recréée avec ce code ne peut pas perdre sa réservation.
+        """
+        try:
+            self.unclaimed.remove(room_id)  # Room fermée avant d'avoir été réservée
+        except ValueError:
+            pass
+        try:
+            self.broker.release_room(room_id, self.node_id)
+        except Exception as e:
+            print(f"Erreur broker (release_room): {e}")
+        self.lifecycle.ids.release(room_id)
     
-    def handle_client(self, client_socket: socket.socket):
+    def handle_client(self, client_socket: socket.socket, initial: bytes = b''):
         """Gère les connexions des clients"""
+        decoder = FrameDecoder()
+        metrics = self.metrics
+        metrics.connections += 1
+        metrics.connections_total += 1
         try:
+            # Octets déjà lus par l'accepteur (mode multi-processus)
+            for message in decoder.feed(initial):
+                self.process_message(client_socket, message)
             while True:
-                data = client_socket.recv(1024).decode('utf-8')
+                data = client_socket.recv(RECV_SIZE)
                 if not data:
                     break
+                metrics.bytes_in += len(data)
                 
-                message = json.loads(data)
-                self.process_message(client_socket, message)
+                # Une lecture peut contenir plusieurs messages (ou un message partiel)
+                for message in decoder.feed(data):
+                    self.process_message(client_socket, message)
                 
         except Exception as e:
             print(f"Erreur: {e}")
         finally:
+            metrics.connections -= 1
             self.handle_disconnection(client_socket)
     
+    async def handle_client_async(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                                  initial: bytes = b''):
+        """Gère une connexion cliente sur la boucle asyncio (une coroutine par client)"""
+        connection = AsyncClientConnection(reader, writer, self.max_outbound_bytes)
+        decoder = FrameDecoder()
+        metrics = self.metrics
+        metrics.connections += 1
+        metrics.connections_total += 1
+        try:
+            for message in decoder.feed(initial):
+                self.process_message(connection, message)
+            while True:
+                data = await reader.read(RECV_SIZE)
+                if not data:
+                    break
+                metrics.bytes_in += len(data)
+
+                for message in decoder.feed(data):
+                    self.process_message(connection, message)
+
+        except Exception as e:
+            print(f"Erreur: {e}")
+        finally:
+            metrics.connections -= 1
+            self.handle_disconnection(connection)
+
     def process_message(self, client_socket: socket.socket, message: dict):
-        """Traite les messages reçus des clients"""
+        """Traite un message client et mesure sa durée de traitement (voir metrics.py)"""
+        start = time.perf_counter()
+        try:
+            self.dispatch_message(client_socket, message)
+        finally:
+            self.metrics.observe_message(message.get('type'), time.perf_counter() - start)
+
+    def dispatch_message(self, client_socket: socket.socket, message: dict):
+        """Confie le message à la room concernée"""
         msg_type = message.get('type')
-        
+
+        if msg_type == 'admin':
+            self.handle_admin(client_socket, message)
+            return
+        if msg_type == 'list_rooms':
+            # Servi par l'annuaire, sans passer par les rooms
+            response, frame = self.directory.query(message)
+            self.send_to_player(client_socket, response, frame)
+            return
+        if msg_type in ('create_room', 'join_room', 'quick_join'):
+            # Vérifié avant toute création : une room vide garderait son code jusqu'au ménage
+            username = message.get('username')
+            if client_socket in self.clients or not isinstance(username, str) or not username:
+                self.send_to_player(client_socket, {
+                    'type': 'action_result',
+                    'success': False,
+                    'message': ("Vous êtes déjà dans une room" if client_socket in self.clients
+                                else "Nom d'utilisateur invalide")
+                })
+                return
+        if msg_type in ('create_room', 'join_room', 'spectate', 'quick_join'):
+            refusal = self.lifecycle.admit(msg_type)
+            if refusal is None and msg_type == 'create_room':
+                room_id = self.create_room()
+                if room_id is None:
+                    refusal = "Plus aucun code de room disponible, réessayez plus tard"
+            if refusal is not None:
+                self.send_to_player(client_socket, {'type': 'server_busy', 'message': refusal})
+                return
         if msg_type == 'create_room':
-            room_id = self.create_room()
-            self.clients[client_socket] = room_id
             room = self.rooms[room_id]
+        elif msg_type == 'join_room':
+            room = self.rooms.get(message['room_id'])
+            if room is None:
+                self.send_to_player(client_socket, {
+                    'type': 'room_not_found',
+                    'message': "Cette room n'existe pas"
+                })
+                return
+        elif msg_type == 'resume':
+            room = self.rooms.get(self.sessions.room_of(message.get('session')))
+            if room is None:
+                self.send_to_player(client_socket, {
+                    'type': 'resume_failed',
+                    'message': "Session expirée"
+                })
+                return
+        elif msg_type == 'spectate':
+            room = self.rooms.get(str(message.get('room_id')))
+            if room is None or client_socket in self.clients:
+                self.send_to_player(client_socket, {
+                    'type': 'room_not_found',
+                    'message': "Cette room n'existe pas" if room is None else "Vous jouez déjà dans une room"
+                })
+                return
+            room.submit(self.spectators.subscribe, room, client_socket)
+            return
+        elif msg_type == 'quick_join':
+            # Pas de code : la file choisit (ou crée) la room, voir matchmaking.py
+            refusal = self.matchmaker.join(client_socket, message['username'])
+            if refusal is not None:
+                self.send_to_player(client_socket, {'type': 'server_busy', 'message': refusal})
+            return
+        else:
+            room = self.rooms.get(self.clients.get(client_socket))
+            if room is None:
+                if msg_type == 'disconnect':
+                    self.handle_disconnection(client_socket)
+                elif msg_type == 'roster_sync' and client_socket in self.spectators.watching:
+                    # Spectateur qui a manqué un delta : liste de la room qu'il regarde
+                    room = self.rooms.get(self.spectators.watching.get(client_socket))
+                    if room is not None:
+                        room.submit(self.send_roster, room, client_socket)
+                return
+
+        if msg_type in ('create_room', 'join_room', 'resume'):
+            # Réservé tout de suite : une déconnexion sera traitée après cette commande
+            self.clients[client_socket] = room.room_id
+            self.spectators.unsubscribe(client_socket)  # Un spectateur qui devient joueur
+        room.submit(self.handle_room_message, room, client_socket, message)
+
+    def handle_admin(self, client_socket: socket.socket, message: dict):
+        """Commandes d'administration, réservées aux détenteurs de --admin-token"""
+        command = message.get('command')
+        response = {'type': 'admin_result', 'command': command}
+        token = message.get('token')
+        if (not self.admin_token or not isinstance(token, str)
+                or not hmac.compare_digest(token.encode('utf-8'), self.admin_token.encode('utf-8'))):
+            response['error'] = "Accès refusé"
+        elif command == 'stats':
+            response['result'] = render_metrics(self)
+        elif command == 'profile':
+            response.update(self.start_profiler(message.get('duration', 10)))
+        else:
+            response['error'] = f"Commande inconnue: {command}"
+        self.send_to_player(client_socket, response)
+
+    def start_profiler(self, duration) -> dict:
+        """Lance le profileur par échantillonnage pour `duration` secondes (voir profiler.py)"""
+        if self.profiler is not None and self.profiler.running:
+            return {'error': f"Profilage déjà en cours ({self.profiler.path})"}
+        try:
+            duration = min(max(float(duration), 0.1), MAX_PROFILE_DURATION)
+            os.makedirs(self.profile_dir, exist_ok=True)
+        except (TypeError, ValueError, OSError) as e:
+            return {'error': f"Profilage impossible: {e}"}
+        name = f"profile-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.folded"
+        self.profiler = SamplingProfiler(os.path.join(self.profile_dir, name), duration)
+        self.profiler.start()
+        return {'result': {'path': self.profiler.path, 'duration': duration}}
+
+    def handle_room_message(self, room: GameRoom, client_socket: socket.socket, message: dict):
+        """Traite un message client ; s'exécute dans la boîte aux lettres de la room"""
+        msg_type = message.get('type')
+        
+        if msg_type == 'create_room':
+            room_id = room.room_id
             if room.add_player(client_socket, message['username']):
                 response = {
                     'type': 'room_created',
                     'room_id': room_id,
+                    'session': self.sessions.issue(room, room.players[client_socket]),
                     'players_info': room.get_players_info()
                 }
-                client_socket.send(json.dumps(response).encode('utf-8'))
+                self.send_to_player(client_socket, response)
             else:
+                self.release_client(client_socket, room)
+                self.close_room(room)  # Room restée vide : son code est libéré tout de suite
                 response = {'type': 'room_full'}
-                client_socket.send(json.dumps(response).encode('utf-8'))
+                self.send_to_player(client_socket, response)
                 
         elif msg_type == 'join_room':
             room_id = message['room_id']
-            # Vérifie si la room existe
-            if room_id not in self.rooms:
+            # Vérifie si la room existe (elle a pu être supprimée entre-temps)
+            if room.closed:
+                self.release_client(client_socket, room)
                 response = {
                     'type': 'room_not_found',
                     'message': "Cette room n'existe pas"
                 }
-                client_socket.send(json.dumps(response).encode('utf-8'))
+                self.send_to_player(client_socket, response)
                 return
                 
-            room = self.rooms[room_id]
             # Vérifie si la partie a déjà commencé
             if room.game_started:
+                self.release_client(client_socket, room)
                 response = {
                     'type': 'game_already_started',
                     'message': "La partie a déjà commencé"
                 }
-                client_socket.send(json.dumps(response).encode('utf-8'))
+                self.send_to_player(client_socket, response)
                 return
                 
             # Essaie d'ajouter le joueur
             if room.add_player(client_socket, message['username']):
-                self.clients[client_socket] = room_id
                 response = {
                     'type': 'room_joined',
                     'room_id': room_id,
+                    'session': self.sessions.issue(room, room.players[client_socket]),
                     'players_info': room.get_players_info()
                 }
-                client_socket.send(json.dumps(response).encode('utf-8'))
+                self.send_to_player(client_socket, response)
                 
                 # Informe les autres joueurs
                 self.broadcast_to_room(room_id, {
                     'type': 'player_joined',
                     'username': message['username'],
-                    'players_info': room.get_players_info()
+                    'version': room.roster_version
                 }, client_socket)
+                if room.room_id in self.matchmaker.open:
+                    self.matchmaker.seated(room)  # Salle d'attente de partie rapide complétée par code
             else:
+                self.release_client(client_socket, room)
                 response = {
                     'type': 'room_full',
                     'message': "La room est pleine"
                 }
-                client_socket.send(json.dumps(response).encode('utf-8'))
+                self.send_to_player(client_socket, response)
         
+        elif msg_type == 'resume':
+            if room.closed or not self.sessions.resume(room, client_socket, message.get('session')):
+                self.release_client(client_socket, room)
+                self.send_to_player(client_socket, {
+                    'type': 'resume_failed',
+                    'message': "Session expirée"
+                })
+
+        elif msg_type == 'roster_sync':
+            # Le client a manqué un delta : il reçoit la liste complète
+            if client_socket in room.players:
+                self.send_roster(room, client_socket)
+
         elif msg_type == 'disconnect':
-            self.handle_disconnection(client_socket)
+            self.handle_disconnection(client_socket, grace=False, current=room)  # Départ volontaire
                 
         elif msg_type == 'chat':
-            room_id = self.clients.get(client_socket)
-            if room_id:
-                self.broadcast_to_room(room_id, {
-                    'type': 'chat',
-                    'username': message['username'],
-                    'content': message['content']
-                })
+            if self.clients.get(client_socket) == room.room_id:
+                self.chat.post(room, client_socket, message['username'], message['content'])
                 
         elif msg_type == 'start_game':
             room_id = self.clients.get(client_socket)
             room = self.rooms.get(room_id)
-            if room and room.start_game():
-                # Envoie les rôles aux joueurs
-                for player_socket, player_info in room.players.items():
-                    response = {
-                        'type': 'game_started',
-                        'role': player_info.role.value
-                    }
-                    player_socket.send(json.dumps(response).encode('utf-8'))
-                
-                # Démarre la première phase
-                room.next_phase()
-                self.broadcast_to_room(room_id, {
-                    'type': 'phase_change',
-                    'phase': room.current_phase.value
-                })
+            if room:
+                self.launch_game(room)
         
         elif msg_type == 'night_action':
             try:
@@ -491,20 +1176,21 @@ class LoupGarouServer:
                 action = message.get('action')
                 target = message.get('target')
                 
-                # Convert target username to socket if needed
-                target_socket = None
-                if target:
-                    with threading.Lock():  # Protection lors de la recherche
-                        for socket, player in room.players.items():
-                            if player.username == target:
-                                target_socket = socket
-                                break
+                # Convert target username(s) to socket(s) through the room index
+                target_socket = room.get_player_socket(target) if target else None
+                targets = message.get('targets')
+                if targets:
+                    targets = [room.get_player_socket(name) for name in targets]
+                    if None in targets:
+                        targets = None
                 
                 success = room.process_night_action(client_socket, {
                     'action': action,
                     'target': target_socket,
-                    'targets': message.get('targets')  # For Cupidon's action
+                    'targets': targets  # For Cupidon's action
                 })
+                room.record(EVENT_NIGHT_ACTION, room.players[client_socket].username, action,
+                            message.get('targets') or target, success)
                 
                 if success:
                     try:
@@ -513,7 +1199,7 @@ class LoupGarouServer:
                             'type': 'action_result',
                             'success': True
                         }
-                        client_socket.send(json.dumps(response).encode('utf-8'))
+                        self.send_to_player(client_socket, response)
                         
                         # Special handling for Voyante
                         if action == 'see' and target_socket:
@@ -522,7 +1208,7 @@ class LoupGarouServer:
                                 'target': room.players[target_socket].username,
                                 'role': room.players[target_socket].role.value
                             }
-                            client_socket.send(json.dumps(response).encode('utf-8'))
+                            self.send_to_player(client_socket, response)
                         
                         # Check if all night actions are completed
                         self.check_phase_completion(room)
@@ -536,7 +1222,7 @@ class LoupGarouServer:
                             'success': False,
                             'message': "Action impossible"
                         }
-                        client_socket.send(json.dumps(response).encode('utf-8'))
+                        self.send_to_player(client_socket, response)
                     except Exception as e:
                         print(f"Erreur lors de l'envoi de l'échec: {e}")
                         self.handle_disconnection(client_socket)
@@ -552,15 +1238,14 @@ class LoupGarouServer:
                 target = message.get('target')
                 
                 # Convert target username to socket
-                target_socket = next((socket for socket, player in room.players.items() 
-                                    if player.username == target), None)
+                target_socket = room.get_player_socket(target)
                 
                 if target_socket and room.process_vote(client_socket, target_socket):
                     response = {
                         'type': 'action_result',
                         'success': True
                     }
-                    client_socket.send(json.dumps(response).encode('utf-8'))
+                    self.send_to_player(client_socket, response)
                     
                     # Check if all votes are in
                     self.check_phase_completion(room)
@@ -570,36 +1255,37 @@ class LoupGarouServer:
                         'success': False,
                         'message': "Vote impossible"
                     }
-                    client_socket.send(json.dumps(response).encode('utf-8'))
+                    self.send_to_player(client_socket, response)
 
     
 
     def check_phase_completion(self, room: GameRoom, force: bool = False):
         """Vérifie si la phase actuelle est terminée et passe à la suivante si nécessaire"""
+        if room.winner or not room.game_started:
+            return
         phase_complete = force  # Si force=True, on force le changement de phase
         
         if not force:
             if room.current_phase == GamePhase.NIGHT_LOUP:
                 # Vérifie si tous les loups ont voté
-                wolves = [s for s, p in room.players.items() if p.role == Role.LOUP_GAROU and p.is_alive]
-                if room.victim_socket or not wolves:
+                if room.victim_socket or not room.wolves_alive:
                     phase_complete = True
                     
             elif room.current_phase == GamePhase.NIGHT_VOYANTE:
                 # Vérifie si la voyante a utilisé son pouvoir
-                voyante = next((s for s, p in room.players.items() if p.role == Role.VOYANTE and p.is_alive), None)
+                voyante = room.get_alive_with_role(Role.VOYANTE)
                 if not voyante or room.seen_by_seer is not None:
                     phase_complete = True
                     
             elif room.current_phase == GamePhase.NIGHT_SORCIERE:
                 # Vérifie si la sorcière a agi ou s'il n'y en a pas
-                sorciere = next((s for s, p in room.players.items() if p.role == Role.SORCIERE and p.is_alive), None)
+                sorciere = room.get_alive_with_role(Role.SORCIERE)
                 if not sorciere or room.saved_by_witch or room.killed_by_witch:
                     phase_complete = True
                     
             elif room.current_phase == GamePhase.NIGHT_CUPIDON:
                 # Vérifie si Cupidon a choisi les amoureux
-                cupidon = next((s for s, p in room.players.items() if p.role == Role.CUPIDON and p.is_alive), None)
+                cupidon = room.get_alive_with_role(Role.CUPIDON)
                 if not cupidon or len(room.lovers) == 2 or room.current_turn > 1:
                     phase_complete = True
                     
@@ -618,82 +1304,103 @@ class LoupGarouServer:
                     
             elif room.current_phase == GamePhase.DAY_VOTE:
                 # Vérifie si tous les joueurs vivants ont voté
-                alive_players = [s for s, p in room.players.items() if p.is_alive]
-                votes_needed = len(alive_players)
+                votes_needed = room.alive_count
                 current_votes = len(room.votes)
                 
                 if current_votes >= votes_needed or force:
                     phase_complete = True
-                    self.resolve_day_end(room)
             
         if phase_complete:
             # Annule le timer existant s'il y en a un
+            room.phase_generation += 1
             if room.phase_timer:
                 room.phase_timer.cancel()
                 room.phase_timer = None
 
             # Si c'est la fin de la nuit, résoudre les morts
-            if room.current_phase in [GamePhase.NIGHT_SORCIERE]:
+            # (la sorcière peut être morte : on ne s'appuie pas sur sa phase)
+            if room.ends_night():
                 self.resolve_night_end(room)
             
-            # Réinitialise les votes si on était en phase de vote
+            # Résout les votes si on était en phase de vote (y compris à l'expiration du timer)
             if room.current_phase == GamePhase.DAY_VOTE:
-                room.votes.clear()
-                for player in room.players.values():
-                    player.has_voted = False
+                self.resolve_day_end(room)
+
+            # Une mort a pu terminer la partie
+            if room.winner:
+                return
             
             # Passe à la phase suivante
             room.next_phase()
-            
-            # Envoie d'abord le changement de phase
-            self.broadcast_to_room(room.room_id, {
-                'type': 'phase_change',
-                'phase': room.current_phase.value
-            })
-            
-            # Démarre le timer pour la nouvelle phase et envoie la durée aux clients
-            if room.current_phase in room.PHASE_DURATIONS:
-                duration = room.PHASE_DURATIONS[room.current_phase]
-                
-                # Envoie la durée du timer aux clients
-                self.broadcast_to_room(room.room_id, {
-                    'type': 'phase_timer',
-                    'duration': duration
-                })
-                
-                # Démarre le timer
-                room.phase_timer = threading.Timer(
-                    duration,
-                    lambda: self.check_phase_completion(room, force=True)
-                )
-                room.phase_timer.start()
-            
-            # Message spécial pour la victime des loups à la sorcière
-            if room.current_phase == GamePhase.NIGHT_SORCIERE and room.victim_socket:
-                sorciere_socket = next((s for s, p in room.players.items() 
-                                    if p.role == Role.SORCIERE and p.is_alive), None)
-                if sorciere_socket:
-                    victim_name = room.players[room.victim_socket].username
-                    self.send_to_player(sorciere_socket, {
-                        'type': 'victim_info',
-                        'victim': victim_name
-                    })
+            self.start_phase(room)
             
             # Vérifie les conditions de victoire après chaque changement de phase
             winner = room.check_victory()
             if winner:
-                if room.phase_timer:
-                    room.phase_timer.cancel()
-                self.broadcast_to_room(room.room_id, {
-                    'type': 'game_over',
-                    'winner': winner
+                self.end_game(room, winner)
+
+    def start_phase(self, room: GameRoom):
+        """Annonce la phase courante et arme son timer"""
+        self.directory.update(room)  # Phase affichée par list_rooms
+        # Envoie d'abord le changement de phase
+        self.broadcast_to_room(room.room_id, {
+            'type': 'phase_change',
+            'phase': room.current_phase.value
+        })
+        
+        # Démarre le timer pour la nouvelle phase et envoie la durée aux clients
+        if room.current_phase in room.PHASE_DURATIONS:
+            duration = room.PHASE_DURATIONS[room.current_phase]
+            
+            # Envoie la durée du timer aux clients
+            self.broadcast_to_room(room.room_id, {
+                'type': 'phase_timer',
+                'duration': duration
+            })
+            
+            # Démarre le timer ; son expiration repasse par la boîte aux lettres
+            room.phase_timer = self.schedule_timer(duration, room.force_phase_completion)
+        
+        # Message spécial pour la victime des loups à la sorcière
+        # (la victime a pu quitter la room : joueur déconnecté qui n'est pas revenu à temps)
+        if room.current_phase == GamePhase.NIGHT_SORCIERE and room.victim_socket in room.players:
+            sorciere_socket = room.get_alive_with_role(Role.SORCIERE)
+            if sorciere_socket:
+                victim_name = room.players[room.victim_socket].username
+                self.send_to_player(sorciere_socket, {
+                    'type': 'victim_info',
+                    'victim': victim_name
                 })
 
-    def send_to_player(self, player_socket: socket.socket, message: dict):
-        """Envoie un message à un joueur spécifique"""
+    def end_game(self, room: GameRoom, winner: str):
+        """Termine la partie : arrête le timer et annonce les vainqueurs (une seule fois)"""
+        if room.winner:
+            return
+        room.winner = winner
+        room.phase_generation += 1
+        if room.phase_timer:
+            room.phase_timer.cancel()
+            room.phase_timer = None
+        room.record(EVENT_GAME_OVER, winner)
+        self.directory.update(room)  # Partie terminée : retirée de l'annuaire
+        if self.archive is not None and room.events is not None:
+            self.archive.append(room.room_id, room.events)  # Encodé et écrit par le thread de l'archive
+            room.events = []
+        self.broadcast_to_room(room.room_id, {
+            'type': 'game_over',
+            'winner': winner
+        })
+
+    def on_phase_timeout(self, room: GameRoom, generation: int):
+        """Expiration du timer de phase (exécutée dans la boîte aux lettres de la room)"""
+        # Ignore un timer périmé : la phase a déjà changé depuis qu'il a été armé
+        if generation == room.phase_generation and not room.closed:
+            self.check_phase_completion(room, force=True)
+
+    def send_to_player(self, player_socket: socket.socket, message: dict, frame: Optional[bytes] = None):
+        """Envoie un message à un joueur spécifique (frame : le même message déjà encodé)"""
         try:
-            encoded_message = json.dumps(message).encode('utf-8')
-            player_socket.send(encoded_message)
+            self.sink.send(player_socket, message, frame)
         except Exception as e:
             print(f"Erreur lors de l'envoi au joueur: {e}")
             self.handle_disconnection(player_socket)
@@ -728,8 +1435,7 @@ class LoupGarouServer:
     def safe_send(self, client_socket: socket.socket, message: dict) -> bool:
         """Envoie sécurisé d'un message à un client"""
         try:
-            encoded_message = json.dumps(message).encode('utf-8')
-            client_socket.send(encoded_message)
+            self.sink.send(client_socket, message)
             return True
         except Exception as e:
             print(f"Erreur lors de l'envoi: {e}")
@@ -739,13 +1445,19 @@ class LoupGarouServer:
     def kill_player(self, room: GameRoom, player_socket: socket.socket):
         """Gère la mort d'un joueur"""
         if player_socket in room.players:
+            before = room.roster_version
             result = room.kill_player(player_socket)
             
-            # Notification de mort
-            self.broadcast_to_room(room.room_id, {
-                'type': 'player_death',
-                'username': room.players[player_socket].username
-            })
+            # Notification de mort, puis de l'amoureux emporté avec lui (deltas versionnés)
+            deaths = [player_socket]
+            if room.roster_version == before + 2:
+                deaths.append(room.players[player_socket].amoureux_with)
+            for offset, dead_socket in enumerate(deaths, 1):
+                self.broadcast_to_room(room.room_id, {
+                    'type': 'player_death',
+                    'username': room.players[dead_socket].username,
+                    'version': min(before + offset, room.roster_version)  # Déjà mort : version inchangée
+                })
             
             # Si c'est le chasseur qui meurt
             if result == "chasseur_revenge":
@@ -754,46 +1466,28 @@ class LoupGarouServer:
                     'type': 'chasseur_revenge',
                     'message': "Vous pouvez tirer sur quelqu'un avant de mourir"
                 }
-                player_socket.send(json.dumps(response).encode('utf-8'))
+                self.send_to_player(player_socket, response)
             
             # Vérifie la condition de victoire
             winner = room.check_victory()
             if winner:
-                if room.phase_timer:
-                    room.phase_timer.cancel()
-                self.broadcast_to_room(room.room_id, {
-                    'type': 'game_over',
-                    'winner': winner
-                })
+                self.end_game(room, winner)
+
+    def handle_disconnection(self, client_socket: socket.socket, grace: bool = True, current=None):
+        """Gère la déconnexion d'un client (grace : il peut revenir si une partie est en cours).
 
-    def handle_disconnection(self, client_socket: socket.socket):
-        """Gère la déconnexion d'un client"""
+        current : room dont la boîte aux lettres est en train d'exécuter cet appel.
+        """
         try:
-            room_id = self.clients.get(client_socket)
-            if room_id:
-                room = self.rooms.get(room_id)
-                if room and client_socket in room.players:
-                    try:
-                        username = room.players[client_socket].username
-                        room.remove_player(client_socket)
-                        
-                        # Informe les autres joueurs de la déconnexion
-                        self.broadcast_to_room(room_id, {
-                            'type': 'player_left',
-                            'username': username,
-                            'players_info': room.get_players_info()
-                        })
-                    except Exception as e:
-                        print(f"Erreur lors du traitement de la déconnexion: {e}")
-                        
-                    # Supprime la room si elle est vide
-                    if not room.players:
-                        if room.phase_timer:
-                            room.phase_timer.cancel()
-                        del self.rooms[room_id]
-            
-            if client_socket in self.clients:
-                del self.clients[client_socket]
+            room_id = self.clients.pop(client_socket, None)
+            self.chat.forget(client_socket)
+            self.spectators.unsubscribe(client_socket)
+            room = self.rooms.get(room_id) if room_id else None
+            if room is current and room is not None and not grace:
+                self.remove_from_room(room, client_socket)  # Déjà dans la boîte aux lettres
+            elif room:
+                # Le retrait passe par la boîte aux lettres, après les commandes déjà en file
+                room.submit(self.sessions.hold if grace else self.remove_from_room, room, client_socket)
                 
         except Exception as e:
             print(f"Erreur lors de la déconnexion: {e}")
@@ -803,21 +1497,229 @@ class LoupGarouServer:
             except:
                 pass
     
+    def launch_game(self, room: GameRoom) -> bool:
+        """Démarre la partie : rôles envoyés, première phase lancée (exécutée dans la boîte aux lettres)"""
+        if not room.start_game():
+            return False
+        self.matchmaker.discard(room.room_id)  # Salle d'attente de la partie rapide : fermée aux arrivées
+
+        # Envoie les rôles aux joueurs
+        for player_socket, player_info in room.players.items():
+            response = {
+                'type': 'game_started',
+                'role': player_info.role.value
+            }
+            self.send_to_player(player_socket, response)
+
+        # Démarre la première phase (avec son timer)
+        room.next_phase()
+        self.start_phase(room)
+        return True
+
+    def send_roster(self, room: GameRoom, connection):
+        """Liste complète des joueurs, pour un joueur ou un spectateur (exécutée dans la boîte aux lettres)"""
+        if room.closed:
+            return  # Les spectateurs reçoivent room_closed
+        self.send_to_player(connection, {
+            'type': 'roster',
+            'players_info': room.get_players_info()
+        })
+
+    def release_client(self, client_socket: socket.socket, room: GameRoom):
+        """Annule la réservation faite par process_message quand l'entrée dans la room échoue"""
+        if self.clients.get(client_socket) == room.room_id:
+            del self.clients[client_socket]
+
+    def remove_from_room(self, room: GameRoom, client_socket: socket.socket):
+        """Retire un joueur déconnecté de sa room (exécutée dans la boîte aux lettres)"""
+        if client_socket not in room.players:
+            return
+        try:
+            username = room.players[client_socket].username
+            self.sessions.forget(room.players[client_socket])
+            room.remove_player(client_socket)
+            
+            # Informe les autres joueurs de la déconnexion (room vide : elle va être fermée, et
+            # ses spectateurs recevront room_closed)
+            if room.players:
+                self.broadcast_to_room(room.room_id, {
+                    'type': 'player_left',
+                    'username': username,
+                    'version': room.roster_version
+                })
+        except Exception as e:
+            print(f"Erreur lors du traitement de la déconnexion: {e}")
+            
+        # Supprime la room si elle est vide
+        if not room.players:
+            self.close_room(room)
+        elif room.room_id in self.matchmaker.open:
+            self.matchmaker.vacate(room)  # Place libérée dans une salle d'attente de partie rapide
+
+    def close_room(self, room: GameRoom):
+        """Supprime la room du serveur et libère son code (exécutée dans la boîte aux lettres)"""
+        if room.closed:
+            return
+        if room.phase_timer:
+            room.phase_timer.cancel()
+        room.closed = True
+        self.rooms.pop(room.room_id, None)
+        self.directory.update(room)
+        self.spectators.close_room(room.room_id)
+        self.matchmaker.discard(room.room_id)
+        if self.broker:
+            self.broker_calls.submit(self.release_claim, room.room_id)
+        else:
+            self.lifecycle.ids.release(room.room_id)
+
     def run(self):
         """Lance le serveur"""
-        print("Serveur démarré...")
+        print(f"Serveur démarré (mode {self.mode})...")
+        if self.broker:
+            self.register_node()  # Réserve aussi les rooms restaurées d'un snapshot
+            self.refill_claims()
+            self.schedule_timer(HEARTBEAT_INTERVAL, self.send_heartbeat)
+        if self.snapshotter:
+            self.snapshotter.start()
+        self.lifecycle.start()
+        self.start_stats()
         try:
-            while True:
-                client_socket, address = self.server_socket.accept()
-                print(f"Nouvelle connexion de {address}")
-                threading.Thread(target=self.handle_client, 
-                               args=(client_socket,), 
-                               daemon=True).start()
+            if self.mode == 'asyncio':
+                asyncio.run(self.run_async())
+            else:
+                self.run_threaded()
         except KeyboardInterrupt:
             print("Arrêt du serveur...")
         finally:
+            if self.profiler is not None and self.profiler.running:
+                self.profiler.stop()
+            if self.snapshotter:
+                self.snapshotter.stop()
+            if self.archive is not None:
+                self.archive.close()
+            if self.broker:
+                self.broker_calls.shutdown(wait=False)
+                try:
+                    self.broker.unregister_node(self.node_id)
+                except Exception as e:
+                    print(f"Erreur broker (unregister_node): {e}")
             self.server_socket.close()
 
+    def start_stats(self):
+        """Ouvre le point d'accès HTTP des métriques si --stats-port est donné"""
+        if self.stats_port:
+            serve_stats(self, self.host, self.stats_port)
+            print(f"Métriques sur http://{self.host}:{self.stats_port}/metrics")
+
+    def run_threaded(self):
+        """Mode historique : un thread par connexion"""
+        threading.Thread(target=self.timers.run, name="timer-wheel", daemon=True).start()
+        while True:
+            client_socket, address = self.server_socket.accept()
+            print(f"Nouvelle connexion de {address}")
+            self.serve_client_thread(client_socket)
+
+    def serve_client_thread(self, client_socket: socket.socket, initial: bytes = b''):
+        """Prend en charge un socket client accepté (mode threaded)"""
+        connection = ThreadedClientConnection(client_socket, self.handle_disconnection,
+                                              self.max_outbound_bytes)
+        threading.Thread(target=self.handle_client, 
+                       args=(connection, initial), 
+                       daemon=True).start()
+
+    async def serve_client_async(self, client_socket: socket.socket, initial: bytes = b''):
+        """Prend en charge un socket client accepté ailleurs (mode asyncio)"""
+        reader, writer = await asyncio.open_connection(sock=client_socket)
+        await self.handle_client_async(reader, writer, initial)
+
+    async def run_async(self):
+        """Mode asyncio : toutes les rooms et connexions sur une seule boucle"""
+        self.loop = asyncio.get_running_loop()
+        timer_task = self.loop.create_task(self.timers.run_async())
+        try:
+            server = await asyncio.start_server(self.handle_client_async, sock=self.server_socket)
+            async with server:
+                await server.serve_forever()
+        finally:
+            timer_task.cancel()
+            self.loop = None
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serveur Loup-Garou")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--mode', choices=LoupGarouServer.MODES, default='asyncio',
+                        help="asyncio (une boucle pour tout) ou threaded (un thread par client)")
+    parser.add_argument('--phase-scale', type=float, default=1.0,
+                        help="Multiplie la durée des phases (tests de charge)")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Nombre de processus serveurs (rooms réparties par code, voir sharding.py)")
+    parser.add_argument('--broker', default=None,
+                        help="Socket Unix du broker (déploiement multi-nœuds derrière gateway.py)")
+    parser.add_argument('--node-id', default=None, help="Identifiant du nœud auprès du broker")
+    parser.add_argument('--advertise', default=None,
+                        help="Adresse hôte:port annoncée à la passerelle (par défaut --host:--port)")
+    parser.add_argument('--snapshot', default=None,
+                        help="Fichier de snapshot des rooms : restauré au démarrage, mis à jour en continu")
+    parser.add_argument('--snapshot-interval', type=float, default=5.0,
+                        help="Secondes entre deux snapshots")
+    parser.add_argument('--archive', default=None,
+                        help="Dossier de l'archive des parties terminées (journal des événements)")
+    parser.add_argument('--grace', type=float, default=GRACE_PERIOD,
+                        help="Secondes laissées à un joueur déconnecté pour reprendre sa partie (0 = aucune)")
+    parser.add_argument('--stats-port', type=int, default=None,
+                        help="Port HTTP des métriques Prometheus (/metrics) ; avec --workers, port + index du worker")
+    parser.add_argument('--admin-token', default=None,
+                        help="Jeton des messages d'administration (stats, profile) ; sans jeton ils sont refusés")
+    parser.add_argument('--profile-dir', default='profiles',
+                        help="Dossier des profils écrits par la commande d'administration `profile`")
+    parser.add_argument('--room-ids', type=int, nargs=2, metavar=('MIN', 'MAX'),
+                        default=list(LoupGarouServer.ROOM_ID_RANGE), help="Espace des codes de room")
+    parser.add_argument('--max-rooms', type=int, default=None,
+                        help="Au-delà, create_room est refusé (par processus avec --workers)")
+    parser.add_argument('--max-memory', type=int, default=None,
+                        help="Mémoire résidente en Mo au-delà de laquelle create_room et join_room sont refusés")
+    parser.add_argument('--idle-timeout', type=float, default=IDLE_TIMEOUT,
+                        help="Secondes sans activité avant de fermer une room (0 = jamais)")
+    parser.add_argument('--quick-join-wait', type=float, default=QUICK_JOIN_WAIT,
+                        help="Secondes avant qu'une partie rapide démarre sans être pleine (6 joueurs minimum)")
+    parser.add_argument('--chat-rate', type=float, default=CHAT_RATE,
+                        help="Messages de chat par seconde et par client (0 = illimité)")
+    parser.add_argument('--chat-burst', type=int, default=CHAT_BURST,
+                        help="Messages de chat acceptés d'affilée")
+    parser.add_argument('--chat-window', type=float, default=CHAT_WINDOW,
+                        help="Fenêtre de regroupement du chat en secondes (0 = désactivé)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    if args.phase_scale != 1.0:
+        GameRoom.PHASE_DURATIONS = {phase: max(1, round(duration * args.phase_scale))
+                                    for phase, duration in GameRoom.PHASE_DURATIONS.items()}
+    options = {'chat_rate': args.chat_rate, 'chat_burst': args.chat_burst,
+               'chat_window': args.chat_window, 'session_grace': args.grace,
+               'stats_port': args.stats_port, 'admin_token': args.admin_token,
+               'profile_dir': args.profile_dir, 'room_ids': tuple(args.room_ids),
+               'max_rooms': args.max_rooms, 'idle_timeout': args.idle_timeout,
+               'quick_join_wait': args.quick_join_wait,
+               'max_memory': args.max_memory << 20 if args.max_memory else None}
+    if args.workers > 1:
+        from sharding import run_sharded
+        run_sharded(args.host, args.port, args.workers, args.mode, **options)
+    else:
+        broker = RemoteBroker(args.broker) if args.broker else None
+        archive = GameArchive(args.archive) if args.archive else None
+        server = LoupGarouServer(args.host, args.port, mode=args.mode, broker=broker,
+                                 node_id=args.node_id, advertise=args.advertise, archive=archive,
+                                 **options)
+        if args.snapshot:
+            from snapshot import Snapshotter, restore_rooms
+            print(f"{restore_rooms(server, args.snapshot)} rooms restaurées depuis {args.snapshot}")
+            server.snapshotter = Snapshotter(server, args.snapshot, args.snapshot_interval)
+        server.run()
+
 if __name__ == "__main__":
-    server = LoupGarouServer()
-    server.run()
\ No newline at end of file
+    # main() doit s'exécuter dans le module `server` et non dans `__main__` : sharding.py et
+    # snapshot.py importent `server`, ses classes (GameRoom, GamePhase, Role) doivent être les mêmes
+    import server
+    server.main()
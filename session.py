@@ -0,0 +1,153 @@
+"""Sessions des joueurs : reprise d'une partie après une coupure réseau.
+
+room_created et room_joined donnent au client un jeton de session. Si sa connexion tombe
+pendant une partie, le joueur n'est pas retiré : dans la room, sa connexion est remplacée
+par un OfflinePlayer et il a GRACE_PERIOD secondes pour revenir avec un message `resume`. Il
+retrouve alors son PlayerState (rôle, vie, vote, potions) et reçoit un `resync` compact :
+phase, temps restant et liste des joueurs (vivants, morts, absents). Passé ce délai, il est retiré comme avant.
+
+Dans la salle d'attente, une fois la partie terminée ou après un message `disconnect`, la
+déconnexion reste définitive.
+"""
+import secrets
+from typing import Dict, Optional
+
+GRACE_PERIOD = 60.0  # Secondes laissées à un joueur déconnecté pour revenir
+
+
+class OfflinePlayer:
+    """Poignée d'un joueur sans connexion (coupure réseau, ou room restaurée d'un snapshot)"""
+    __slots__ = ('username',)
+
+    def __init__(self, username: str):
+        self.username = username
+
+    def send(self, data: bytes) -> int:
+        return 0  # Le joueur n'est pas là : le message est perdu, la partie continue
+
+    def deliver(self, message: dict):
+        pass  # Idem pour les messages non encodés (DirectSink de la simulation)
+
+    def close(self):
+        pass
+
+    def __repr__(self):
+        return f"<OfflinePlayer {self.username}>"
+
+
+class SessionManager:
+    """Jetons de session de toutes les rooms d'un serveur.
+
+    hold(), expire() et resume() s'exécutent dans la boîte aux lettres de la room.
+    """
+
+    def __init__(self, server, grace: float = GRACE_PERIOD):
+        self.server = server
+        self.grace = grace  # 0 = pas de reprise, toute déconnexion est définitive
+        self.rooms: Dict[str, str] = {}  # jeton -> room_id
+
+        # Compteurs
+        self.held = 0  # Joueurs mis en attente de reconnexion
+        self.resumed = 0
+        self.expired = 0  # Joueurs retirés faute d'être revenus à temps
+
+    def issue(self, room, player) -> str:
+        """Crée le jeton d'un joueur qui vient d'entrer dans la room"""
+        token = secrets.token_urlsafe(16)
+        player.session = token
+        self.rooms[token] = room.room_id
+        return token
+
+    def forget(self, player):
+        """Le joueur quitte définitivement sa room : son jeton ne vaut plus rien"""
+        if player.session is not None:
+            self.rooms.pop(player.session, None)
+
+    def room_of(self, token) -> Optional[str]:
+        return self.rooms.get(token) if isinstance(token, str) else None
+
+    def hold(self, room, connection):
+        """Connexion perdue : garde la place du joueur si une partie est en cours"""
+        player = room.players.get(connection)
+        if player is None:
+            return  # Déjà retiré, ou déjà remplacé par une nouvelle connexion
+        if self.grace <= 0 or not room.game_started or room.winner or player.session is None:
+            self.server.remove_from_room(room, connection)
+            return
+        handle = OfflinePlayer(player.username)
+        room.replace_connection(connection, handle)
+        room.roster_version += 1
+        self.held += 1
+        self.schedule_expiry(room, [handle])
+        self.server.broadcast_to_room(room.room_id, {
+            'type': 'player_offline',
+            'username': player.username,
+            'version': room.roster_version
+        })
+
+    def adopt(self, room):
+        """Room restaurée d'un snapshot : jetons réenregistrés, joueurs attendus pendant le délai"""
+        handles = [handle for handle, player in room.players.items() if player.session is not None]
+        for handle in handles:
+            self.rooms[room.players[handle].session] = room.room_id
+        if handles and self.grace > 0:
+            self.schedule_expiry(room, handles)  # Un seul timer pour toute la room
+
+    def schedule_expiry(self, room, handles: list):
+        self.server.schedule_timer(self.grace, lambda: room.submit(self.expire, room, handles))
+
+    def expire(self, room, handles: list):
+        """Fin du délai : retire les joueurs qui ne sont pas revenus"""
+        for handle in handles:
+            if handle in room.players and not room.closed:
+                self.expired += 1
+                self.server.remove_from_room(room, handle)
+
+    def resume(self, room, connection, token: str) -> bool:
+        """Rend sa place au joueur qui revient avec son jeton"""
+        old = next((c for c, p in room.players.items() if p.session == token), None)
+        if old is None:
+            return False
+        if not isinstance(old, OfflinePlayer):
+            # Coupure pas encore détectée côté serveur : la nouvelle connexion remplace l'ancienne
+            self.server.clients.pop(old, None)
+            old.close()
+        room.replace_connection(old, connection)
+        if isinstance(old, OfflinePlayer):
+            room.roster_version += 1
+        self.resumed += 1
+        self.server.send_to_player(connection, self.resync(room, connection))
+        self.server.broadcast_to_room(room.room_id, {
+            'type': 'player_back',
+            'username': room.players[connection].username,
+            'version': room.roster_version
+        }, connection)
+        return True
+
+    def resync(self, room, connection) -> dict:
+        """État courant de la partie pour un joueur qui revient"""
+        from server import GamePhase, Role  # server importe ce module
+        player = room.players[connection]
+        remaining = 0
+        if room.phase_timer is not None and hasattr(room.phase_timer, 'remaining'):
+            remaining = round(room.phase_timer.remaining())
+        message = {
+            'type': 'resync',
+            'room_id': room.room_id,
+            'username': player.username,
+            'role': player.role.value if player.role else None,
+            'is_alive': player.is_alive,
+            'has_voted': player.has_voted,
+            'phase': room.current_phase.value,
+            'turn': room.current_turn,
+            'remaining': remaining,
+            'players_info': room.get_players_info(),  # Joueurs, morts et absents
+            'winner': room.winner,
+        }
+        if player.is_amoureux and player.amoureux_with in room.players:
+            message['lover'] = room.players[player.amoureux_with].username
+        if player.role == Role.SORCIERE:
+            message['potions'] = {'heal': player.sorciere_heal, 'kill': player.sorciere_kill}
+            if room.current_phase == GamePhase.NIGHT_SORCIERE and room.victim_socket in room.players:
+                message['victim'] = room.players[room.victim_socket].username
+        return message
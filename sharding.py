@@ -0,0 +1,163 @@
+"""Serveur multi-processus sur une seule machine.
+
+Le GIL limite un processus à un cœur : on lance N workers, chacun un LoupGarouServer complet
+qui ne possède que les rooms dont le code vaut son index modulo N. Seul l'accepteur écoute le
+port. Il lit la première trame de chaque connexion : create_room et quick_join sont confiés au
+worker suivant (tourniquet, chaque worker a sa propre file de partie rapide), join_room, resume
+et spectate au worker propriétaire du code. Le descripteur du socket est alors
+passé au worker (SCM_RIGHTS sur une paire de sockets Unix) avec les octets déjà lus, et le
+worker traite la connexion comme s'il l'avait acceptée lui-même.
+
+SO_REUSEPORT ne suffit pas ici : le noyau répartit les connexions sans connaître la room
+visée, alors que les joueurs d'une room doivent tous arriver dans le même processus.
+
+    python server.py --workers 4
+"""
+import asyncio
+import multiprocessing
+import socket
+import threading
+from typing import List, Optional, Tuple
+
+from protocol import FrameDecoder, RECV_SIZE
+from server import GameRoom, LoupGarouServer
+
+MAX_INITIAL_BYTES = 64 * 1024  # Octets lus par l'accepteur avant la première trame complète
+FIRST_FRAME_TIMEOUT = 10.0  # Délai accordé au client pour envoyer sa première trame
+
+
+def shard_for_room(room_id, count: int) -> Optional[int]:
+    """Worker propriétaire d'un code de room, ou None si le code n'est pas valide"""
+    room_id = str(room_id)
+    return int(room_id) % count if room_id.isdigit() else None
+
+
+def receive_connection(control: socket.socket) -> Tuple[Optional[socket.socket], bytes]:
+    """Reçoit un socket client et les octets déjà lus ; (None, b'') si l'accepteur est parti"""
+    data, fds, _, _ = socket.recv_fds(control, MAX_INITIAL_BYTES, 1)
+    if not fds:
+        return None, b''
+    return socket.socket(fileno=fds[0]), data
+
+
+def run_worker(index: int, count: int, control: socket.socket, mode: str,
+               phase_durations: dict, server_kwargs: dict, inherited: List[socket.socket]):
+    """Point d'entrée d'un processus worker"""
+    for other in inherited:
+        other.close()  # Extrémités de l'accepteur héritées : sinon on ne verrait jamais sa fin
+    GameRoom.PHASE_DURATIONS = phase_durations  # Peut avoir été modifié par --phase-scale
+    if server_kwargs.get('stats_port'):
+        server_kwargs = dict(server_kwargs, stats_port=server_kwargs['stats_port'] + index)
+    server = LoupGarouServer(listen=False, mode=mode, shard=(index, count), **server_kwargs)
+    server.lifecycle.start()
+    server.start_stats()
+    try:
+        if mode == 'asyncio':
+            asyncio.run(serve_worker_async(server, control))
+        else:
+            threading.Thread(target=server.timers.run, name="timer-wheel", daemon=True).start()
+            while True:
+                client_socket, initial = receive_connection(control)
+                if client_socket is None:
+                    break
+                client_socket.setblocking(True)  # L'accepteur asyncio l'a rendu non bloquant
+                server.serve_client_thread(client_socket, initial)
+    except KeyboardInterrupt:
+        pass
+
+
+async def serve_worker_async(server: LoupGarouServer, control: socket.socket):
+    server.loop = loop = asyncio.get_running_loop()
+    timer_task = loop.create_task(server.timers.run_async())
+    clients = set()  # Garde une référence sur les tâches en cours
+    try:
+        while True:
+            client_socket, initial = await loop.run_in_executor(None, receive_connection, control)
+            if client_socket is None:
+                break
+            task = loop.create_task(server.serve_client_async(client_socket, initial))
+            clients.add(task)
+            task.add_done_callback(clients.discard)
+    finally:
+        timer_task.cancel()
+        server.loop = None
+
+
+class ShardAcceptor:
+    """Accepte les connexions et les route vers le worker qui possède la room"""
+
+    def __init__(self, host: str, port: int, controls: List[socket.socket]):
+        self.host = host
+        self.port = port
+        self.controls = controls
+        self.next_worker = 0
+        self.routed = [0] * len(controls)  # Connexions confiées à chaque worker
+
+    def choose_worker(self, message: dict) -> int:
+        if message.get('type') in ('join_room', 'resume', 'spectate'):
+            worker = shard_for_room(message.get('room_id'), len(self.controls))
+            if worker is not None:
+                return worker
+        # create_room, quick_join (ou code invalide, que n'importe quel worker refusera) : tourniquet
+        worker = self.next_worker
+        self.next_worker = (worker + 1) % len(self.controls)
+        return worker
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        decoder = FrameDecoder()
+        initial = bytearray()
+        try:
+            messages = []
+            while not messages:
+                data = await asyncio.wait_for(reader.read(RECV_SIZE), FIRST_FRAME_TIMEOUT)
+                if not data:
+                    return
+                initial += data
+                if len(initial) > MAX_INITIAL_BYTES:
+                    return
+                messages = decoder.feed(data)
+
+            worker = self.choose_worker(messages[0])
+            client_socket = writer.get_extra_info('socket')
+            # Le noyau duplique le descripteur dans le message : on peut fermer notre copie ensuite
+            socket.send_fds(self.controls[worker], [bytes(initial)], [client_socket.fileno()])
+            self.routed[worker] += 1
+        except (asyncio.TimeoutError, ValueError, OSError) as e:
+            print(f"Erreur lors du routage d'une connexion: {e}")
+        finally:
+            writer.transport.abort()  # Ferme notre copie sans shutdown : le worker garde la connexion
+
+    async def run(self):
+        server = await asyncio.start_server(self.handle_client, self.host, self.port, reuse_address=True)
+        async with server:
+            await server.serve_forever()
+
+
+def run_sharded(host: str, port: int, workers: int, mode: str = 'asyncio', **server_kwargs):
+    """Lance `workers` processus serveurs derrière un accepteur commun"""
+    controls = []
+    processes = []
+    for index in range(workers):
+        # SOCK_SEQPACKET garde les frontières : un message = un socket et ses premiers octets
+        parent, child = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        process = multiprocessing.Process(
+            target=run_worker, name=f"worker-{index}", daemon=True,
+            args=(index, workers, child, mode, dict(GameRoom.PHASE_DURATIONS), server_kwargs,
+                  controls + [parent]))
+        process.start()
+        child.close()
+        controls.append(parent)
+        processes.append(process)
+
+    print(f"Serveur démarré ({workers} workers, mode {mode})...")
+    try:
+        asyncio.run(ShardAcceptor(host, port, controls).run())
+    except KeyboardInterrupt:
+        print("Arrêt du serveur...")
+    finally:
+        for control in controls:
+            control.close()  # Les workers voient la fin du canal et s'arrêtent
+        for process in processes:
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
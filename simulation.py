@@ -0,0 +1,282 @@
+"""Moteur de simulation : fait jouer des parties complètes sans réseau.
+
+Les joueurs simulés remplacent les sockets comme clés de GameRoom.players, la sortie du
+serveur est remplacée par une sortie en mémoire et le temps est virtuel : quand plus aucun
+joueur n'agit, on avance l'horloge jusqu'à l'expiration du timer de phase. Les messages
+passent par LoupGarouServer.process_message, comme ceux d'un vrai client.
+
+    python simulation.py --games 10000 --players 6 16
+    python simulation.py --games 2000 --profile
+"""
+import argparse
+import cProfile
+import pstats
+import random
+import time
+from collections import Counter
+from typing import Callable, Dict, List, Optional
+
+from server import GamePhase, GameRoom, LoupGarouServer, Role
+from timer_wheel import TimerWheel
+
+
+class VirtualClock:
+    """Horloge contrôlée par la simulation (remplace time.monotonic)"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class SimPlayer:
+    """Joueur simulé : identifie le joueur dans la room à la place d'un socket"""
+    __slots__ = ('username', 'policy', 'inbox', 'bytes_sent')
+
+    def __init__(self, username: str, policy: 'Policy', keep_messages: bool = False):
+        self.username = username
+        self.policy = policy
+        self.inbox: Optional[List[dict]] = [] if keep_messages else None
+        self.bytes_sent = 0
+
+    def deliver(self, message: dict):
+        """Reçoit un message du serveur (sortie DirectSink)"""
+        if self.inbox is not None:
+            self.inbox.append(message)
+
+    def send(self, data: bytes) -> int:
+        """Compatibilité avec FrameSink : compte les octets qui seraient envoyés"""
+        self.bytes_sent += len(data)
+        return len(data)
+
+    def close(self):
+        pass
+
+    def __repr__(self):
+        return f"<SimPlayer {self.username}>"
+
+
+class DirectSink:
+    """Sortie qui remet les messages aux joueurs simulés sans les encoder"""
+
+    def send(self, connection, message: dict, frame: Optional[bytes] = None):
+        connection.deliver(message)
+
+    def broadcast(self, connections, message: dict) -> list:
+        for connection in connections:
+            connection.deliver(message)
+        return []
+
+
+class NullSink:
+    """Sortie qui ignore tous les messages (mesure du seul coût des règles du jeu)"""
+
+    def send(self, connection, message: dict, frame: Optional[bytes] = None):
+        pass
+
+    def broadcast(self, connections, message: dict) -> list:
+        return []
+
+
+class Policy:
+    """Comportement d'un joueur : retourne le message à envoyer pour la phase, ou None"""
+
+    def act(self, player: SimPlayer, room: GameRoom) -> Optional[dict]:
+        return None
+
+
+class RandomPolicy(Policy):
+    """Joue au hasard parmi les actions permises par son rôle"""
+
+    def __init__(self, rng: random.Random, chat_probability: float = 0.0):
+        self.rng = rng
+        self.chat_probability = chat_probability
+
+    def others_alive(self, player: SimPlayer, room: GameRoom, exclude_role: Optional[Role] = None) -> list:
+        return [p.username for s, p in room.players.items()
+                if p.is_alive and s is not player and (exclude_role is None or p.role != exclude_role)]
+
+    def act(self, player: SimPlayer, room: GameRoom) -> Optional[dict]:
+        state = room.players[player]
+        phase = room.current_phase
+        rng = self.rng
+
+        if phase == GamePhase.NIGHT_LOUP and state.role == Role.LOUP_GAROU:
+            targets = self.others_alive(player, room, exclude_role=Role.LOUP_GAROU)
+            if targets:
+                return {'type': 'night_action', 'action': 'kill', 'target': rng.choice(targets)}
+        elif phase == GamePhase.NIGHT_VOYANTE and state.role == Role.VOYANTE:
+            targets = self.others_alive(player, room)
+            if targets:
+                return {'type': 'night_action', 'action': 'see', 'target': rng.choice(targets)}
+        elif phase == GamePhase.NIGHT_SORCIERE and state.role == Role.SORCIERE:
+            roll = rng.random()
+            if roll < 0.3 and room.victim_socket:
+                return {'type': 'night_action', 'action': 'heal'}
+            targets = self.others_alive(player, room)
+            if roll < 0.5 and targets:
+                return {'type': 'night_action', 'action': 'kill', 'target': rng.choice(targets)}
+        elif phase == GamePhase.NIGHT_CUPIDON and state.role == Role.CUPIDON:
+            targets = self.others_alive(player, room)
+            if len(targets) >= 2:
+                return {'type': 'night_action', 'action': 'link', 'targets': rng.sample(targets, 2)}
+        elif phase == GamePhase.DAY_DISCUSSION:
+            if rng.random() < self.chat_probability:
+                return {'type': 'chat', 'username': player.username, 'content': "Je suis innocent"}
+        elif phase == GamePhase.DAY_VOTE and state.is_alive and not state.has_voted:
+            targets = self.others_alive(player, room)
+            if targets:
+                return {'type': 'vote', 'target': rng.choice(targets)}
+        return None
+
+
+class ScriptedPolicy(Policy):
+    """Rejoue un scénario : {(tour, phase): message ou fonction(player, room) -> message}"""
+
+    def __init__(self, script: Dict[tuple, object], fallback: Optional[Policy] = None):
+        self.script = script
+        self.fallback = fallback
+
+    def act(self, player: SimPlayer, room: GameRoom) -> Optional[dict]:
+        step = self.script.get((room.current_turn, room.current_phase))
+        if step is None:
+            return self.fallback.act(player, room) if self.fallback else None
+        return step(player, room) if callable(step) else step
+
+
+class GameResult:
+    __slots__ = ('winner', 'turns', 'phases', 'players', 'deaths')
+
+    def __init__(self, winner, turns, phases, players, deaths):
+        self.winner = winner
+        self.turns = turns
+        self.phases = phases
+        self.players = players
+        self.deaths = deaths
+
+
+class Simulation:
+    """Serveur embarqué sans socket, horloge virtuelle et joueurs simulés"""
+
+    MAX_PHASES = 200  # Garde-fou contre une partie qui ne se terminerait pas
+
+    # Rôle qui agit pendant chaque phase de nuit
+    PHASE_ROLES = {
+        GamePhase.NIGHT_LOUP: Role.LOUP_GAROU,
+        GamePhase.NIGHT_VOYANTE: Role.VOYANTE,
+        GamePhase.NIGHT_SORCIERE: Role.SORCIERE,
+        GamePhase.NIGHT_CUPIDON: Role.CUPIDON,
+    }
+
+    def __init__(self, seed: Optional[int] = None, sink=None,
+                 policy_factory: Optional[Callable[[random.Random], Policy]] = None,
+                 keep_messages: bool = False):
+        self.rng = random.Random(seed)
+        self.clock = VirtualClock()
+        self.timers = TimerWheel(tick=0.1, clock=self.clock)  # Tour de roue > plus longue phase
+        self.sink = sink if sink is not None else NullSink()
+        self.server = LoupGarouServer(listen=False, sink=self.sink, timers=self.timers)
+        self.policy_factory = policy_factory or RandomPolicy
+        self.keep_messages = keep_messages
+
+    def create_players(self, count: int) -> List[SimPlayer]:
+        policy = self.policy_factory(self.rng)
+        return [SimPlayer(f"joueur{i}", policy, self.keep_messages) for i in range(count)]
+
+    def setup_room(self, players: List[SimPlayer]) -> GameRoom:
+        """Crée la room et y fait entrer les joueurs, comme des clients réels"""
+        server = self.server
+        server.process_message(players[0], {'type': 'create_room', 'username': players[0].username})
+        room = server.rooms[server.clients[players[0]]]
+        for player in players[1:]:
+            server.process_message(player, {'type': 'join_room', 'username': player.username,
+                                            'room_id': room.room_id})
+        return room
+
+    def expire_phase(self, room: GameRoom):
+        """Avance l'horloge virtuelle jusqu'à l'expiration du timer de phase"""
+        if room.phase_timer is None:
+            self.server.check_phase_completion(room, force=True)
+            return
+        self.clock.now = room.phase_timer.deadline + self.timers.tick
+        self.timers.advance()
+
+    def actors(self, room: GameRoom) -> list:
+        """Joueurs susceptibles d'agir pendant la phase courante"""
+        role = self.PHASE_ROLES.get(room.current_phase)
+        if role is not None:
+            return list(room.players_by_role.get(role, ()))
+        if room.current_phase in (GamePhase.DAY_VOTE, GamePhase.DAY_DISCUSSION):
+            order = [s for s, p in room.players.items() if p.is_alive]
+            self.rng.shuffle(order)
+            return order
+        return []
+
+    def play_game(self, num_players: int, players: Optional[List[SimPlayer]] = None) -> GameResult:
+        """Joue une partie complète, de start_game à la victoire d'un camp"""
+        server = self.server
+        players = players or self.create_players(num_players)
+        room = self.setup_room(players)
+        server.process_message(players[0], {'type': 'start_game'})
+
+        phases = 0
+        while room.winner is None and phases < self.MAX_PHASES:
+            generation = room.phase_generation
+            for player in self.actors(room):
+                if not isinstance(player, SimPlayer):
+                    continue  # Joueur déconnecté (OfflinePlayer) : il n'agit plus
+                message = player.policy.act(player, room)
+                if message:
+                    server.process_message(player, message)
+                if room.phase_generation != generation:
+                    break
+            if room.phase_generation == generation:
+                self.expire_phase(room)
+            phases += 1
+
+        result = GameResult(room.winner, room.current_turn, phases, len(players),
+                            len(players) - room.alive_count)
+        for player in players:
+            server.handle_disconnection(player)
+        return result
+
+    def run(self, games: int, sizes: List[int]) -> List[GameResult]:
+        return [self.play_game(self.rng.choice(sizes)) for _ in range(games)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulation de parties de Loup-Garou sans réseau")
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--players', type=int, nargs='+', default=[6, 16],
+                        help="Taille de room min et max (bornes incluses)")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--sink', choices=('null', 'direct'), default='null')
+    parser.add_argument('--profile', action='store_true', help="Profile les règles du jeu (cProfile)")
+    args = parser.parse_args()
+
+    low, high = args.players[0], args.players[-1]
+    sink = DirectSink() if args.sink == 'direct' else NullSink()
+    simulation = Simulation(seed=args.seed, sink=sink)
+    sizes = list(range(low, high + 1))
+
+    profiler = cProfile.Profile() if args.profile else None
+    start = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    results = simulation.run(args.games, sizes)
+    if profiler:
+        profiler.disable()
+    elapsed = time.perf_counter() - start
+
+    winners = Counter(r.winner for r in results)
+    print(f"{args.games} parties en {elapsed:.2f} s ({args.games / elapsed:,.0f} parties/s)")
+    print(f"tours moyens: {sum(r.turns for r in results) / len(results):.2f}  "
+          f"phases moyennes: {sum(r.phases for r in results) / len(results):.2f}")
+    print("vainqueurs:", dict(winners))
+    if profiler:
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(25)
+
+
+if __name__ == '__main__':
+    main()
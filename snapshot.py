@@ -0,0 +1,242 @@
+"""Snapshots périodiques des rooms et reprise après un arrêt du serveur.
+
+Chaque room modifiée depuis le dernier passage (GameRoom.version) est capturée dans sa boîte
+aux lettres, donc dans un état cohérent, sous forme de tuples de types simples : les sockets
+deviennent des indices de joueurs. Les captures sont faites par petits lots pour ne pas
+bloquer la boucle ; un thread écrit le fichier en arrière-plan (fichier temporaire puis
+os.replace, jamais de fichier à moitié écrit).
+
+Au démarrage, restore_rooms recrée les rooms, reconstruit les index et réarme les timers de
+phase avec le temps qu'il leur restait. Les joueurs restaurés n'ont plus de connexion : ils
+sont représentés par un OfflinePlayer qui ignore les messages, et peuvent reprendre leur
+place avec leur jeton de session pendant le délai de grâce (voir session.py).
+
+    python server.py --snapshot /var/lib/loupgarou/rooms.snap
+"""
+import gc
+import os
+import pickle
+import threading
+import time
+from typing import Dict, List, Optional
+
+from server import GamePhase, GameRoom, PlayerState, Role
+from session import OfflinePlayer
+
+SNAPSHOT_VERSION = 2
+SNAPSHOT_INTERVAL = 5.0  # Secondes entre deux passes de capture (et deux écritures)
+CAPTURE_BATCH = 256  # Rooms capturées par tick de timer
+
+ROLES = list(Role)
+ROLE_INDEX = {role: i for i, role in enumerate(ROLES)}
+PHASES = list(GamePhase)
+PHASE_INDEX = {phase: i for i, phase in enumerate(PHASES)}
+
+# Drapeaux booléens de PlayerState, dans l'ordre des bits
+PLAYER_FLAGS = ('is_alive', 'is_amoureux', 'has_voted', 'is_captain',
+                'sorciere_heal', 'sorciere_kill', 'chasseur_can_shoot')
+# Valeur des drapeaux pour chaque masque possible (évite de décoder bit par bit à la restauration)
+FLAG_VALUES = [tuple(bool(mask >> bit & 1) for bit in range(len(PLAYER_FLAGS)))
+               for mask in range(1 << len(PLAYER_FLAGS))]
+
+
+def capture_room(room: GameRoom) -> tuple:
+    """État de la room en tuples de types simples (à appeler dans sa boîte aux lettres)"""
+    sockets = list(room.players)
+    index = {s: i for i, s in enumerate(sockets)}
+    index[None] = -1
+
+    players = []
+    for player in room.players.values():
+        flags = 0
+        for bit, name in enumerate(PLAYER_FLAGS):
+            if getattr(player, name):
+                flags |= 1 << bit
+        players.append((player.username, ROLE_INDEX[player.role] if player.role is not None else -1,
+                        flags, index.get(player.amoureux_with, -1),
+                        (),  # Ancien champ voted_by (jamais rempli), gardé pour le format
+                        player.session))
+
+    remaining = None
+    if room.phase_timer is not None and hasattr(room.phase_timer, 'remaining'):
+        remaining = room.phase_timer.remaining()
+
+    return (
+        room.room_id, room.max_players, room.game_started, PHASE_INDEX[room.current_phase],
+        room.current_turn, room.winner, tuple(players),
+        index.get(room.captain_socket, -1), index.get(room.victim_socket, -1),
+        index.get(room.second_victim_socket, -1), room.saved_by_witch, room.killed_by_witch,
+        tuple(index[s] for s in room.lovers if s in index), index.get(room.seen_by_seer, -1),
+        tuple((index[v], index[t]) for v, t in room.votes.items() if v in index and t in index),
+        room.phase_generation, remaining,
+    )
+
+
+def restore_room(record: tuple, server) -> GameRoom:
+    """Recrée une room à partir d'un tuple de capture_room"""
+    (room_id, max_players, game_started, phase, turn, winner, players, captain, victim,
+     second_victim, saved_by_witch, killed_by_witch, lovers, seen, votes, generation,
+     remaining) = record
+
+    room = GameRoom(room_id, max_players)
+    room.server = server
+    handles = [OfflinePlayer(player[0]) for player in players]
+    handle = lambda i: handles[i] if i >= 0 else None
+
+    for connection, (username, role, flags, lover, _, session) in zip(handles, players):
+        player = PlayerState(username)
+        player.role = ROLES[role] if role >= 0 else None
+        (player.is_alive, player.is_amoureux, player.has_voted, player.is_captain,
+         player.sorciere_heal, player.sorciere_kill, player.chasseur_can_shoot) = FLAG_VALUES[flags]
+        if lover >= 0:
+            player.amoureux_with = handles[lover]
+        player.session = session
+        room.players[connection] = player
+
+    room.game_started = game_started
+    room.current_phase = PHASES[phase]
+    room.current_turn = turn
+    room.winner = winner
+    room.captain_socket = handle(captain)
+    room.victim_socket = handle(victim)
+    room.second_victim_socket = handle(second_victim)
+    room.saved_by_witch = saved_by_witch
+    room.killed_by_witch = killed_by_witch
+    room.lovers = [handles[i] for i in lovers]
+    room.seen_by_seer = handle(seen)
+    room.votes = {handles[v]: handles[t] for v, t in votes}
+    room.phase_generation = generation
+    room.rebuild_indexes()
+
+    # phase_schedule reste à None : recompilé au premier changement de phase (get_phase_schedule)
+    if game_started and winner is None and remaining is not None:
+        room.phase_timer = server.schedule_timer(remaining, room.force_phase_completion)
+    return room
+
+
+def restore_rooms(server, path: str) -> int:
+    """Charge le snapshot `path` dans server.rooms ; retourne le nombre de rooms restaurées"""
+    try:
+        with open(path, 'rb') as f:
+            version, records = pickle.load(f)
+    except FileNotFoundError:
+        return 0
+    except Exception as e:
+        print(f"Erreur lors de la lecture du snapshot {path}: {e}")
+        return 0
+    if version != SNAPSHOT_VERSION:
+        print(f"Snapshot {path} ignoré (version {version})")
+        return 0
+
+    restored = 0
+    gc.disable()  # Des centaines de milliers d'objets créés d'un coup : le GC doublerait le temps
+    try:
+        for record in records:
+            try:
+                room = restore_room(record, server)
+            except Exception as e:
+                print(f"Erreur lors de la restauration de la room {record[0]}: {e}")
+                continue
+            server.rooms[room.room_id] = room
+            server.lifecycle.ids.reserve(room.room_id)
+            server.directory.update(room)
+            server.sessions.adopt(room)  # Réservée auprès du broker par register_node, au lancement
+            restored += 1
+    finally:
+        gc.enable()
+    return restored
+
+
+class Snapshotter:
+    """Capture les rooms modifiées et écrit le snapshot en arrière-plan"""
+
+    def __init__(self, server, path: str, interval: float = SNAPSHOT_INTERVAL,
+                 batch: int = CAPTURE_BATCH):
+        self.server = server
+        self.path = path
+        self.interval = interval
+        self.batch = batch
+        self.records: Dict[str, tuple] = {}  # room_id -> dernière capture
+        self.versions: Dict[str, int] = {}  # room_id -> version de la room à la capture
+        self.lock = threading.Lock()
+        self.dirty = threading.Event()  # Des captures n'ont pas encore été écrites
+        self.stopped = False
+        self.writer_thread: Optional[threading.Thread] = None
+
+        # Compteurs
+        self.captures = 0
+        self.writes = 0
+        self.last_write_seconds = 0.0
+
+    def start(self):
+        self.writer_thread = threading.Thread(target=self._writer_loop, name="snapshot-writer", daemon=True)
+        self.writer_thread.start()
+        self.server.schedule_timer(self.interval, self.capture_pass)
+
+    def capture_pass(self):
+        """Début d'une passe : liste les rooms modifiées depuis leur dernière capture"""
+        rooms = self.server.rooms
+        with self.lock:
+            for room_id in [r for r in self.records if r not in rooms]:
+                del self.records[room_id]  # Room supprimée
+                self.versions.pop(room_id, None)
+                self.dirty.set()
+        changed = [room for room_id, room in list(rooms.items())
+                   if self.versions.get(room_id) != room.version]
+        self.capture_batch(changed, 0)
+
+    def capture_batch(self, rooms: List[GameRoom], start: int):
+        """Capture un lot de rooms puis programme le lot suivant (la boucle reste disponible)"""
+        for room in rooms[start:start + self.batch]:
+            if not room.closed:
+                room.submit(self.capture, room)
+        if start + self.batch < len(rooms):
+            self.server.schedule_timer(0, lambda: self.capture_batch(rooms, start + self.batch))
+        elif not self.stopped:
+            self.server.schedule_timer(self.interval, self.capture_pass)
+
+    def capture(self, room: GameRoom):
+        """Exécutée dans la boîte aux lettres de la room"""
+        if room.closed or not room.room_id:
+            return
+        record = capture_room(room)
+        with self.lock:
+            self.records[room.room_id] = record
+            self.versions[room.room_id] = room.version
+        self.captures += 1
+        self.dirty.set()
+
+    def _writer_loop(self):
+        while not self.stopped:
+            time.sleep(self.interval)
+            if self.dirty.is_set():
+                self.write()
+
+    def write(self):
+        """Écrit toutes les captures (fichier temporaire puis remplacement atomique)"""
+        start = time.perf_counter()
+        with self.lock:
+            self.dirty.clear()
+            records = list(self.records.values())
+        temporary = f"{self.path}.tmp"
+        try:
+            with open(temporary, 'wb') as f:
+                pickle.dump((SNAPSHOT_VERSION, records), f, protocol=pickle.HIGHEST_PROTOCOL)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temporary, self.path)
+        except OSError as e:
+            print(f"Erreur lors de l'écriture du snapshot: {e}")
+            self.dirty.set()
+            return
+        self.writes += 1
+        self.last_write_seconds = time.perf_counter() - start
+
+    def stop(self):
+        """Arrêt propre : capture des rooms modifiées puis dernière écriture"""
+        self.stopped = True
+        for room in list(self.server.rooms.values()):
+            if self.versions.get(room.room_id) != room.version:
+                room.submit(self.capture, room)
+        if self.dirty.is_set():
+            self.write()
@@ -0,0 +1,201 @@
+"""Spectateurs : suivre une room sans y jouer.
+
+Un client envoie {'type': 'spectate', 'room_id': ...} et reçoit un état `spectating` (liste des
+joueurs, phase, temps restant), puis le flux public de la room : changements de phase, morts,
+arrivées et départs, chat, fin de partie. Jamais de rôles ni de secrets de nuit (victime des
+loups, résultat de la voyante) : ceux-là ne passent pas par broadcast_to_room. Comme un joueur,
+un spectateur qui a manqué un delta demande la liste complète avec `roster_sync`.
+
+Les joueurs ne paient pas pour le public : broadcast_to_room encode le message une fois de plus
+et l'ajoute à la file de la room, c'est tout. La diffusion aux spectateurs est une tâche à part
+(timer) qui envoie toutes les trames accumulées en une seule écriture par spectateur, au plus
+FANOUT_SLICE spectateurs par tick. Un spectateur trop lent (file d'envoi pleine) est retiré
+plutôt que d'être attendu.
+"""
+import threading
+from typing import Dict, List
+
+from protocol import encode_frame
+
+MAX_SPECTATORS = 1000  # Par room
+FANOUT_SLICE = 200  # Spectateurs servis par tick de la roue de timers
+
+# Messages de broadcast_to_room transmis au public (les autres restent entre joueurs)
+PUBLIC_TYPES = frozenset({
+    'player_joined', 'player_left', 'player_death', 'player_offline', 'player_back',
+    'phase_change', 'phase_timer', 'game_over', 'chat', 'chat_batch',
+})
+
+
+class Audience:
+    """Spectateurs d'une room et trames en attente de diffusion"""
+    __slots__ = ('room_id', 'members', 'frames', 'joining', 'targets', 'cursor', 'scheduled', 'closing')
+
+    def __init__(self, room_id: str):
+        self.room_id = room_id
+        self.members: Dict[object, None] = {}  # Connexions (dict : ordre d'arrivée)
+        self.frames: List[bytes] = []  # Trames publiées depuis le dernier lot
+        self.joining: list = []  # (connexion, état initial, nombre de trames déjà dans frames)
+        self.targets: list = []  # Lot en cours : (connexion, octets), servi à partir de cursor
+        self.cursor = 0
+        self.scheduled = False  # Tâche de diffusion programmée
+        self.closing = False  # Room supprimée : dernier lot puis plus rien
+
+
+class SpectatorHub:
+    """Spectateurs de toutes les rooms d'un serveur.
+
+    subscribe() et publish() s'exécutent dans la boîte aux lettres de la room, fanout() sur la
+    roue de timers et unsubscribe() sur le thread de la connexion : l'état partagé est protégé
+    par un verrou, les envois se font hors verrou.
+    """
+
+    def __init__(self, server, max_spectators: int = MAX_SPECTATORS, fanout_slice: int = FANOUT_SLICE):
+        self.server = server
+        self.max_spectators = max_spectators
+        self.fanout_slice = fanout_slice
+        self.audiences: Dict[str, Audience] = {}  # room_id -> public (absent = aucun spectateur)
+        self.watching: Dict[object, str] = {}  # connexion -> room_id
+        self.lock = threading.Lock()
+
+        # Compteurs
+        self.published = 0  # Trames publiées (encodées une seule fois)
+        self.delivered = 0  # Écritures vers les spectateurs
+        self.bytes_out = 0
+        self.dropped = 0  # Spectateurs retirés car trop lents
+
+    def subscribe(self, room, connection):
+        """Ajoute un spectateur à la room (exécutée dans la boîte aux lettres)"""
+        if room.closed:
+            self.server.send_to_player(connection, {
+                'type': 'room_not_found',
+                'message': "Cette room n'existe pas"
+            })
+            return
+        self.unsubscribe(connection)  # Un seul public à la fois
+        with self.lock:
+            audience = self.audiences.get(room.room_id)
+            if audience is None:
+                audience = self.audiences[room.room_id] = Audience(room.room_id)
+            if len(audience.members) + len(audience.joining) >= self.max_spectators:
+                full = True
+            else:
+                full = False
+                # L'état initial part avec le prochain lot, avant les trames publiées après lui
+                audience.joining.append((connection, encode_frame(self.state(room, audience)),
+                                         len(audience.frames)))
+                self.watching[connection] = room.room_id
+                self.schedule(audience)
+        if full:
+            self.server.send_to_player(connection, {
+                'type': 'spectators_full',
+                'message': "Trop de spectateurs dans cette room"
+            })
+
+    def state(self, room, audience: Audience) -> dict:
+        """Ce qu'un spectateur doit savoir en arrivant (aucun rôle)"""
+        remaining = 0
+        if room.phase_timer is not None and hasattr(room.phase_timer, 'remaining'):
+            remaining = round(room.phase_timer.remaining())
+        return {
+            'type': 'spectating',
+            'room_id': room.room_id,
+            'phase': room.current_phase.value,
+            'turn': room.current_turn,
+            'remaining': remaining,
+            'players_info': room.get_players_info(),
+            'winner': room.winner,
+            'spectators': len(audience.members) + len(audience.joining) + 1,
+        }
+
+    def unsubscribe(self, connection):
+        if connection not in self.watching:
+            return  # Cas courant (joueur qui part) : pas de verrou
+        with self.lock:
+            room_id = self.watching.pop(connection, None)
+            audience = self.audiences.get(room_id) if room_id else None
+            if audience is not None:
+                audience.members.pop(connection, None)
+                audience.joining = [j for j in audience.joining if j[0] is not connection]
+
+    def publish(self, room_id: str, message: dict):
+        """Message public de la room : encodé une fois, diffusé plus tard par fanout()"""
+        if message.get('type') not in PUBLIC_TYPES:
+            return
+        frame = encode_frame(message)
+        with self.lock:
+            audience = self.audiences.get(room_id)
+            if audience is None or audience.closing:
+                return
+            audience.frames.append(frame)
+            self.published += 1
+            self.schedule(audience)
+
+    def close_room(self, room_id: str):
+        """Room supprimée : les spectateurs sont prévenus puis détachés"""
+        if room_id not in self.audiences:
+            return
+        frame = encode_frame({'type': 'room_closed', 'room_id': room_id})
+        with self.lock:
+            audience = self.audiences.get(room_id)
+            if audience is None:
+                return
+            audience.frames.append(frame)
+            audience.closing = True
+            self.schedule(audience)
+
+    def schedule(self, audience: Audience):
+        """Programme la tâche de diffusion si elle ne l'est pas déjà (verrou pris)"""
+        if not audience.scheduled:
+            audience.scheduled = True
+            self.server.schedule_timer(0, lambda: self.fanout(audience))
+
+    def fanout(self, audience: Audience):
+        """Diffuse une tranche du lot en cours, puis se reprogramme s'il reste du travail"""
+        with self.lock:
+            if audience.cursor >= len(audience.targets):
+                self.next_batch(audience)
+            sends = audience.targets[audience.cursor:audience.cursor + self.fanout_slice]
+            audience.cursor += len(sends)
+
+        failed = []
+        members = audience.members
+        for connection, data in sends:
+            if not data or connection not in members:
+                continue  # Lot vide (seulement des arrivées), ou spectateur parti entre-temps
+            try:
+                self.bytes_out += connection.send(data)
+                self.delivered += 1
+            except Exception as e:
+                print(f"Erreur d'envoi au spectateur {connection}: {e}")
+                failed.append(connection)
+        for connection in failed:
+            self.dropped += 1
+            self.unsubscribe(connection)
+            connection.close()
+
+        with self.lock:
+            if audience.cursor < len(audience.targets) or audience.frames or audience.joining:
+                self.server.schedule_timer(0, lambda: self.fanout(audience))
+                return
+            audience.scheduled = False
+            if audience.closing or not audience.members:
+                # Plus personne à servir : la room n'a plus de public
+                if self.audiences.get(audience.room_id) is audience:
+                    del self.audiences[audience.room_id]
+                for connection in audience.members:
+                    self.watching.pop(connection, None)
+                audience.members.clear()
+
+    def next_batch(self, audience: Audience):
+        """Regroupe les trames en attente en un lot, partagé par tous les spectateurs (verrou pris)"""
+        frames, audience.frames = audience.frames, []
+        joining, audience.joining = audience.joining, []
+        batch = b''.join(frames)
+        audience.targets = [(connection, batch) for connection in audience.members]
+        audience.cursor = 0
+        for connection, state, seen in joining:
+            # Nouveau spectateur : son état, puis seulement les trames publiées après lui
+            audience.targets.append((connection, state + b''.join(frames[seen:])))
+            audience.members[connection] = None
+
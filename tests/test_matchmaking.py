@@ -0,0 +1,64 @@
+"""Partie rapide : placements qui échouent (voir matchmaking.py)
+
+    python -m pytest tests
+"""
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server import GameRoom, LoupGarouServer  # noqa: E402
+from simulation import NullSink, Policy, SimPlayer, VirtualClock  # noqa: E402
+from timer_wheel import TimerWheel  # noqa: E402
+
+
+class SeatFailureTest(unittest.TestCase):
+    def setUp(self):
+        self.server = LoupGarouServer(listen=False, sink=NullSink(), timers=TimerWheel(clock=VirtualClock()))
+        self.matchmaker = self.server.matchmaker
+
+    def quick_join(self, name: str) -> SimPlayer:
+        player = SimPlayer(name, Policy())
+        self.server.process_message(player, {'type': 'quick_join', 'username': name})
+        return player
+
+    def test_failed_seat_puts_room_back_in_queue(self):
+        first = self.quick_join('j0')
+        room = self.server.rooms[self.server.clients[first]]
+        entry = self.matchmaker.open[room.room_id]
+
+        # Toutes les places restantes réservées : la room n'a plus d'entrée dans le tas
+        free = entry.free()
+        for _ in range(free):
+            self.assertIs(self.matchmaker.reserve(), entry)
+        self.assertIsNone(entry.item)
+
+        # Un placement échoue ; le joueur est parti entre-temps, il n'y a rien à refaire
+        with mock.patch.object(GameRoom, 'add_player', return_value=False):
+            self.matchmaker.seat(entry, SimPlayer('parti', Policy()), 'parti', 1)
+        self.assertEqual(entry.free(), 1)
+
+        # La place rendue sert au joueur suivant, sans ouvrir de nouvelle room
+        player = self.quick_join('suivant')
+        self.assertEqual(self.server.clients[player], room.room_id)
+        self.assertIn(player, room.players)
+        self.assertEqual(list(self.server.rooms), [room.room_id])
+
+    def test_seat_on_closed_room_is_not_requeued(self):
+        first = self.quick_join('j0')
+        room = self.server.rooms[self.server.clients[first]]
+        entry = self.matchmaker.reserve()
+        self.assertIs(entry.room, room)
+
+        self.server.process_message(first, {'type': 'disconnect'})  # Room vide : fermée
+        self.assertTrue(room.closed)
+        self.matchmaker.seat(entry, SimPlayer('parti', Policy()), 'parti', 1)
+
+        player = self.quick_join('suivant')
+        self.assertNotEqual(self.server.clients[player], room.room_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""Roue de timers hachée partagée par toutes les rooms.
+
+Un seul ordonnanceur remplace les threading.Timer créés à chaque phase : insertion et
+annulation en O(1), un seul thread (ou une seule tâche asyncio) pour faire avancer la roue.
+Chaque case contient les timers dont l'échéance (en ticks) tombe sur cette case, tous tours
+de roue confondus ; à chaque tick on ne déclenche que ceux dont l'échéance est atteinte.
+"""
+import asyncio
+import math
+import threading
+import time
+from typing import Callable, List, Optional
+
+
+class TimerHandle:
+    """Timer programmé dans la roue ; cancel() le retire en O(1)"""
+    __slots__ = ('wheel', 'expiry_tick', 'deadline', 'callback', 'cancelled')
+
+    def __init__(self, wheel: 'TimerWheel', expiry_tick: int, deadline: float, callback: Callable):
+        self.wheel = wheel
+        self.expiry_tick = expiry_tick
+        self.deadline = deadline
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.wheel.cancel(self)
+
+    def remaining(self) -> float:
+        """Secondes restantes avant l'échéance"""
+        return max(0.0, self.deadline - self.wheel.clock())
+
+
+class TimerWheel:
+    def __init__(self, tick: float = 0.01, slots: int = 1024, clock: Callable[[], float] = time.monotonic):
+        self.tick = tick
+        self.clock = clock
+        self.slots: List[dict] = [{} for _ in range(slots)]
+        self.origin = clock()
+        self.current_tick = 0  # Dernier tick traité
+        self.count = 0
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.lag_observer: Optional[Callable[[float], None]] = None  # Reçoit le retard de chaque timer (métriques)
+
+    def __len__(self):
+        return self.count
+
+    def schedule(self, delay: float, callback: Callable) -> TimerHandle:
+        """Programme `callback` dans `delay` secondes"""
+        deadline = self.clock() + delay
+        with self.lock:
+            expiry_tick = max(self.current_tick + 1,
+                              math.ceil((deadline - self.origin) / self.tick))
+            handle = TimerHandle(self, expiry_tick, deadline, callback)
+            self.slots[expiry_tick % len(self.slots)][handle] = None
+            self.count += 1
+        self.wakeup.set()
+        return handle
+
+    def cancel(self, handle: TimerHandle):
+        with self.lock:
+            if handle.cancelled:
+                return
+            handle.cancelled = True
+            if self.slots[handle.expiry_tick % len(self.slots)].pop(handle, 0) is None:
+                self.count -= 1
+
+    def advance(self, now: Optional[float] = None) -> int:
+        """Déclenche les timers échus jusqu'à `now` ; retourne le nombre de callbacks appelés"""
+        if now is None:
+            now = self.clock()
+        target = int((now - self.origin) / self.tick)
+        expired = []
+        with self.lock:
+            if target <= self.current_tick:
+                return 0
+            if self.count:
+                for slot in self.slots_between(self.current_tick, target):
+                    due = [h for h in slot if h.expiry_tick <= target]
+                    for handle in due:
+                        del slot[handle]
+                        handle.cancelled = True
+                    expired.extend(due)
+                self.count -= len(expired)
+            self.current_tick = target
+        if len(expired) > 1:
+            expired.sort(key=lambda h: h.deadline)
+        observe = self.lag_observer
+        for handle in expired:
+            if observe is not None:
+                observe(now - handle.deadline)
+            try:
+                handle.callback()
+            except Exception as e:
+                print(f"Erreur dans un timer: {e}")
+        return len(expired)
+
+    def slots_between(self, last_tick: int, target: int) -> List[dict]:
+        """Cases non vides couvrant les ticks ]last_tick, target] (appelé sous le verrou)"""
+        size = len(self.slots)
+        if target - last_tick >= size:
+            # Au-delà d'un tour complet, chaque case n'a besoin d'être visitée qu'une fois
+            return [slot for slot in self.slots if slot]
+        start = (last_tick + 1) % size
+        end = start + target - last_tick
+        if end <= size:
+            return [slot for slot in self.slots[start:end] if slot]
+        return ([slot for slot in self.slots[start:] if slot]
+                + [slot for slot in self.slots[:end - size] if slot])
+
+    def run(self, stop: Optional[threading.Event] = None):
+        """Boucle du thread dédié : avance la roue à chaque tick, dort si elle est vide"""
+        while stop is None or not stop.is_set():
+            if not self.count:
+                self.wakeup.wait(1.0)
+            self.wakeup.clear()
+            time.sleep(self.tick)
+            self.advance()
+
+    async def run_async(self):
+        """Équivalent de run() pour la boucle asyncio"""
+        while True:
+            await asyncio.sleep(self.tick)
+            self.advance()